@@ -1,4 +1,10 @@
-import pandas as pd
+import os
+import sys
+
+# The shared workbook session lives at the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from workbook import open_workbook
 
 def extract_saline_data(file_path):
     """
@@ -7,15 +13,15 @@ def extract_saline_data(file_path):
     :param file_path: Path to the Excel file.
     :return: DataFrame containing the saline data.
     """
-    data = pd.ExcelFile(file_path)
+    data = open_workbook(file_path)
     
     if "Saline Storage" not in data.sheet_names:
         raise ValueError("Saline data sheet not found.")
-    saline_data = pd.read_excel(file_path, sheet_name="Saline Storage")
+    saline_data = data.sheet("Saline Storage")
 
     return saline_data
 
 if  __name__ == '__main__':
     file_path = r"C:\Users\user\Desktop\excel-to-python-equations\Excel\Calculations_for_python.xlsx"
     saline_data = extract_saline_data(file_path)
-    print(saline_data.columns)
\ No newline at end of file
+    print(saline_data.columns)
@@ -0,0 +1,355 @@
+import argparse
+import csv
+import glob
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Sheets evaluated for each project, keyed by model. CSV exports are matched on the sheet
+# name in their file name (e.g. "Calculations for python - Saline Storage.csv").
+MODEL_SHEETS = {
+    'saline': "Saline Storage",
+    'depleted': "Depleted Field Storage",
+    'economic': "Economic Analysis",
+}
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xlsm')
+OUTPUT_FORMATS = ('csv', 'jsonl', 'parquet')
+# A Parquet part file is written once this many rows are buffered, or once the oldest
+# buffered row has waited this many seconds, so a crash loses little finished work.
+PARQUET_ROWS_PER_PART = 1000
+PARQUET_FLUSH_SECONDS = 10.0
+
+def _result_columns():
+    from cashflow_model import ECONOMIC_OUTPUTS
+    from depleted_batch import DEPLETED_BATCH_OUTPUTS
+    from saline_batch import SALINE_BATCH_OUTPUTS
+
+    return ('source', 'model', 'error') + SALINE_BATCH_OUTPUTS + DEPLETED_BATCH_OUTPUTS + ECONOMIC_OUTPUTS
+
+def find_project_files(paths, manifest=None):
+    """
+    List the project files to evaluate.
+
+    :param paths: Files or directories; directories are scanned recursively for workbooks
+                  and CSV exports.
+    :param manifest: Optional text or CSV file listing one path per line (a CSV needs a
+                     'path' column); relative paths are resolved against the manifest.
+    :return: Sorted list of absolute file paths.
+    """
+    files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for extension in WORKBOOK_EXTENSIONS + ('.csv',):
+                files.update(glob.glob(os.path.join(path, '**', f'*{extension}'), recursive=True))
+        else:
+            files.add(path)
+    if manifest:
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, newline='', encoding='utf-8') as f:
+            lines = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        if lines and lines[0].split(',')[0].strip().lower() == 'path':
+            lines = [row['path'] for row in csv.DictReader(lines)]
+        files.update(os.path.join(base, line) for line in lines)
+    # Skip Office lock files ("~$Book.xlsx").
+    return sorted(os.path.abspath(f) for f in files if not os.path.basename(f).startswith('~$'))
+
+def _models_for_file(file_path):
+    """
+    Return the models to evaluate for a file.
+    """
+    if file_path.lower().endswith(WORKBOOK_EXTENSIONS):
+        from workbook import open_workbook
+
+        sheet_names = open_workbook(file_path).sheet_names
+        return [model for model, sheet in MODEL_SHEETS.items() if sheet in sheet_names]
+    name = os.path.basename(file_path)
+    return [model for model, sheet in MODEL_SHEETS.items() if sheet in name]
+
+def _evaluate_model(model, file_path):
+    """
+    Evaluate one model on one file.
+
+    :return: Dict of output name to value.
+    """
+    import pandas as pd
+    from input_schema import DEPLETED_SCHEMA, SALINE_SCHEMA, extract_inputs
+
+    if model == 'economic':
+        from cashflow_model import assumptions_from_inputs, evaluate_economics
+        from economic_analysis import load_economic_sheet
+
+        results = evaluate_economics(assumptions_from_inputs(load_economic_sheet(file_path).inputs))
+    else:
+        if file_path.lower().endswith('.csv'):
+            frame = pd.read_csv(file_path, header=None, dtype=str)
+        else:
+            from workbook import open_workbook
+
+            frame = open_workbook(file_path).sheet(MODEL_SHEETS[model])
+        if model == 'saline':
+            from saline_batch import calculate_saline_batch
+
+            results = calculate_saline_batch(extract_inputs(frame, SALINE_SCHEMA)._asdict())
+        else:
+            from depleted_batch import calculate_depleted_batch
+
+            results = calculate_depleted_batch(extract_inputs(frame, DEPLETED_SCHEMA)._asdict())
+    return {name: float(value) for name, value in results.iloc[0].items()}
+
+def evaluate_file(file_path, skip_models=()):
+    """
+    Evaluate every model a project file holds.
+
+    Errors, including unreadable or corrupt files, are reported in the 'error' field of the
+    record instead of being raised, so one bad file does not stop the batch.
+
+    :param file_path: Path to a workbook or a sheet's CSV export.
+    :param skip_models: Models not to evaluate again, e.g. those that already have results.
+    :return: List of result records, one per evaluated model.
+    """
+    from workbook import close_workbooks
+
+    records = []
+    try:
+        models = _models_for_file(file_path)
+        if not models:
+            return [{'source': file_path, 'model': None, 'error': "No Saline, Depleted or Economic sheet found"}]
+        for model in models:
+            if model in skip_models:
+                continue
+            record = {'source': file_path, 'model': model, 'error': None}
+            try:
+                record.update(_evaluate_model(model, file_path))
+            except Exception as error:
+                record['error'] = f"{type(error).__name__}: {error}"
+            records.append(record)
+    except Exception as error:
+        records.append({'source': file_path, 'model': None, 'error': f"{type(error).__name__}: {error}"})
+    finally:
+        # Each file is read once; do not keep its workbook in the worker.
+        close_workbooks()
+    return records
+
+def _clean(value):
+    return None if isinstance(value, float) and not math.isfinite(value) else value
+
+# Writers append to what the output already holds; run_batch only passes an existing
+# output when resuming.
+class _CsvWriter:
+    def __init__(self, path, columns):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=columns, extrasaction='ignore')
+        if new:
+            self._writer.writeheader()
+
+    def write(self, records):
+        self._writer.writerows(records)
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class _JsonlWriter:
+    def __init__(self, path, columns):
+        self._columns = columns
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, records):
+        for record in records:
+            self._file.write(json.dumps({column: _clean(record.get(column)) for column in self._columns}) + '\n')
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+class _ParquetWriter:
+    """
+    Writes a Parquet dataset: a directory of part files, each holding a block of rows.
+
+    New parts are numbered after the existing ones. Each part is written to a temporary
+    file and renamed, so an interrupted run never leaves a partial part behind.
+    """
+
+    def __init__(self, path, columns):
+        os.makedirs(path, exist_ok=True)
+        self._path = path
+        self._columns = columns
+        self._buffer = []
+        self._buffered_since = None
+        self._part = len(glob.glob(os.path.join(path, 'part-*.parquet')))
+
+    def write(self, records):
+        if not self._buffer:
+            self._buffered_since = time.monotonic()
+        self._buffer.extend(records)
+        if (len(self._buffer) >= PARQUET_ROWS_PER_PART
+                or time.monotonic() - self._buffered_since >= PARQUET_FLUSH_SECONDS):
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        import pandas as pd
+
+        frame = pd.DataFrame(self._buffer, columns=list(self._columns))
+        for column in self._columns[3:]:
+            frame[column] = frame[column].astype(float)
+        for column in self._columns[:3]:
+            frame[column] = frame[column].astype('string')
+        part = os.path.join(self._path, f'part-{self._part:05d}.parquet')
+        frame.to_parquet(part + '.tmp', index=False)
+        os.replace(part + '.tmp', part)
+        self._part += 1
+        self._buffer = []
+
+    def close(self):
+        self._flush()
+
+WRITERS = {
+    'csv': _CsvWriter,
+    'jsonl': _JsonlWriter,
+    'parquet': _ParquetWriter,
+}
+
+def _read_existing(output, output_format):
+    """
+    Read the source, model and error fields of the results already written.
+    """
+    if output_format == 'parquet':
+        import pandas as pd
+
+        parts = sorted(glob.glob(os.path.join(output, 'part-*.parquet')))
+        if not parts:
+            return []
+        frame = pd.concat([pd.read_parquet(part, columns=['source', 'model', 'error']) for part in parts])
+        return frame.astype(object).where(frame.notna(), None).to_dict('records')
+    with open(output, newline='', encoding='utf-8') as f:
+        if output_format == 'csv':
+            return [{'source': row['source'], 'model': row['model'] or None, 'error': row['error'] or None}
+                    for row in csv.DictReader(f)]
+        return [json.loads(line) for line in f if line.strip()]
+
+def _model_status(output, output_format):
+    """
+    Return, per source, whether the latest result of each model has no error.
+
+    A file-level error (model None) stands until a later run evaluates a model of the file.
+    """
+    status = {}
+    if not os.path.exists(output):
+        return status
+    for record in _read_existing(output, output_format):
+        models = status.setdefault(record['source'], {})
+        if record.get('model') is None:
+            models.clear()
+        else:
+            models.pop(None, None)
+        models[record.get('model')] = not record.get('error')
+    return status
+
+def completed_models(output, output_format):
+    """
+    Return the models that already have results without errors in an output.
+
+    :param output: Output file (csv, jsonl) or directory (parquet).
+    :param output_format: One of OUTPUT_FORMATS.
+    :return: Dict of source path to the set of completed models.
+    """
+    return {source: {model for model, ok in models.items() if ok}
+            for source, models in _model_status(output, output_format).items()}
+
+def completed_sources(output, output_format):
+    """
+    Return the files whose models all have results without errors in an output.
+
+    :param output: Output file (csv, jsonl) or directory (parquet).
+    :param output_format: One of OUTPUT_FORMATS.
+    :return: Set of source paths.
+    """
+    return {source for source, models in _model_status(output, output_format).items() if all(models.values())}
+
+def run_batch(files, output, output_format=None, max_workers=None, resume=False):
+    """
+    Evaluate project files in parallel and stream the results to an output as they finish.
+
+    :param files: Paths of the project files (see find_project_files).
+    :param output: Output file (csv, jsonl) or directory (parquet).
+    :param output_format: One of OUTPUT_FORMATS; inferred from the output extension if None.
+    :param max_workers: Worker processes; 1 evaluates in the calling process.
+    :param resume: Append to the output, skipping files that already have results without errors
+                   and, in the other files, the models that succeeded.
+    :return: Dict with the number of files evaluated, skipped and with errors.
+    """
+    output_format = output_format or os.path.splitext(output)[1].lstrip('.').lower()
+    if output_format not in WRITERS:
+        raise ValueError(f"Unknown output format '{output_format}'; use one of {', '.join(OUTPUT_FORMATS)}")
+    if os.path.exists(output) and not resume:
+        raise ValueError(f"Output '{output}' already exists; pass resume=True to continue it.")
+
+    done = completed_sources(output, output_format) if resume else set()
+    skip_models = completed_models(output, output_format) if resume else {}
+    pending = [os.path.abspath(f) for f in files if os.path.abspath(f) not in done]
+    stats = {'evaluated': 0, 'skipped': len(files) - len(pending), 'errors': 0}
+    writer = WRITERS[output_format](output, _result_columns())
+    try:
+        for records in _evaluate_files(pending, max_workers, skip_models):
+            writer.write(records)
+            stats['evaluated'] += 1
+            stats['errors'] += any(record['error'] for record in records)
+    finally:
+        writer.close()
+    return stats
+
+def _evaluate_files(files, max_workers, skip_models):
+    """
+    Yield the records of each file as soon as it is evaluated.
+
+    At most two files per worker are in flight, so a large batch never queues every file.
+    """
+    if max_workers == 1:
+        for file_path in files:
+            yield evaluate_file(file_path, skip_models.get(file_path, ()))
+        return
+    max_workers = max_workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        remaining = iter(files)
+        in_flight = set()
+        while True:
+            for file_path in remaining:
+                in_flight.add(executor.submit(evaluate_file, file_path, skip_models.get(file_path, ())))
+                if len(in_flight) >= 2 * max_workers:
+                    break
+            if not in_flight:
+                return
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                yield future.result()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate the Saline, Depleted and Economic models "
+                                                 "for many project workbooks or CSV exports.")
+    parser.add_argument('paths', nargs='*', help="Project files or directories to scan")
+    parser.add_argument('--manifest', help="File listing project paths, one per line (or a CSV with a 'path' column)")
+    parser.add_argument('--output', '-o', required=True, help="Output file (.csv, .jsonl) or directory (.parquet)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, help="Output format; defaults to the output extension")
+    parser.add_argument('--workers', type=int, help="Worker processes; defaults to the number of CPUs")
+    parser.add_argument('--resume', action='store_true', help="Skip files that already have results in the output")
+    args = parser.parse_args(argv)
+    if not args.paths and not args.manifest:
+        parser.error("give project paths or --manifest")
+
+    files = find_project_files(args.paths, args.manifest)
+    try:
+        stats = run_batch(files, args.output, args.format, args.workers, args.resume)
+    except ValueError as error:
+        parser.error(str(error))
+    print(f"Evaluated {stats['evaluated']} files ({stats['errors']} with errors), skipped {stats['skipped']}.",
+          file=sys.stderr)
+    return 1 if stats['errors'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Check the Python results against the outputs the workbook computed, as saved in the CSV exports.
+
+Every implementation is evaluated at the workbook inputs and compared with the value shown
+in the export, within half a unit of its last displayed digit. Outputs listed in
+KNOWN_DRIFT do not match the sheet yet; they are pinned to their current value instead,
+so they fail as soon as they change. Any mismatch exits with status 1, so performance
+work cannot change an answer unnoticed:
+
+    python benchmarks/golden_values.py
+"""
+import os
+import re
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+SALINE_CSV = os.path.join(REPO_ROOT, "Calculations for python - Saline Storage.csv")
+DEPLETED_CSV = os.path.join(REPO_ROOT, "Calculations for python - Depleted Field Storage.csv")
+ECONOMIC_CSV = os.path.join(REPO_ROOT, "Calculations for python.xlsx - Economic Analysis.csv")
+
+# Sheet outputs: (name, sheet, CSV export, label column, value column, label, occurrence).
+# Columns are zero-based and the exports keep the sheet layout, so the position of a value
+# is also its cell on the sheet.
+GOLDEN_OUTPUTS = (
+    ('storage_efficiency_no_dip', "Saline Storage", SALINE_CSV, 8, 10, 'Storage Efficiency - No Dip', 0),
+    ('storage_efficiency_dip', "Saline Storage", SALINE_CSV, 8, 10, 'Storage Efficiency - Dip', 0),
+    ('radius_dong_duan', "Saline Storage", SALINE_CSV, 8, 10, 'Radius', 0),
+    ('area_dong_duan', "Saline Storage", SALINE_CSV, 8, 10, 'Area', 0),
+    ('radius_nordbotten', "Saline Storage", SALINE_CSV, 8, 10, 'Radius', 1),
+    ('area_nordbotten', "Saline Storage", SALINE_CSV, 8, 10, 'Area', 1),
+    ('storage_capacity', "Depleted Field Storage", DEPLETED_CSV, 7, 10, 'Storage Capacity', 0),
+    ('npv', "Economic Analysis", ECONOMIC_CSV, 6, 7, 'Net Present Value (After-tax)', 0),
+    ('profitability_index', "Economic Analysis", ECONOMIC_CSV, 6, 7, 'Profitability index', 0),
+    ('irr', "Economic Analysis", ECONOMIC_CSV, 6, 7, 'IRR', 0),
+    ('years_to_breakeven', "Economic Analysis", ECONOMIC_CSV, 6, 7, 'Breakeven', 0),
+    ('unit_cost_wells_facilities', "Economic Analysis", ECONOMIC_CSV, 10, 11, 'Wells and Facilities', 0),
+    ('unit_cost_transportation', "Economic Analysis", ECONOMIC_CSV, 10, 11, 'Transportation', 0),
+    ('unit_cost_land_leasing', "Economic Analysis", ECONOMIC_CSV, 10, 11, 'Land & Leasing', 0),
+    ('unit_cost_opex', "Economic Analysis", ECONOMIC_CSV, 10, 11, 'Maintenance & OPEX', 0),
+    ('unit_revenue', "Economic Analysis", ECONOMIC_CSV, 10, 11, 'Revenue', 0),
+)
+
+# Outputs of hand-written functions that are known not to reproduce the sheet yet: their
+# current value, pinned within KNOWN_DRIFT_RTOL, and why they differ. They are printed on
+# every run; remove an entry once its function matches the sheet.
+KNOWN_DRIFT = {
+    ('saline_batch', 'storage_efficiency_no_dip'): (112000000.0, "placeholder formula, not the sheet's Saline Storage K8"),
+    ('saline_batch', 'storage_efficiency_dip'): (9761443.187737714, "placeholder formula, not the sheet's Saline Storage K9"),
+    ('saline_batch', 'radius_dong_duan'): (0.015811388300841896, "placeholder formula, not the sheet's Table 2"),
+    ('saline_batch', 'area_dong_duan'): (3.0324253413028886e-10, "placeholder formula, not the sheet's Table 2"),
+    ('saline_batch', 'radius_nordbotten'): (1.7801148225333374, "ETA and GAMMA placeholders"),
+    ('saline_batch', 'area_nordbotten'): (3.843670420187707e-06, "ETA and GAMMA placeholders"),
+    ('depleted_batch', 'storage_capacity'): (11125905.513706049, "Depleted Field Storage K9 also needs Bg from the "
+                                                                  "Z factor and the initial GOR, which are not inputs yet"),
+}
+KNOWN_DRIFT_RTOL = 1e-9
+
+# Outputs of saline_batch compared with the sheet, by golden name.
+SALINE_BATCH_GOLDEN = {
+    'storage_efficiency_no_dip': 'storage_efficiency_no_dip',
+    'storage_efficiency_dip': 'storage_efficiency_dip',
+    'radius_dong_duan': 'radius_dong',
+    'area_dong_duan': 'area_dong',
+    'radius_nordbotten': 'radius_nordbotten',
+    'area_nordbotten': 'area_nordbotten',
+}
+
+def _column_letters(number):
+    letters = ''
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+def displayed_tolerance(text):
+    """
+    Return the rounding error of a number as displayed on the sheet.
+
+    :param text: Cell text, e.g. "33.11", "18%" or "  10,513,353 ".
+    :return: Half a unit of the last displayed digit, in the units of the parsed value.
+    """
+    text = text.strip()
+    match = re.search(r'\.(\d+)', text)
+    decimals = len(match.group(1)) if match else 0
+    if text.endswith('%'):
+        decimals += 2
+    return 0.5 * 10.0 ** -decimals
+
+def read_golden_values():
+    """
+    Read the outputs of GOLDEN_OUTPUTS from the CSV exports.
+
+    :return: Dict of output name to (cell, value, tolerance), where cell is "Sheet!A1".
+    """
+    import pandas as pd
+
+    from input_schema import parse_sheet_numbers
+
+    frames = {}
+    golden = {}
+    for name, sheet, csv_path, label_column, value_column, label, occurrence in GOLDEN_OUTPUTS:
+        if csv_path not in frames:
+            frames[csv_path] = pd.read_csv(csv_path, header=None, dtype=str, keep_default_na=False)
+        frame = frames[csv_path]
+        rows = frame.index[frame.iloc[:, label_column].str.strip() == label]
+        if len(rows) <= occurrence:
+            raise ValueError(f"Required field '{label}' not found in the data.")
+        row = rows[occurrence]
+        text = frame.iat[row, value_column]
+        value = float(parse_sheet_numbers([text]).iloc[0])
+        golden[name] = (f"{sheet}!{_column_letters(value_column + 1)}{row + 1}", value, displayed_tolerance(text))
+    return golden
+
+def evaluate_implementations(golden, workbook_path=None):
+    """
+    Evaluate every implementation of the golden outputs at the workbook inputs.
+
+    :param golden: Result of read_golden_values.
+    :param workbook_path: Path to the Excel file; the repository workbook if None.
+    :return: Dict of implementation name to a dict of output name to value.
+    """
+    from cashflow_model import assumptions_from_inputs, evaluate_economics
+    from depleted_batch import calculate_depleted_batch
+    from economic_analysis import load_economic_sheet
+    from formula_compiler import compile_workbook
+    from input_schema import DEPLETED_SCHEMA, SALINE_SCHEMA, extract_inputs
+    from plume_series import calculate_plume_series
+    from saline_batch import calculate_saline_batch
+    from workbook import WORKBOOK_PATH, open_workbook
+
+    workbook_path = workbook_path or WORKBOOK_PATH
+    session = open_workbook(workbook_path)
+    saline_inputs = extract_inputs(session.sheet("Saline Storage"), SALINE_SCHEMA)._asdict()
+    depleted_inputs = extract_inputs(session.sheet("Depleted Field Storage"), DEPLETED_SCHEMA)._asdict()
+    economic_inputs = load_economic_sheet(workbook_path).inputs
+
+    cells = {name: cell for name, (cell, _, _) in golden.items()}
+    compiled = compile_workbook(workbook_path, targets=sorted(set(cells.values())))
+    workbook = compiled.evaluate()
+    series = calculate_plume_series(saline_inputs, horizon_years=saline_inputs['injection_time'])
+    saline = calculate_saline_batch(saline_inputs).iloc[0]
+    economics = evaluate_economics(assumptions_from_inputs(economic_inputs)).iloc[0]
+    return {
+        'formula_compiler': {name: float(workbook[cell]) for name, cell in cells.items()},
+        'plume_series': {name: float(getattr(series, name)[0, -1]) for name in
+                         ('radius_dong_duan', 'area_dong_duan', 'radius_nordbotten', 'area_nordbotten')},
+        'saline_batch': {name: float(saline[output]) for name, output in SALINE_BATCH_GOLDEN.items()},
+        'depleted_batch': {'storage_capacity': float(calculate_depleted_batch(depleted_inputs)['storage_capacity'].iloc[0])},
+        'cashflow_model': {name: float(economics[name]) for name in golden if name in economics.index},
+    }
+
+def main():
+    golden = read_golden_values()
+    results = evaluate_implementations(golden)
+    failed = False
+    for implementation, outputs in results.items():
+        for name, value in outputs.items():
+            cell, expected, tolerance = golden[name]
+            ok = abs(value - expected) <= tolerance * (1 + 1e-9)
+            pinned, reason = KNOWN_DRIFT.get((implementation, name), (None, None))
+            known = pinned is not None and abs(value - pinned) <= KNOWN_DRIFT_RTOL * abs(pinned)
+            failed |= not ok and not known
+            status = 'ok  ' if ok else 'drift' if known else 'FAIL'
+            note = ""
+            if pinned is not None:
+                note = (" (matches the sheet now; remove it from KNOWN_DRIFT)" if ok else f" (known: {reason})" if known
+                        else f" (changed from the pinned {pinned:.10g}: {reason})")
+            print(f"{status:<5} {implementation}.{name}: {value:.10g}, sheet {expected:.10g} +/- {tolerance:g} ({cell}){note}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""
+Check that the calculation modules import quickly and without heavy dependencies.
+
+Each module is imported in a fresh interpreter several times; the fastest import must
+stay within the budget and must not load any of HEAVY_MODULES. Exits with status 1 when
+a module is over budget, so it can gate a build:
+
+    python benchmarks/import_budget.py
+"""
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules the serverless functions import, and their import-time budget in milliseconds.
+IMPORT_BUDGETS_MS = {
+    'saline_calculations': 50,
+    'depleted_calculations': 50,
+    'economic_analysis': 50,
+}
+HEAVY_MODULES = ('numpy', 'pandas', 'scipy', 'openpyxl')
+RUNS = 5
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [name for name in {heavy!r} if name in sys.modules]
+print(elapsed, ','.join(heavy))
+"""
+
+def measure_import(module, runs=RUNS):
+    """
+    Measure the import of a module in fresh interpreters.
+
+    :param module: Module name, importable from the repository root.
+    :param runs: Number of interpreters to start.
+    :return: Tuple of the fastest import time in milliseconds and the heavy modules loaded.
+    """
+    times = []
+    heavy = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', _PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                                cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout.split()
+        times.append(float(output[0]))
+        heavy = output[1].split(',') if len(output) > 1 else []
+    return min(times), heavy
+
+def main():
+    failed = False
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        elapsed, heavy = measure_import(module)
+        ok = elapsed <= budget and not heavy
+        failed |= not ok
+        note = f" (loads {', '.join(heavy)})" if heavy else ""
+        print(f"{'ok  ' if ok else 'FAIL'} {module}: {elapsed:.1f} ms, budget {budget} ms{note}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
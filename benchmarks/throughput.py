@@ -0,0 +1,226 @@
+"""
+Time input extraction, scalar against batch calculation and IRR solving, and compare with
+the stored baselines.
+
+Each benchmark runs several times and its fastest run is kept. A benchmark slower than
+SLOWDOWN_LIMIT times its baseline fails and the script exits with status 1. Baselines are
+machine specific; record them again after changing machines or on purpose:
+
+    python benchmarks/throughput.py
+    python benchmarks/throughput.py --save
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from collections import namedtuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+BASELINES_PATH = os.path.join(REPO_ROOT, "benchmarks", "baselines.json")
+SALINE_CSV = os.path.join(REPO_ROOT, "Calculations for python - Saline Storage.csv")
+DEPLETED_CSV = os.path.join(REPO_ROOT, "Calculations for python - Depleted Field Storage.csv")
+ECONOMIC_CSV = os.path.join(REPO_ROOT, "Calculations for python.xlsx - Economic Analysis.csv")
+
+REPEATS = 5
+# Allowed ratio of a run to its baseline before it fails; generous, timings are noisy.
+SLOWDOWN_LIMIT = 3.0
+SCALAR_ROWS = 1_000
+BATCH_ROWS = 100_000
+ECONOMIC_SCALAR_ROWS = 20
+ECONOMIC_BATCH_ROWS = 1_000
+IRR_BATCH_SIZES = (1, 100, 10_000, 100_000)
+# Relative spread of the synthetic sites, fields and cash flows around the sheet case.
+SPREAD = 0.2
+SEED = 12345
+
+# setup() returns the arguments of run(); only run() is timed. rows is the number of
+# scenarios one run evaluates.
+Benchmark = namedtuple('Benchmark', ['name', 'rows', 'setup', 'run'])
+
+def _saline_scalar(sites):
+    import saline_calculations as saline
+
+    results = []
+    for site in sites:
+        radius_dong = saline.calculate_radius_dong(site['injection_rate'], site['reservoir_thickness'],
+                                                   site['injection_time'], site['porosity'], site['permeability'])
+        radius_nordbotten = saline.calculate_radius_nordbotten(site['injection_rate'], site['permeability'], site['porosity'])
+        results.append((
+            saline.calculate_storage_efficiency_no_dip(
+                site['injection_rate'], site['reservoir_thickness'], site['injection_time'], site['reservoir_depth'],
+                site['pressure_gradient'], site['reservoir_angle'], site['permeability'], site['water_salinity'],
+                site['CO2_relative_permeability'], site['water_relative_permeability'], site['temperature'], site['porosity']),
+            saline.calculate_reservoir_pressure(site['reservoir_depth'], site['pressure_gradient']),
+            saline.calculate_density(site['CO2_density'], site['water_density']),
+            saline.calculate_area_dong(radius_dong),
+            saline.calculate_area_nordbotten(radius_nordbotten),
+        ))
+    return results
+
+def _depleted_scalar(fields):
+    import depleted_calculations as depleted
+
+    results = []
+    for field in fields:
+        gas_produced_rb = depleted.calculate_gas_produced_rb(field['gas_produced'], field['Bg'])
+        reservoir_bbl_produced_rb = depleted.calculate_reservoir_bbl_produced_rb(field['oil_produced'], field['formation_oil_factor'])
+        total_fluid_rb = depleted.calculate_total_fluid_rb(gas_produced_rb, field['water_produced'], reservoir_bbl_produced_rb)
+        results.append((
+            depleted.calculate_solution_gas_produced_rb(field['original_gas_in_place'], field['gas_produced'], field['Bg']),
+            depleted.calculate_total_fluid_kg(total_fluid_rb, field['CO2_density']),
+            depleted.calculate_storage_capacity(field['original_oil_in_place'], field['original_gas_in_place'], field['CO2_density']),
+        ))
+    return results
+
+def _vary(rng, base, fields, size):
+    """
+    Return a DataFrame of size scenarios whose fields vary uniformly by SPREAD around base.
+    """
+    import numpy as np
+    import pandas as pd
+
+    frame = pd.DataFrame({name: np.full(size, value) for name, value in base.items()})
+    for name in fields:
+        frame[name] = base[name] * rng.uniform(1 - SPREAD, 1 + SPREAD, size)
+    return frame
+
+def build_benchmarks():
+    """
+    Build the benchmarks from the sheet inputs.
+
+    :return: List of Benchmark.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from cashflow_model import ECONOMIC_INPUT_LABELS, assumptions_from_inputs, build_cash_flows, evaluate_economics
+    from depleted_batch import DEPLETED_BATCH_INPUTS, calculate_depleted_batch
+    from economic_analysis import calculate_irr, load_economic_sheet
+    from input_schema import DEPLETED_SCHEMA, SALINE_SCHEMA, extract_inputs
+    from irr_solver import irr_batch
+    from saline_batch import SALINE_BATCH_INPUTS, calculate_saline_batch
+    from saline_calculations import extract_saline_data
+    from workbook import WORKBOOK_PATH, close_workbooks, open_workbook
+
+    rng = np.random.default_rng(SEED)
+    saline_inputs = extract_inputs(open_workbook().sheet("Saline Storage"), SALINE_SCHEMA)._asdict()
+    depleted_inputs = extract_inputs(open_workbook().sheet("Depleted Field Storage"), DEPLETED_SCHEMA)._asdict()
+    assumptions = assumptions_from_inputs(load_economic_sheet(WORKBOOK_PATH).inputs)
+
+    saline_sites = _vary(rng, saline_inputs, SALINE_BATCH_INPUTS, BATCH_ROWS)
+    depleted_fields = _vary(rng, depleted_inputs, DEPLETED_BATCH_INPUTS, BATCH_ROWS)
+    economic_fields = [name for name in ECONOMIC_INPUT_LABELS
+                       if name != 'injection_start' and isinstance(assumptions[name], float) and assumptions[name]]
+    projects = _vary(rng, assumptions, economic_fields, ECONOMIC_BATCH_ROWS)
+    saline_records = saline_sites.iloc[:SCALAR_ROWS].to_dict('records')
+    depleted_records = depleted_fields.iloc[:SCALAR_ROWS].to_dict('records')
+    scalar_projects = [projects.iloc[[i]] for i in range(ECONOMIC_SCALAR_ROWS)]
+    base_flows = build_cash_flows(assumptions)['after_tax_cash_flow'][0]
+    cash_flows = base_flows * rng.uniform(1 - SPREAD, 1 + SPREAD, (max(IRR_BATCH_SIZES), base_flows.size))
+
+    def cold():
+        close_workbooks()
+        return ()
+
+    benchmarks = [
+        Benchmark('extract_saline_xlsx', 1, cold,
+                  lambda: extract_inputs(open_workbook().sheet("Saline Storage"), SALINE_SCHEMA)),
+        Benchmark('extract_saline_csv', 1, lambda: (),
+                  lambda: extract_inputs(extract_saline_data(SALINE_CSV), SALINE_SCHEMA)),
+        Benchmark('extract_depleted_xlsx', 1, cold,
+                  lambda: extract_inputs(open_workbook().sheet("Depleted Field Storage"), DEPLETED_SCHEMA)),
+        Benchmark('extract_depleted_csv', 1, lambda: (),
+                  lambda: extract_inputs(pd.read_csv(DEPLETED_CSV, header=None), DEPLETED_SCHEMA)),
+        Benchmark('extract_economic_xlsx', 1, cold, lambda: load_economic_sheet(WORKBOOK_PATH)),
+        Benchmark('extract_economic_csv', 1, lambda: (), lambda: load_economic_sheet(ECONOMIC_CSV)),
+        Benchmark('saline_scalar', SCALAR_ROWS, lambda: (), lambda: _saline_scalar(saline_records)),
+        Benchmark('saline_batch', BATCH_ROWS, lambda: (), lambda: calculate_saline_batch(saline_sites)),
+        Benchmark('depleted_scalar', SCALAR_ROWS, lambda: (), lambda: _depleted_scalar(depleted_records)),
+        Benchmark('depleted_batch', BATCH_ROWS, lambda: (), lambda: calculate_depleted_batch(depleted_fields)),
+        Benchmark('economic_scalar', ECONOMIC_SCALAR_ROWS, lambda: (),
+                  lambda: [evaluate_economics(project) for project in scalar_projects]),
+        Benchmark('economic_batch', ECONOMIC_BATCH_ROWS, lambda: (), lambda: evaluate_economics(projects)),
+        Benchmark('irr_scalar', 100, lambda: (), lambda: [calculate_irr(row) for row in cash_flows[:100]]),
+    ]
+    for size in IRR_BATCH_SIZES:
+        benchmarks.append(Benchmark(f'irr_batch_{size}', size, lambda: (), lambda size=size: irr_batch(cash_flows[:size])))
+    return benchmarks
+
+def measure(benchmark, repeats=REPEATS):
+    """
+    Time a benchmark.
+
+    :param benchmark: Benchmark.
+    :param repeats: Number of timed runs.
+    :return: Fastest run in seconds.
+    """
+    times = []
+    for _ in range(repeats):
+        args = benchmark.setup()
+        start = time.perf_counter()
+        benchmark.run(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def load_baselines(path=BASELINES_PATH):
+    """
+    Load the stored baselines.
+
+    :param path: Path to the baselines JSON file.
+    :return: Dict of benchmark name to seconds; empty if no baselines are stored.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path) as file:
+        return json.load(file)['seconds']
+
+def save_baselines(timings, path=BASELINES_PATH):
+    """
+    Store timings as the new baselines, with the versions they were measured on.
+
+    :param timings: Dict of benchmark name to seconds.
+    :param path: Path to the baselines JSON file.
+    """
+    import numpy as np
+    import pandas as pd
+
+    baselines = {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'machine': platform.machine(),
+        'seconds': {name: round(seconds, 6) for name, seconds in timings.items()},
+    }
+    with open(path, 'w') as file:
+        json.dump(baselines, file, indent=2)
+        file.write('\n')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--save', action='store_true', help="store the timings as the new baselines")
+    parser.add_argument('--limit', type=float, default=SLOWDOWN_LIMIT, help="allowed slowdown against the baselines")
+    args = parser.parse_args(argv)
+
+    baselines = load_baselines()
+    timings = {}
+    failed = False
+    for benchmark in build_benchmarks():
+        seconds = timings[benchmark.name] = measure(benchmark)
+        baseline = baselines.get(benchmark.name)
+        ok = baseline is None or args.save or seconds <= baseline * args.limit
+        failed |= not ok
+        note = f", baseline {baseline * 1000:.2f} ms ({seconds / baseline:.2f}x)" if baseline else ", no baseline"
+        rate = f", {benchmark.rows / seconds:,.0f} rows/s" if benchmark.rows > 1 else ""
+        print(f"{'ok  ' if ok else 'FAIL'} {benchmark.name}: {seconds * 1000:.2f} ms{rate}{note}")
+    if args.save:
+        save_baselines(timings)
+        print(f"Saved baselines to {BASELINES_PATH}")
+        return 0
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
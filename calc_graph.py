@@ -0,0 +1,242 @@
+from collections import namedtuple
+from functools import partial
+
+import numpy as np
+
+import depleted_calculations as depleted
+import saline_calculations as saline
+from cashflow_model import (ECONOMIC_INPUT_LABELS, assumptions_from_inputs, build_cash_flows, discount_cash_flows,
+                            solve_irr, summarize_cash_flows)
+from economic_analysis import load_economic_sheet
+from input_schema import DEPLETED_SCHEMA, SALINE_SCHEMA, extract_inputs
+from workbook import WORKBOOK_PATH, open_workbook
+
+# A calculated cell: function called with keyword arguments taken from the named inputs.
+Node = namedtuple('Node', ['name', 'function', 'inputs'])
+
+# Parameters the storage-efficiency functions accept but never read. They are bound to
+# None so the efficiency nodes do not depend on them.
+UNUSED_EFFICIENCY_INPUTS = ('injection_rate', 'reservoir_depth', 'pressure_gradient', 'water_salinity',
+                            'water_relative_permeability', 'temperature')
+
+class CalcGraph:
+    """
+    Inputs and calculated nodes with the dependencies between them, recalculated lazily.
+
+    Setting an input marks every node downstream of it dirty; a dirty node is recomputed
+    the next time it is read and every other node is served from cache, the way Excel
+    recalculates a workbook after an edit.
+    """
+
+    def __init__(self, inputs=None):
+        """
+        :param inputs: Optional mapping of input name to initial value.
+        """
+        self._values = dict(inputs or {})
+        self._nodes = {}
+        self._dependents = {}
+        self._dirty = set()
+        self.evaluations = {}
+
+    def add(self, name, function, inputs):
+        """
+        Add a calculated node.
+
+        The node depends on exactly the declared inputs, so declare only what the function
+        reads; bind parameters it accepts but ignores before adding it.
+
+        :param name: Name of the node.
+        :param function: Function computing the node.
+        :param inputs: Names of the inputs or nodes feeding the function parameters of the
+                       same name, or a mapping of function parameter to input or node.
+        """
+        if name in self._values or name in self._nodes:
+            raise ValueError(f"Node '{name}' already exists.")
+        sources = dict(inputs) if isinstance(inputs, dict) else {source: source for source in inputs}
+        unknown = [source for source in sources.values() if source not in self._values and source not in self._nodes]
+        if unknown:
+            raise ValueError(f"Unknown inputs for '{name}': {', '.join(unknown)}")
+        self._nodes[name] = Node(name, function, sources)
+        for source in set(sources.values()):
+            self._dependents.setdefault(source, set()).add(name)
+        self._dirty.add(name)
+
+    def set_input(self, name, value):
+        """
+        Change an input and mark the nodes depending on it dirty.
+
+        :param name: Name of the input.
+        :param value: New value. Setting the current value again invalidates nothing.
+        """
+        if name not in self._values:
+            raise KeyError(f"Unknown input '{name}'")
+        if _same_value(self._values[name], value):
+            return
+        self._values[name] = value
+        self._mark_dirty(name)
+
+    def set_inputs(self, values):
+        """
+        Change several inputs at once.
+
+        :param values: Mapping of input name to new value.
+        """
+        for name, value in values.items():
+            self.set_input(name, value)
+
+    def _mark_dirty(self, name):
+        stack = list(self._dependents.get(name, ()))
+        while stack:
+            node = stack.pop()
+            if node not in self._dirty:
+                self._dirty.add(node)
+                # A node already dirty has had its dependents marked when it became dirty.
+                stack.extend(self._dependents.get(node, ()))
+
+    def dependents(self, name):
+        """
+        Return every node that depends, directly or not, on an input or node.
+
+        :param name: Name of the input or node.
+        :return: Set of node names.
+        """
+        found = set()
+        stack = list(self._dependents.get(name, ()))
+        while stack:
+            node = stack.pop()
+            if node not in found:
+                found.add(node)
+                stack.extend(self._dependents.get(node, ()))
+        return found
+
+    def is_dirty(self, name):
+        """
+        :param name: Name of a node.
+        :return: True if the node will be recomputed on its next read.
+        """
+        return name in self._dirty
+
+    def get(self, name):
+        """
+        Return the value of an input or node, recomputing dirty nodes it depends on.
+
+        :param name: Name of the input or node.
+        :return: The value.
+        """
+        if name not in self._dirty:
+            if name not in self._values:
+                raise KeyError(f"Unknown input or node '{name}'")
+            return self._values[name]
+        node = self._nodes[name]
+        arguments = {param: self.get(source) for param, source in node.inputs.items()}
+        self._values[name] = node.function(**arguments)
+        self._dirty.discard(name)
+        self.evaluations[name] = self.evaluations.get(name, 0) + 1
+        return self._values[name]
+
+    def results(self, names=None):
+        """
+        Return the values of several nodes.
+
+        :param names: Node names; defaults to every node, in the order they were added.
+        :return: Dict of node name to value.
+        """
+        return {name: self.get(name) for name in (self._nodes if names is None else names)}
+
+def _same_value(old, new):
+    """
+    Return True if an input keeps its value, so nothing downstream needs recomputing.
+    """
+    try:
+        return bool(np.all(old == new)) and np.shape(old) == np.shape(new)
+    except (TypeError, ValueError):
+        return False
+
+def saline_graph(inputs):
+    """
+    Build the calculation graph of the Saline tab.
+
+    :param inputs: Mapping of saline input (see SALINE_SCHEMA) to value.
+    :return: CalcGraph with one node per saline output.
+    """
+    graph = CalcGraph({field: inputs[field] for field in SALINE_SCHEMA.fields})
+    unused = dict.fromkeys(UNUSED_EFFICIENCY_INPUTS)
+    efficiency_inputs = ('permeability', 'injection_time', 'reservoir_thickness', 'porosity', 'CO2_relative_permeability')
+    graph.add('storage_efficiency_no_dip', partial(saline.calculate_storage_efficiency_no_dip, reservoir_angle=None, **unused),
+              efficiency_inputs)
+    graph.add('storage_efficiency_dip', partial(saline.calculate_storage_efficiency_with_dip, **unused),
+              efficiency_inputs + ('reservoir_angle',))
+    graph.add('radius', saline.calculate_radius_dong_duan, ('injection_rate', 'permeability', 'porosity'))
+    graph.add('area', saline.calculate_area, ('radius',))
+    graph.add('reservoir_pressure', saline.calculate_reservoir_pressure, ('reservoir_depth', 'pressure_gradient'))
+    graph.add('delta_density', saline.calculate_density, ('CO2_density', 'water_density'))
+    graph.add('radius_dong', saline.calculate_radius_dong,
+              ('injection_rate', 'reservoir_thickness', 'injection_time', 'porosity', 'permeability'))
+    graph.add('area_dong', saline.calculate_area_dong, {'radius': 'radius_dong'})
+    graph.add('radius_nordbotten', saline.calculate_radius_nordbotten, ('injection_rate', 'permeability', 'porosity'))
+    graph.add('area_nordbotten', saline.calculate_area_nordbotten, {'radius': 'radius_nordbotten'})
+    return graph
+
+def depleted_graph(inputs):
+    """
+    Build the calculation graph of the Depleted tab.
+
+    :param inputs: Mapping of depleted input (see DEPLETED_SCHEMA) to value.
+    :return: CalcGraph with one node per depleted output.
+    """
+    graph = CalcGraph({field: inputs[field] for field in DEPLETED_SCHEMA.fields})
+    graph.add('gas_produced_rb', depleted.calculate_gas_produced_rb, ('gas_produced', 'Bg'))
+    graph.add('solution_gas_produced_rb', depleted.calculate_solution_gas_produced_rb,
+              ('original_gas_in_place', 'gas_produced', 'Bg'))
+    graph.add('reservoir_bbl_produced_rb', depleted.calculate_reservoir_bbl_produced_rb, ('oil_produced', 'formation_oil_factor'))
+    graph.add('total_fluid_rb', depleted.calculate_total_fluid_rb,
+              ('gas_produced_rb', 'water_produced', 'reservoir_bbl_produced_rb'))
+    graph.add('total_fluid_kg', depleted.calculate_total_fluid_kg, ('total_fluid_rb', 'CO2_density'))
+    graph.add('storage_capacity', depleted.calculate_storage_capacity,
+              ('original_oil_in_place', 'original_gas_in_place', 'CO2_density'))
+    return graph
+
+def _undiscounted_schedule(**assumptions):
+    # Discounted at 0%; the discounting node applies the real rate.
+    return build_cash_flows(dict(assumptions, discount_rate=0.0))
+
+def economic_graph(assumptions):
+    """
+    Build the calculation graph of the Economic Analysis tab.
+
+    The undiscounted yearly cash flows are one node fed by every assumption except the
+    discount rate. The IRR is solved from them alone, and a discounting node applies the
+    rate for NPV, profitability index and breakeven, so a new discount rate does not
+    re-solve the IRR.
+
+    :param assumptions: Mapping of assumption field (see ECONOMIC_INPUT_LABELS) to value.
+    :return: CalcGraph with the cash-flow, schedule, IRR, summary and headline output nodes.
+    """
+    graph = CalcGraph({field: assumptions[field] for field in ECONOMIC_INPUT_LABELS})
+    graph.add('cash_flows', _undiscounted_schedule, [field for field in ECONOMIC_INPUT_LABELS if field != 'discount_rate'])
+    graph.add('irr_values', solve_irr, {'schedule': 'cash_flows'})
+    graph.add('cash_flow_schedule', discount_cash_flows, {'schedule': 'cash_flows', 'discount_rate': 'discount_rate'})
+    graph.add('economic_summary', summarize_cash_flows, {'schedule': 'cash_flow_schedule', 'irr': 'irr_values'})
+    graph.add('irr', lambda irr_values: float(irr_values[0]), ('irr_values',))
+    for output in ('npv', 'profitability_index', 'years_to_breakeven'):
+        graph.add(output, lambda summary, output=output: float(summary[output].iloc[0]), {'summary': 'economic_summary'})
+    return graph
+
+def workbook_graphs(file_path=WORKBOOK_PATH):
+    """
+    Build the Saline, Depleted and Economic graphs from the inputs on the workbook.
+
+    The workbook is read once here; afterwards inputs are changed on the graphs directly.
+
+    :param file_path: Path to the Excel file.
+    :return: Dict with 'saline', 'depleted' and 'economic' CalcGraphs.
+    """
+    session = open_workbook(file_path)
+    saline_inputs = extract_inputs(session.sheet("Saline Storage"), SALINE_SCHEMA)._asdict()
+    depleted_inputs = extract_inputs(session.sheet("Depleted Field Storage"), DEPLETED_SCHEMA)._asdict()
+    assumptions = assumptions_from_inputs(load_economic_sheet(file_path).inputs)
+    return {
+        'saline': saline_graph(saline_inputs),
+        'depleted': depleted_graph(depleted_inputs),
+        'economic': economic_graph(assumptions),
+    }
@@ -0,0 +1,276 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from irr_solver import irr_batch
+
+# The financial model on the Economic Analysis sheet runs for 101 yearly columns (I:DE)
+# starting on 1 January 2025.
+MODEL_START = datetime.date(2025, 1, 1)
+MODEL_YEARS = 101
+CAPEX_SCHEDULE_YEARS = 4
+BREAKEVEN_LIMIT = 50
+
+# Assumption fields and the labels they sit under on the sheet.
+ECONOMIC_INPUT_LABELS = {
+    'transport_storage_fee': 'Transport and Storage Fee',
+    'carbon_credits': 'Carbon Credits',
+    'project_life': 'Project Life: Years of injection',
+    'injection_rate': 'Injection Rate',
+    'escalation': 'Escalation',
+    'tax_rate': 'Tax Rate',
+    'discount_rate': 'Discount Factor',
+    'injection_start': 'Injection Start Date',
+    'general_admin': 'Yearly G&A expenses',
+    'opex_escalation': 'Opex Escalation',
+    'legacy_wells': 'Number of legacy wells in storage area',
+    'remediation_fraction': 'Percent of legacy wells for remediation',
+    'remediation_cost': 'Well remediation cost',
+    'injection_wells': 'Number of Injection Wells',
+    'injection_well_cost': 'Injection Wells Cost',
+    'monitor_wells': 'Number of Monitor Wells',
+    'monitor_well_cost': 'Monitor Wells Cost',
+    'monitoring_cost': 'Yearly Monitoring Cost',
+    'compression_capex': 'Compression capex',
+    # Listed on the sheet but not referenced by any model row.
+    'facilities_capex': 'Facilities capex',
+    'misc_costs': 'Miscellaneous costs',
+    'maintenance_rate': 'Yearly maintenance costs',
+    'power_price': 'Compression: Power price',
+    'suction_pressure': 'Compression: Suction pressure',
+    'discharge_pressure': 'Compression: Discharge pressure',
+    'pipeline_distance': 'Pipeline distance',
+    'pipeline_diameter': 'Pipeline diameter',
+    'pipeline_cost': 'Pipeline cost',
+    'lease_bonus': 'Up-front bonus payment',
+    'lease_fee': 'Yearly lease fee prior to injection',
+    'injection_fee': 'Injection fee to landowner',
+    'capex_year_0': 'Year 0',
+    'capex_year_1': 'Year 1',
+    'capex_year_2': 'Year 2',
+    'capex_year_3': 'Year 3',
+}
+
+ECONOMIC_OUTPUTS = (
+    'npv', 'profitability_index', 'irr', 'years_to_breakeven', 'unit_cost_wells_facilities',
+    'unit_cost_transportation', 'unit_cost_land_leasing', 'unit_cost_opex', 'unit_revenue',
+)
+
+def assumptions_from_inputs(inputs):
+    """
+    Map the assumption block of the Economic Analysis sheet onto model fields.
+
+    :param inputs: Dict of sheet label to value, as in load_economic_sheet(...).inputs.
+    :return: Dict of assumption field to value.
+    """
+    missing = [label for label in ECONOMIC_INPUT_LABELS.values() if label not in inputs]
+    if missing:
+        raise ValueError(f"Required field '{missing[0]}' not found in the data.")
+    return {field: inputs[label] for field, label in ECONOMIC_INPUT_LABELS.items()}
+
+def _as_dates(value, size):
+    """
+    Return a datetime64[D] array of the given size from dates or date arrays.
+    """
+    return np.broadcast_to(np.asarray(value, dtype='datetime64[D]'), (size,))
+
+def calculate_compression_power_cost(injection_rate, suction_pressure, discharge_pressure, power_price):
+    """
+    Calculate the yearly compression power cost.
+
+    :param injection_rate: Injection rate in tons per year.
+    :param suction_pressure: Suction pressure in psig.
+    :param discharge_pressure: Discharge pressure in psig.
+    :param power_price: Power price in $/kWh.
+    :return: Yearly power cost in $ million.
+    """
+    mass_rate = injection_rate * 0.0000317097919837646  # kg/s
+    suction_kpa = (suction_pressure + 14.696) / 0.145038
+    discharge_kpa = (discharge_pressure + 14.696) / 0.145038
+    horsepower = 243.406 * ((discharge_kpa / suction_kpa) ** 0.222 - 1) * mass_rate * 1.788
+    power_usage = horsepower * 8760 / 1.34102  # kWh per year
+    return power_usage * power_price / 1000000
+
+def build_cash_flows(assumptions, model_start=MODEL_START, model_years=MODEL_YEARS):
+    """
+    Build the yearly cash-flow schedule for a batch of assumption sets.
+
+    Follows the "Backend Calculations" block of the Economic Analysis sheet line by line.
+    Every line is a 2-D array with one row per assumption set and one column per year.
+
+    :param assumptions: DataFrame or mapping of assumption field (see ECONOMIC_INPUT_LABELS)
+                        to a scalar or an array with one value per assumption set.
+    :param model_start: Date of the first model year.
+    :param model_years: Number of model years.
+    :return: Dict of schedule line name to 2-D array, in $ million unless noted.
+    """
+    missing = [field for field in ECONOMIC_INPUT_LABELS if field not in assumptions]
+    if missing:
+        raise ValueError(f"Missing economic assumptions: {', '.join(missing)}")
+
+    numeric = [field for field in ECONOMIC_INPUT_LABELS if field != 'injection_start']
+    values = np.broadcast_arrays(*(np.atleast_1d(np.asarray(assumptions[field], dtype=float)) for field in numeric))
+    a = {field: value.ravel()[:, np.newaxis] for field, value in zip(numeric, values)}
+    scenarios = values[0].size
+    years = np.arange(model_years)
+
+    # Timeline: one column per year on the anniversary month of the model start.
+    start_month = np.datetime64(model_start, 'M')
+    dates = (start_month + 12 * years).astype('datetime64[D]') + (np.datetime64(model_start, 'D') - np.datetime64(start_month, 'D'))
+    injection_start = _as_dates(assumptions['injection_start'], scenarios)[:, np.newaxis]
+    injection_months = np.rint(a['project_life'] * 12).astype(int)
+    # End date is EOMONTH(start, years * 12 - 1).
+    injection_end = (injection_start.astype('datetime64[M]') + injection_months).astype('datetime64[D]') - np.timedelta64(1, 'D')
+    injection_period = ((dates >= injection_start) & (dates < injection_end)).astype(float)
+
+    escalation = (1 + a['escalation']) ** years
+    opex_escalation = (1 + a['opex_escalation']) ** years
+    capex_schedule = np.zeros((scenarios, model_years))
+    for year in range(min(CAPEX_SCHEDULE_YEARS, model_years)):
+        capex_schedule[:, year] = a[f'capex_year_{year}'][:, 0]
+    co2_volume = a['injection_rate'] / 1000000 * np.ones(model_years)  # Mt per year
+
+    # Revenue
+    carbon_credits = injection_period * co2_volume * a['carbon_credits']
+    transport_storage_fee = injection_period * co2_volume * a['transport_storage_fee']
+    total_revenue = carbon_credits + transport_storage_fee
+
+    # Operating costs
+    monitoring = -injection_period * a['monitoring_cost']
+    power = -injection_period * calculate_compression_power_cost(
+        a['injection_rate'], a['suction_pressure'], a['discharge_pressure'], a['power_price'])
+    general_admin = -injection_period * a['general_admin']
+    total_opex = monitoring + power + general_admin
+    total_opex_escalated = total_opex * opex_escalation
+
+    # Storage: wells, remediation, surveillance and facilities capex
+    injection_wells = -a['injection_well_cost'] * a['injection_wells'] * capex_schedule
+    monitor_wells = -a['monitor_well_cost'] * a['monitor_wells'] * capex_schedule
+    well_remediation = -a['legacy_wells'] * a['remediation_cost'] * a['remediation_fraction'] * capex_schedule
+    misc = -a['misc_costs'] * capex_schedule
+    compression = -a['compression_capex'] * capex_schedule
+    wells_facilities_capex = injection_wells + monitor_wells + well_remediation + misc + compression
+    wells_facilities_capex_escalated = wells_facilities_capex * escalation
+
+    # Pipeline transportation
+    pipeline_cost = -a['pipeline_distance'] * a['pipeline_diameter'] * a['pipeline_cost'] / 1000000
+    pipeline_maintenance = injection_period * pipeline_cost * a['maintenance_rate']
+    pipeline_capex = pipeline_cost * capex_schedule
+    transport_capex = pipeline_maintenance + pipeline_capex
+    transport_capex_escalated = transport_capex * escalation
+
+    # Land and leasing
+    bonus_payment = np.zeros((scenarios, model_years))
+    bonus_payment[:, 0] = -a['lease_bonus'][:, 0]
+    rental_fee = -(dates <= injection_start).astype(float) * a['lease_fee']
+    injection_fee = -injection_period * co2_volume * a['injection_fee']
+    total_land_leasing = bonus_payment + rental_fee + injection_fee
+    total_land_leasing_escalated = total_land_leasing * escalation
+
+    # Cash flows
+    total_capex = wells_facilities_capex + transport_capex + bonus_payment
+    net_cash_flow = wells_facilities_capex + total_land_leasing + total_opex + total_revenue + transport_capex
+    net_cash_flow_escalated = (wells_facilities_capex_escalated + total_land_leasing_escalated + total_opex_escalated
+                               + total_revenue + transport_capex_escalated)
+    after_tax_cash_flow = (1 - a['tax_rate']) * net_cash_flow_escalated
+
+    schedule = {
+        'dates': np.broadcast_to(dates, (scenarios, model_years)),
+        'injection_period': injection_period,
+        'escalation': escalation,
+        'opex_escalation': opex_escalation,
+        'co2_injected': injection_period * co2_volume,
+        'total_revenue': total_revenue,
+        'total_opex_escalated': total_opex_escalated,
+        'wells_facilities_capex_escalated': wells_facilities_capex_escalated,
+        'transport_capex_escalated': transport_capex_escalated,
+        'total_land_leasing_escalated': total_land_leasing_escalated,
+        'total_capex': total_capex,
+        'net_cash_flow': net_cash_flow,
+        'net_cash_flow_escalated': net_cash_flow_escalated,
+        'after_tax_cash_flow': after_tax_cash_flow,
+    }
+    return discount_cash_flows(schedule, a['discount_rate'])
+
+def discount_cash_flows(schedule, discount_rate):
+    """
+    Add the discounting lines to a cash-flow schedule.
+
+    Only these lines depend on the discount rate, so a schedule can be discounted again at
+    another rate without rebuilding the undiscounted lines.
+
+    :param schedule: Dict of schedule lines as returned by build_cash_flows.
+    :param discount_rate: Discount rate, a scalar or one value per assumption set.
+    :return: New dict with the discount_factor, discounted_cash_flow and
+             cumulative_discounted_cash_flow lines set for the rate.
+    """
+    years = np.arange(schedule['after_tax_cash_flow'].shape[1], dtype=float)
+    rate = np.atleast_1d(np.asarray(discount_rate, dtype=float)).ravel()[:, np.newaxis]
+    discount_factor = (1 + rate) ** -years
+    discounted_cash_flow = schedule['after_tax_cash_flow'] * discount_factor
+    return dict(schedule, discount_factor=discount_factor, discounted_cash_flow=discounted_cash_flow,
+                cumulative_discounted_cash_flow=np.cumsum(discounted_cash_flow, axis=1))
+
+def solve_irr(schedule):
+    """
+    Solve the IRR of every assumption set from its after-tax cash flows.
+
+    :param schedule: Dict of schedule lines as returned by build_cash_flows, discounted or not.
+    :return: Array of IRRs, NaN where the solver found no root or did not converge, as
+             economic_analysis.calculate_irr raises for a single project.
+    """
+    irr, converged = irr_batch(schedule['after_tax_cash_flow'])
+    return np.where(converged, irr, np.nan)
+
+def summarize_cash_flows(schedule, index=None, irr=None):
+    """
+    Calculate the headline economic outputs from a cash-flow schedule.
+
+    :param schedule: Dict of schedule lines as returned by build_cash_flows.
+    :param index: Optional index for the returned rows.
+    :param irr: IRR per assumption set if already solved (see solve_irr); solved from the
+                after-tax cash flows if None. The IRR does not depend on the discount rate.
+    :return: DataFrame with one row per assumption set: NPV ($ million, after tax),
+             profitability index, IRR (NaN when it does not converge), years to
+             breakeven (NaN when over 50) and unit costs in $/t. The IRR treats the yearly flows as evenly spaced, where the
+             sheet's XIRR counts days, so the two differ in the fourth decimal.
+    """
+    discount_factor = schedule['discount_factor']
+    total_co2 = schedule['co2_injected'].sum(axis=1)
+
+    npv = schedule['discounted_cash_flow'].sum(axis=1)
+    profitability_index = -(discount_factor * schedule['net_cash_flow_escalated']).sum(axis=1) / schedule['total_capex'].sum(axis=1)
+    if irr is None:
+        irr = solve_irr(schedule)
+    breakeven = (schedule['cumulative_discounted_cash_flow'] <= 0).sum(axis=1).astype(float)
+    breakeven[breakeven > BREAKEVEN_LIMIT] = np.nan
+
+    def unit_cost(line):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (schedule[line] * discount_factor).sum(axis=1) / total_co2
+
+    return pd.DataFrame({
+        'npv': npv,
+        'profitability_index': profitability_index,
+        'irr': irr,
+        'years_to_breakeven': breakeven,
+        'unit_cost_wells_facilities': unit_cost('wells_facilities_capex_escalated'),
+        'unit_cost_transportation': unit_cost('transport_capex_escalated'),
+        'unit_cost_land_leasing': unit_cost('total_land_leasing_escalated'),
+        'unit_cost_opex': unit_cost('total_opex_escalated'),
+        'unit_revenue': unit_cost('total_revenue'),
+    }, index=index)
+
+def evaluate_economics(assumptions, model_start=MODEL_START, model_years=MODEL_YEARS):
+    """
+    Calculate the headline economic outputs for a batch of assumption sets.
+
+    :param assumptions: DataFrame or mapping of assumption field to a scalar or an array.
+    :param model_start: Date of the first model year.
+    :param model_years: Number of model years.
+    :return: DataFrame with one row per assumption set (see summarize_cash_flows).
+    """
+    schedule = build_cash_flows(assumptions, model_start, model_years)
+    index = assumptions.index if isinstance(assumptions, pd.DataFrame) else None
+    return summarize_cash_flows(schedule, index)
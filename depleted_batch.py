@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+import depleted_calculations as depleted
+
+DEPLETED_BATCH_INPUTS = (
+    'original_oil_in_place', 'original_gas_in_place', 'gas_produced', 'oil_produced', 'water_produced',
+    'Bg', 'formation_oil_factor', 'CO2_density',
+)
+
+DEPLETED_BATCH_OUTPUTS = (
+    'gas_produced_rb', 'solution_gas_produced_rb', 'reservoir_bbl_produced_rb', 'total_fluid_rb',
+    'total_fluid_kg', 'storage_capacity',
+)
+
+def calculate_depleted_arrays(p):
+    """
+    Run the depleted formulas on arrays of fields.
+
+    :param p: Mapping of input name (see DEPLETED_BATCH_INPUTS) to an array; arrays of
+              float32 give float32 results.
+    :return: Dict of output name (see DEPLETED_BATCH_OUTPUTS) to array.
+    """
+    gas_produced_rb = depleted.calculate_gas_produced_rb(p['gas_produced'], p['Bg'])
+    solution_gas_produced_rb = depleted.calculate_solution_gas_produced_rb(p['original_gas_in_place'], p['gas_produced'], p['Bg'])
+    reservoir_bbl_produced_rb = depleted.calculate_reservoir_bbl_produced_rb(p['oil_produced'], p['formation_oil_factor'])
+    total_fluid_rb = depleted.calculate_total_fluid_rb(gas_produced_rb, p['water_produced'], reservoir_bbl_produced_rb)
+    total_fluid_kg = depleted.calculate_total_fluid_kg(total_fluid_rb, p['CO2_density'])
+    storage_capacity = depleted.calculate_storage_capacity(p['original_oil_in_place'], p['original_gas_in_place'], p['CO2_density'])
+    return {
+        'gas_produced_rb': gas_produced_rb,
+        'solution_gas_produced_rb': solution_gas_produced_rb,
+        'reservoir_bbl_produced_rb': reservoir_bbl_produced_rb,
+        'total_fluid_rb': total_fluid_rb,
+        'total_fluid_kg': total_fluid_kg,
+        'storage_capacity': storage_capacity,
+    }
+
+def calculate_depleted_batch(fields):
+    """
+    Calculate every depleted output for a batch of fields in one vectorized pass.
+
+    The depleted formulas are plain arithmetic, so the scalar functions in
+    depleted_calculations are applied to whole arrays.
+
+    :param fields: DataFrame or mapping of input name (see DEPLETED_BATCH_INPUTS) to a scalar
+                   or an array. Scalars and arrays are broadcast against each other.
+    :return: DataFrame with one row per field and one column per output in DEPLETED_BATCH_OUTPUTS.
+    """
+    missing = [name for name in DEPLETED_BATCH_INPUTS if name not in fields]
+    if missing:
+        raise ValueError(f"Missing depleted inputs: {', '.join(missing)}")
+
+    values = np.broadcast_arrays(*(np.atleast_1d(np.asarray(fields[name], dtype=float)) for name in DEPLETED_BATCH_INPUTS))
+    p = dict(zip(DEPLETED_BATCH_INPUTS, (value.ravel() for value in values)))
+
+    index = fields.index if isinstance(fields, pd.DataFrame) else None
+    return pd.DataFrame(calculate_depleted_arrays(p), index=index)
@@ -1,5 +1,3 @@
-import pandas as pd
-
 def extract_depleted_data(file_path):
     """
     Extract depleted data from an Excel file.
@@ -7,14 +5,16 @@ def extract_depleted_data(file_path):
     :param file_path: Path to the Excel file.
     :return: DataFrame containing the depleted data.
     """
-    data = pd.ExcelFile(file_path)
+    from workbook import open_workbook
+
+    data = open_workbook(file_path)
     
     # Check if the required sheet is present in the Excel file
     if "Depleted Field Storage" not in data.sheet_names:
         raise ValueError("Depleted data sheet not found.")
     
     # Read the data from the specified sheet
-    depleted_data = pd.read_excel(file_path, sheet_name="Depleted Field Storage")
+    depleted_data = data.sheet("Depleted Field Storage")
 
     return depleted_data
 
@@ -90,49 +90,23 @@ def calculate_storage_capacity(original_oil_in_place, original_gas_in_place, CO2
     storage_capacity = total_fluid_kg / CO2_density
     return storage_capacity
 
-def is_numeric(value):
-    """
-    Check if a value is numeric.
-    
-    :param value: The value to check.
-    :return: True if the value is numeric, False otherwise.
-    """
-    try:
-        float(value)
-        return True
-    except ValueError:
-        return False
-
 def main():
-    file_path = r"C:\Users\user\Desktop\excel-to-python-equations\Excel\Calculations_for_python.xlsx"
+    from input_schema import DEPLETED_SCHEMA, extract_inputs
+    from workbook import WORKBOOK_PATH
+
+    file_path = WORKBOOK_PATH
     depleted_data = extract_depleted_data(file_path)
     
-    # Check if the required data is present
-    required_fields = [
-        'Original Oil in Place', 'Original Gas in Place', 'Gas Produced', 
-        'Oil produced', 'Water Produced', 'Bg', 'Formation Oil Factor', 'CO2 Density'
-    ]
-    
-    for field in required_fields:
-        if depleted_data.loc[depleted_data['Unnamed: 2'] == field].empty:
-            raise ValueError(f"Required field '{field}' not found in the data.")
-    
-    def get_numeric_value(field):
-        value = depleted_data.loc[depleted_data['Unnamed: 2'] == field, 'Unnamed: 4'].values[0]
-        if not is_numeric(value):
-            raise ValueError(f"Value for '{field}' is not numeric: {value}")
-        return float(value)
+    inputs = extract_inputs(depleted_data, DEPLETED_SCHEMA)
     
-    original_oil_in_place = get_numeric_value('Original Oil in Place')
-    # print(original_oil_in_place)
-    original_gas_in_place = get_numeric_value('Original Gas in Place')
-    gas_produced = get_numeric_value('Gas Produced')
-    oil_produced = get_numeric_value('Oil produced')
-    water_produced = get_numeric_value('Water Produced')
-    # print(water_produced)
-    Bg = get_numeric_value('Bg')
-    formation_oil_factor = get_numeric_value('Formation Oil Factor')
-    CO2_density = get_numeric_value('CO2 Density')
+    original_oil_in_place = inputs.original_oil_in_place
+    original_gas_in_place = inputs.original_gas_in_place
+    gas_produced = inputs.gas_produced
+    oil_produced = inputs.oil_produced
+    water_produced = inputs.water_produced
+    Bg = inputs.Bg
+    formation_oil_factor = inputs.formation_oil_factor
+    CO2_density = inputs.CO2_density
     
     gas_produced_rb = calculate_gas_produced_rb(gas_produced, Bg)
     solution_gas_produced_rb = calculate_solution_gas_produced_rb(original_gas_in_place, gas_produced, Bg)
@@ -1,23 +1,176 @@
-import pandas as pd
-from scipy.optimize import newton
+import csv
+import datetime
+import math
+from collections import namedtuple
+
+# Layout of the "Economic Analysis" sheet (zero-based columns): labels sit in column B,
+# assumption values in column D, headline outputs in G/H and unit costs in K/L. The
+# yearly financial model starts in column I and runs as far as its "Number of years" row.
+ECONOMIC_SHEET = "Economic Analysis"
+LABEL_COLUMN = 1
+INPUT_VALUE_COLUMN = 3
+OUTPUT_COLUMNS = ((6, 7), (10, 11))
+SCHEDULE_START_COLUMN = 8
+SCHEDULE_START_LABEL = "Number of years"
+BACKEND_LABEL = "Backend Calculations"
+
+EconomicSheet = namedtuple('EconomicSheet', ['inputs', 'outputs', 'schedule'])
 
 def extract_economic_data(file_path):
     """
     Extract economic data from an Excel file.
-    
-    :param file_path: Path to the Excel file.
+
+    Only the used range is read, as in load_economic_sheet: rows are streamed, trailing
+    empty cells dropped and every row cut at the last year of the timeline, so the
+    16,384-column padding of the sheet (and the #REF! and dash rows running across it) is
+    never built.
+
+    :param file_path: Path to the Excel file or to the Economic Analysis CSV export.
     :return: DataFrame containing the economic data.
     """
-    data = pd.ExcelFile(file_path)
-    
-    # Check if the required sheet is present in the Excel file
-    if "Economic Analysis" not in data.sheet_names:
+    if not file_path.lower().endswith('.csv'):
+        from workbook import open_workbook
+
+        return open_workbook(file_path).load('economic_data', lambda: _read_economic_data(file_path))
+    return _read_economic_data(file_path)
+
+def _read_economic_data(file_path):
+    import pandas as pd
+
+    rows = list(_iter_sheet_rows(file_path))
+    widths = [len(row) for row in rows if len(row) > LABEL_COLUMN and isinstance(row[LABEL_COLUMN], str)
+              and row[LABEL_COLUMN].strip() == SCHEDULE_START_LABEL]
+    if widths:
+        rows = [row[:widths[0]] for row in rows]
+    return pd.DataFrame(rows)
+
+def parse_sheet_value(value):
+    """
+    Parse a cell as formatted by the sheet export.
+
+    Handles thousands separators, currency signs, percentages, accounting negatives such
+    as "($1.8)", dashes for zero ("--", "  -   ") and m/d/Y dates.
+
+    :param value: Raw cell text, or a value already typed by the xlsx reader.
+    :return: float, datetime.date, the stripped text if it is not numeric, or None if empty.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if not isinstance(value, str):
+        return float(value)
+    text = value.strip()
+    if not text:
+        return None
+    if text in ('-', '--'):
+        return 0.0
+    negative = text.startswith('(') and text.endswith(')')
+    number = text.strip('()').replace('$', '').replace(',', '').strip()
+    percent = number.endswith('%')
+    try:
+        result = float(number.rstrip('%'))
+    except ValueError:
+        try:
+            return datetime.datetime.strptime(text, "%m/%d/%Y").date()
+        except ValueError:
+            return text
+    if percent:
+        result /= 100
+    return -result if negative else result
+
+def _iter_sheet_rows(file_path):
+    """
+    Stream the rows of the economic sheet with trailing empty cells removed.
+
+    The CSV export pads every row to 16,384 columns. Trailing empty fields are dropped
+    after parsing; to avoid tokenizing the padding, lines that end a record outside quotes
+    also have their trailing commas cut before parsing.
+    """
+    if file_path.lower().endswith('.csv'):
+        with open(file_path, newline='', encoding='utf-8') as f:
+            for row in csv.reader(_trim_padding(f)):
+                end = len(row)
+                while end and not row[end - 1]:
+                    end -= 1
+                yield row[:end]
+        return
+
+    from workbook import open_workbook
+
+    data = open_workbook(file_path)
+    if ECONOMIC_SHEET not in data.sheet_names:
         raise ValueError("Economic data sheet not found.")
-    
-    # Read the data from the specified sheet
-    economic_data = pd.read_excel(file_path, sheet_name="Economic Analysis")
+    for row in data.book[ECONOMIC_SHEET].iter_rows(values_only=True):
+        end = len(row)
+        while end and row[end - 1] is None:
+            end -= 1
+        yield row[:end]
+
+def load_economic_sheet(file_path):
+    """
+    Load the populated part of the Economic Analysis sheet into compact typed structures.
+
+    Rows are streamed one at a time and only the used range is kept: the assumption block,
+    the headline outputs and the yearly financial model up to the last year of its timeline.
 
-    return economic_data
+    :param file_path: Path to the Economic Analysis CSV export or to the workbook. Workbooks
+                      are read through the shared session and parsed once.
+    :return: EconomicSheet of inputs (dict of label to value), outputs (dict of label to value)
+             and schedule (float DataFrame with one row per model line and one column per year).
+    """
+    if not file_path.lower().endswith('.csv'):
+        from workbook import open_workbook
+
+        return open_workbook(file_path).load('economic_sheet', lambda: _read_economic_sheet(file_path))
+    return _read_economic_sheet(file_path)
+
+def _read_economic_sheet(file_path):
+    """
+    Build the EconomicSheet for load_economic_sheet from streamed rows.
+    """
+    import numpy as np
+    import pandas as pd
+
+    inputs = {}
+    outputs = {}
+    labels = []
+    rows = []
+    width = None
+    in_inputs = True
+    for row in _iter_sheet_rows(file_path):
+        label = row[LABEL_COLUMN].strip() if len(row) > LABEL_COLUMN and isinstance(row[LABEL_COLUMN], str) else None
+        if label == BACKEND_LABEL:
+            in_inputs = False
+
+        if width is None:
+            if label == SCHEDULE_START_LABEL:
+                width = len(row)
+            else:
+                if in_inputs and label and len(row) > INPUT_VALUE_COLUMN:
+                    value = parse_sheet_value(row[INPUT_VALUE_COLUMN])
+                    if value is not None:
+                        inputs.setdefault(label, value)
+                for label_column, value_column in OUTPUT_COLUMNS:
+                    if len(row) > value_column and isinstance(row[label_column], str):
+                        value = parse_sheet_value(row[value_column])
+                        if isinstance(value, float):
+                            outputs.setdefault(row[label_column].strip(), value)
+                continue
+
+        cells = row[SCHEDULE_START_COLUMN:width]
+        values = [parse_sheet_value(cell) for cell in cells]
+        if label and any(isinstance(value, float) for value in values):
+            labels.append(label)
+            rows.append([value if isinstance(value, float) else np.nan for value in values]
+                        + [np.nan] * (width - SCHEDULE_START_COLUMN - len(values)))
+
+    if width is None:
+        raise ValueError(f"'{SCHEDULE_START_LABEL}' row not found in the economic data.")
+    schedule = pd.DataFrame(np.array(rows, dtype=float), index=labels)
+    schedule.columns = schedule.loc[SCHEDULE_START_LABEL].astype(int)
+    schedule = schedule.drop(index=SCHEDULE_START_LABEL)
+    return EconomicSheet(inputs, outputs, schedule)
 
 def calculate_npv(cash_flows, discount_rate):
     """
@@ -37,8 +190,14 @@ def calculate_irr(cash_flows):
     :param cash_flows: List of cash flows.
     :return: Internal rate of return (IRR).
     """
-    irr =  newton(lambda r: calculate_npv(cash_flows, r), 0.1)
-    return irr
+    from irr_solver import irr_batch
+
+    irr, converged = irr_batch([cash_flows], guess=0.1)
+    if not converged[0]:
+        # irr_batch leaves the rate NaN only when it found no bracket to refine.
+        reason = "no sign change of NPV found" if math.isnan(irr[0]) else "iteration limit reached"
+        raise RuntimeError(f"IRR did not converge: {reason}.")
+    return float(irr[0])
 
 def calculate_years_to_breakeven(cash_flows):
     """
@@ -67,43 +226,50 @@ def calculate_profitability_index(cash_flows, discount_rate):
     pi = npv / initial_investment
     return pi
 
-def economic_analysis(file_path, project_life_years, discount_rate):
-    economic_data = extract_economic_data(file_path)
-    
-    # Extract relevant columns
-    revenue = economic_data.loc[economic_data['Variables'] == 'Revenue'].iloc[:, 4:4+project_life_years].values.flatten()
-    capex = economic_data.loc[economic_data['Variables'] == 'Capex'].iloc[:, 4:4+project_life_years].values.flatten()
-    opex = economic_data.loc[economic_data['Variables'] == 'Opex'].iloc[:, 4:4+project_life_years].values.flatten()
-    
-    cash_flows = []
-    
-    for year in range(project_life_years):
-        if year == 0:
-            cash_flow = -capex[year]
-        else:
-            cash_flow = revenue[year] - opex[year]
-        cash_flows.append(cash_flow)
-    
-    npv = calculate_npv(cash_flows, discount_rate)
-    irr = calculate_irr(cash_flows)
-    years_to_breakeven = calculate_years_to_breakeven(cash_flows)
-    pi = calculate_profitability_index(cash_flows, discount_rate)
+def _trim_padding(lines):
+    """
+    Cut the trailing commas of lines that end a CSV record; lines inside a quoted field
+    that spans lines are passed through unchanged.
+    """
+    quoted = False
+    for line in lines:
+        quoted ^= line.count('"') % 2 == 1
+        yield line if quoted else line.rstrip('\r\n').rstrip(',') + '\n'
+
+def economic_analysis(file_path, project_life_years=None, discount_rate=None):
+    """
+    Evaluate the project economics from the assumption block of the Economic Analysis sheet.
+
+    :param file_path: Path to the workbook or to the Economic Analysis CSV export.
+    :param project_life_years: Years of injection; defaults to the sheet value.
+    :param discount_rate: Discount rate; defaults to the sheet value.
+    :return: Dict with NPV, IRR, Years to Breakeven and Profitability Index.
+    """
+    from cashflow_model import assumptions_from_inputs, evaluate_economics
+
+    assumptions = assumptions_from_inputs(load_economic_sheet(file_path).inputs)
+    if project_life_years is not None:
+        assumptions['project_life'] = project_life_years
+    if discount_rate is not None:
+        assumptions['discount_rate'] = discount_rate
+    results = evaluate_economics(assumptions).iloc[0]
 
     print("Economic Analysis Results:")
-    print(f"NPV: {npv}")
-    print(f"IRR: {irr}")
-    print(f"Years to Breakeven: {years_to_breakeven}")
-    print(f"Profitability Index: {pi}")
-    
-    # return {
-    #     'NPV': npv,
-    #     'IRR': irr,
-    #     'Years to Breakeven': years_to_breakeven,
-    #     'Profitability Index': pi
-    # }
+    print(f"NPV: {results['npv']}")
+    print(f"IRR: {results['irr']}")
+    print(f"Years to Breakeven: {results['years_to_breakeven']}")
+    print(f"Profitability Index: {results['profitability_index']}")
+
+    return {
+        'NPV': float(results['npv']),
+        'IRR': float(results['irr']),
+        'Years to Breakeven': float(results['years_to_breakeven']),
+        'Profitability Index': float(results['profitability_index'])
+    }
+
 if __name__ == "__main__":
     file_path = r"C:\Users\user\Desktop\excel-to-python-equations\Excel\Calculations_for_python.xlsx"
-    project_life_years = 10  # Update this with the actual project life years
-    discount_rate = 0.1  # Update this with the actual discount rate
+    project_life_years = 12  # Update this with the actual project life years
+    discount_rate = 0.08  # Update this with the actual discount rate
 
-    economic_analysis(file_path, project_life_years, discount_rate)
\ No newline at end of file
+    economic_analysis(file_path, project_life_years, discount_rate)
@@ -0,0 +1,443 @@
+import copy
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from depleted_batch import DEPLETED_BATCH_INPUTS, DEPLETED_BATCH_OUTPUTS, calculate_depleted_arrays
+
+# A store is a directory holding one raw array file per column and a JSON description of
+# the columns. Columns are memory-mapped, so only the chunk being evaluated is in RAM.
+STORE_META = 'store.json'
+STORE_DTYPES = ('float64', 'float32')
+# Text columns (operator, basin, field name) are stored as codes into a list of labels.
+CODE_DTYPE = 'int32'
+DEFAULT_CHUNK_ROWS = 262_144
+AGGREGATE_STATS = ('sum', 'mean', 'min', 'max')
+
+class FieldStore:
+    """
+    Columnar, memory-mapped store of field records.
+
+    Numeric columns are typed arrays of the store's dtype (float64, or float32 to halve the
+    memory and disk used); text columns are int32 codes into a list of labels. Records are
+    appended in blocks, so a portfolio larger than memory can be loaded from CSV in chunks.
+    """
+
+    def __init__(self, path):
+        """
+        Open an existing store.
+
+        :param path: Directory of the store.
+        """
+        self.path = path
+        with open(os.path.join(path, STORE_META), encoding='utf-8') as f:
+            meta = json.load(f)
+        self.dtype = np.dtype(meta['dtype'])
+        self.rows = meta['rows']
+        self.schema = meta['columns']
+
+    @classmethod
+    def create(cls, path, dtype='float64'):
+        """
+        Create an empty store.
+
+        :param path: Directory of the store; created if needed, and must not hold a store yet.
+        :param dtype: Type of the numeric columns, one of STORE_DTYPES.
+        :return: FieldStore.
+        """
+        if dtype not in STORE_DTYPES:
+            raise ValueError(f"Unknown store dtype '{dtype}'; use one of {', '.join(STORE_DTYPES)}")
+        if os.path.exists(os.path.join(path, STORE_META)):
+            raise ValueError(f"A field store already exists at '{path}'.")
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, STORE_META), 'w', encoding='utf-8') as f:
+            json.dump({'dtype': dtype, 'rows': 0, 'columns': {}}, f)
+        return cls(path)
+
+    @classmethod
+    def from_frame(cls, path, frame, dtype='float64'):
+        """
+        Create a store holding the records of a DataFrame.
+
+        :param path: Directory of the store.
+        :param frame: DataFrame with one row per field.
+        :param dtype: Type of the numeric columns, one of STORE_DTYPES.
+        :return: FieldStore.
+        """
+        store = cls.create(path, dtype)
+        store.append(frame)
+        return store
+
+    @classmethod
+    def from_csv(cls, path, csv_path, dtype='float64', chunk_rows=DEFAULT_CHUNK_ROWS, **read_csv_args):
+        """
+        Create a store from a CSV file, reading it in chunks.
+
+        :param path: Directory of the store.
+        :param csv_path: CSV file with one row per field and a header row.
+        :param dtype: Type of the numeric columns, one of STORE_DTYPES.
+        :param chunk_rows: Rows read and appended at a time.
+        :param read_csv_args: Extra arguments for pandas.read_csv.
+        :return: FieldStore.
+        """
+        store = cls.create(path, dtype)
+        for chunk in pd.read_csv(csv_path, chunksize=chunk_rows, **read_csv_args):
+            store.append(chunk)
+        return store
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def _save_meta(self):
+        meta = {'dtype': self.dtype.name, 'rows': self.rows, 'columns': self.schema}
+        temporary = os.path.join(self.path, STORE_META + '.tmp')
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(temporary, os.path.join(self.path, STORE_META))
+
+    @property
+    def input_columns(self):
+        """
+        Columns filled by append, as opposed to results added with add_column.
+        """
+        return [name for name, column in self.schema.items() if not column.get('derived')]
+
+    def append(self, frame):
+        """
+        Append records.
+
+        The first block appended fixes the input columns; later blocks must have the same
+        ones. Numeric columns are converted to the store dtype, other columns are stored as
+        labels. A column read as numeric (e.g. empty in the first block) is converted to
+        labels when a later block holds text. Result columns added by add_column are NaN
+        for the new rows until they are evaluated again. The whole block is converted
+        before anything is written, and a failed write leaves the store as it was.
+
+        :param frame: DataFrame (or mapping of column to array) with one row per field.
+        """
+        frame = pd.DataFrame(frame)
+        inputs = self.input_columns
+        if self.schema and set(frame.columns) != set(inputs):
+            raise ValueError(f"Columns do not match the store: expected {', '.join(inputs)}")
+        if self.schema:
+            schema = copy.deepcopy(self.schema)
+        else:
+            schema = {str(name): {'labels': None if pd.api.types.is_numeric_dtype(frame[name]) else []}
+                      for name in frame.columns}
+            inputs = list(schema)
+
+        blocks = {}
+        converted = {}
+        for name in inputs:
+            column = schema[name]
+            values = frame[name]
+            if column['labels'] is None:
+                numbers = pd.to_numeric(values, errors='coerce')
+                if (numbers.isna() & values.notna()).any():
+                    converted[name] = self._label_codes(name, column)
+            if column['labels'] is None:
+                blocks[name] = numbers.to_numpy(dtype=self.dtype)
+            else:
+                # Extend the label list with new labels; missing values get code -1.
+                positions = {label: code for code, label in enumerate(column['labels'])}
+                labels = values.astype('string')
+                for label in pd.unique(labels.dropna()):
+                    if label not in positions:
+                        positions[label] = len(column['labels'])
+                        column['labels'].append(label)
+                blocks[name] = labels.map(positions).fillna(-1).to_numpy(dtype=CODE_DTYPE)
+        for name, column in schema.items():
+            if column.get('derived'):
+                blocks[name] = np.full(len(frame), np.nan, dtype=self.dtype)
+
+        self._write_rows(blocks, converted)
+        self.schema = schema
+        self.rows += len(frame)
+        self._save_meta()
+
+    def _label_codes(self, name, column):
+        """
+        Return the existing values of a numeric input column as codes into new labels.
+
+        :param name: Column name.
+        :param column: Schema entry of the column; its labels are set, missing values get code -1.
+        :return: Array of codes, one per stored row.
+        """
+        values = pd.Series(np.asarray(self.column(name)))
+        column['labels'] = list(pd.unique(values.dropna().astype('string')))
+        codes = values.astype('string').map({label: code for code, label in enumerate(column['labels'])})
+        return codes.fillna(-1).to_numpy(dtype=CODE_DTYPE)
+
+    def _write_rows(self, blocks, converted):
+        """
+        Write a block of new rows to every column file, all or nothing.
+
+        Each file is first cut to the rows in the metadata, which also drops rows left by an
+        interrupted append. Columns converted to labels are written whole to a temporary
+        file that replaces the column once every other file is written. If a write fails,
+        the files are cut back and the temporary files removed.
+
+        :param blocks: Dict of column name to the array of new rows.
+        :param converted: Dict of column name to the codes of its stored rows, for columns
+                          converted to labels.
+        """
+        temporaries = []
+        try:
+            for name, data in blocks.items():
+                if name in converted:
+                    temporaries.append(self._file(name) + '.tmp')
+                    with open(temporaries[-1], 'wb') as f:
+                        f.write(converted[name].tobytes())
+                        f.write(np.ascontiguousarray(data).tobytes())
+                    continue
+                with open(self._file(name), 'r+b' if os.path.exists(self._file(name)) else 'wb') as f:
+                    f.truncate(self.rows * data.itemsize)
+                    f.seek(0, os.SEEK_END)
+                    f.write(np.ascontiguousarray(data).tobytes())
+        except BaseException:
+            for temporary in temporaries:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+            for name, data in blocks.items():
+                if name not in converted and os.path.exists(self._file(name)):
+                    with open(self._file(name), 'r+b') as f:
+                        f.truncate(self.rows * data.itemsize)
+            raise
+        for name in converted:
+            os.replace(self._file(name) + '.tmp', self._file(name))
+
+    def __len__(self):
+        return self.rows
+
+    def __contains__(self, name):
+        return name in self.schema
+
+    @property
+    def columns(self):
+        return list(self.schema)
+
+    def is_text(self, name):
+        """
+        :return: True if a column holds labels rather than numbers.
+        """
+        return self.schema[name]['labels'] is not None
+
+    def labels(self, name):
+        """
+        :return: Array of the labels of a text column, indexed by code.
+        """
+        return np.array(self.schema[name]['labels'], dtype=object)
+
+    def column(self, name, mode='r'):
+        """
+        Memory-map a column.
+
+        :param name: Column name.
+        :param mode: 'r' for read-only, 'r+' to write in place.
+        :return: Array of numbers, or of codes for a text column.
+        """
+        if name not in self.schema:
+            raise KeyError(f"Column '{name}' not found in the field store.")
+        dtype = CODE_DTYPE if self.is_text(name) else self.dtype
+        if self.rows == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self._file(name), dtype=dtype, mode=mode, shape=(self.rows,))
+
+    __getitem__ = column
+
+    def add_column(self, name):
+        """
+        Add a numeric column filled with NaN, or return the existing one for writing.
+
+        :param name: Column name.
+        :return: Writable memory-mapped array.
+        """
+        if name not in self.schema:
+            with open(self._file(name), 'wb') as f:
+                f.truncate(self.rows * self.dtype.itemsize)
+            self.schema[name] = {'labels': None, 'derived': True}
+            self._save_meta()
+            column = self.column(name, mode='r+')
+            column[:] = np.nan
+            return column
+        if self.is_text(name):
+            raise ValueError(f"Column '{name}' holds labels and cannot store results.")
+        return self.column(name, mode='r+')
+
+    def chunks(self, names, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """
+        Iterate over blocks of rows.
+
+        :param names: Columns to read.
+        :param chunk_rows: Rows per block.
+        :return: Generator of (slice of rows, dict of column name to array).
+        """
+        columns = {name: self.column(name) for name in names}
+        for start in range(0, self.rows, chunk_rows):
+            rows = slice(start, min(start + chunk_rows, self.rows))
+            yield rows, {name: np.asarray(column[rows]) for name, column in columns.items()}
+
+    def frame(self, rows=None, names=None):
+        """
+        Read records into a DataFrame, with text columns decoded.
+
+        :param rows: Row numbers or slice; all rows if None.
+        :param names: Columns; all if None.
+        :return: DataFrame indexed by row number.
+        """
+        rows = slice(None) if rows is None else rows
+        index = np.arange(self.rows)[rows]
+        data = {}
+        for name in names or self.columns:
+            values = np.asarray(self.column(name)[rows])
+            if self.is_text(name):
+                labels = np.append(self.labels(name), None)  # code -1 reads the trailing None
+                values = labels[values]
+            data[name] = values
+        return pd.DataFrame(data, index=index)
+
+def evaluate_depleted(store, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Run the depleted calculations over every field of a store.
+
+    Fields are evaluated a block at a time and the outputs (DEPLETED_BATCH_OUTPUTS) are
+    written back to the store as columns, so memory use is bounded by the block size.
+
+    :param store: FieldStore with the columns of DEPLETED_BATCH_INPUTS.
+    :param chunk_rows: Rows evaluated at a time.
+    :return: The store.
+    """
+    missing = [name for name in DEPLETED_BATCH_INPUTS if name not in store]
+    if missing:
+        raise ValueError(f"Missing depleted inputs: {', '.join(missing)}")
+    outputs = {name: store.add_column(name) for name in DEPLETED_BATCH_OUTPUTS}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for rows, inputs in store.chunks(DEPLETED_BATCH_INPUTS, chunk_rows):
+            for name, values in calculate_depleted_arrays(inputs).items():
+                outputs[name][rows] = values
+    for column in outputs.values():
+        column.flush()
+    return store
+
+def _band_labels(edges):
+    labels = [f"<{edges[0]:g}"]
+    labels += [f"{low:g}-{high:g}" for low, high in zip(edges[:-1], edges[1:])]
+    return labels + [f">={edges[-1]:g}"]
+
+def _group_keys(store, by, bands):
+    """
+    Return, per grouping column, a function mapping a chunk to codes and the code labels.
+    """
+    keys = []
+    for name in by:
+        if name in bands:
+            edges = np.asarray(sorted(bands[name]), dtype=float)
+            keys.append((name, lambda values, edges=edges: np.where(np.isnan(values), -1, np.searchsorted(edges, values, side='right')),
+                         _band_labels(edges)))
+        elif store.is_text(name):
+            keys.append((name, lambda values: values, list(store.labels(name))))
+        else:
+            raise ValueError(f"Column '{name}' is numeric; group it by giving its band edges in bands.")
+    return keys
+
+def aggregate(store, by, values=('storage_capacity',), bands=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Summarize fields by group, reading the store a block at a time.
+
+    :param store: FieldStore.
+    :param by: Columns to group by: text columns (operator, basin) or numeric columns
+               listed in bands.
+    :param values: Numeric columns to summarize.
+    :param bands: Dict of numeric column to band edges, e.g. {'depth': [0, 3000, 6000, 9000]};
+                  fields below the first or above the last edge get their own band.
+    :param chunk_rows: Rows read at a time.
+    :return: DataFrame indexed by group with a 'fields' count and, per value, its sum, mean,
+             min and max (NaN values are left out).
+    """
+    bands = bands or {}
+    keys = _group_keys(store, by, bands)
+    sizes = [len(labels) for _, _, labels in keys]
+    groups = int(np.prod(sizes))
+    counts = np.zeros(groups, dtype=np.int64)
+    totals = {name: np.zeros(groups) for name in values}
+    value_counts = {name: np.zeros(groups, dtype=np.int64) for name in values}
+    minima = {name: np.full(groups, np.inf) for name in values}
+    maxima = {name: np.full(groups, -np.inf) for name in values}
+
+    for _, chunk in store.chunks(list(dict.fromkeys(list(by) + list(values))), chunk_rows):
+        code = np.zeros(len(chunk[by[0]]), dtype=np.int64)
+        valid = np.ones(len(code), dtype=bool)
+        for (name, encode, _), size in zip(keys, sizes):
+            part = encode(chunk[name])
+            valid &= part >= 0
+            code = code * size + part
+        code = code[valid]
+        counts += np.bincount(code, minlength=groups)
+        for name in values:
+            data = chunk[name][valid].astype(float)
+            present = ~np.isnan(data)
+            grouped, data = code[present], data[present]
+            totals[name] += np.bincount(grouped, weights=data, minlength=groups)
+            value_counts[name] += np.bincount(grouped, minlength=groups)
+            np.minimum.at(minima[name], grouped, data)
+            np.maximum.at(maxima[name], grouped, data)
+
+    occupied = np.flatnonzero(counts)
+    index = pd.MultiIndex.from_arrays(
+        [np.asarray(labels, dtype=object)[digits] for (_, _, labels), digits
+         in zip(keys, np.unravel_index(occupied, sizes))], names=list(by))
+    result = {'fields': counts[occupied]}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for name in values:
+            seen = value_counts[name][occupied] > 0
+            result[f'{name}_sum'] = totals[name][occupied]
+            result[f'{name}_mean'] = totals[name][occupied] / value_counts[name][occupied]
+            result[f'{name}_min'] = np.where(seen, minima[name][occupied], np.nan)
+            result[f'{name}_max'] = np.where(seen, maxima[name][occupied], np.nan)
+    return pd.DataFrame(result, index=index)
+
+def rank_fields(store, column='storage_capacity', n=100, where=None, ascending=False, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Return the top fields by a column, reading the store a block at a time.
+
+    :param store: FieldStore.
+    :param column: Numeric column to rank by.
+    :param n: Number of fields returned.
+    :param where: Optional dict of text column to label (or list of labels) the fields must have,
+                  e.g. {'basin': 'Permian'}.
+    :param ascending: Rank the smallest values first.
+    :param chunk_rows: Rows read at a time.
+    :return: DataFrame of the top n fields, indexed by row number, with a 'rank' column.
+    """
+    where = where or {}
+    wanted = {}
+    for name, labels in where.items():
+        if not store.is_text(name):
+            raise ValueError(f"Column '{name}' is numeric; filters apply to text columns.")
+        labels = [labels] if isinstance(labels, str) else list(labels)
+        lookup = {label: code for code, label in enumerate(store.schema[name]['labels'])}
+        wanted[name] = np.array([lookup[label] for label in labels if label in lookup], dtype=CODE_DTYPE)
+
+    sign = 1.0 if ascending else -1.0
+    best_rows, best_keys = np.empty(0, dtype=np.int64), np.empty(0)
+    for rows, chunk in store.chunks([column] + list(wanted), chunk_rows):
+        keep = ~np.isnan(chunk[column])
+        for name, codes in wanted.items():
+            keep &= np.isin(chunk[name], codes)
+        positions = np.flatnonzero(keep)
+        keys = sign * chunk[column][positions].astype(float)
+        if len(keys) > n:
+            top = np.argpartition(keys, n)[:n]
+            positions, keys = positions[top], keys[top]
+        best_rows = np.concatenate([best_rows, positions + rows.start])
+        best_keys = np.concatenate([best_keys, keys])
+        if len(best_keys) > n:
+            top = np.argpartition(best_keys, n)[:n]
+            best_rows, best_keys = best_rows[top], best_keys[top]
+
+    order = np.lexsort((best_rows, best_keys))
+    result = store.frame(best_rows[order])
+    result.insert(0, 'rank', np.arange(1, len(order) + 1))
+    return result
@@ -0,0 +1,818 @@
+import datetime
+import re
+from collections import namedtuple
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from workbook import WORKBOOK_PATH
+
+# Excel stores dates as days since 1899-12-30.
+EXCEL_EPOCH = datetime.datetime(1899, 12, 30)
+_EPOCH_DAY = np.datetime64('1899-12-30', 'D')
+
+# Defined names the workbook has lost (#REF!) and the cells they pointed to when it was
+# last calculated; the cached values of the rows using them agree with these cells.
+NAME_REPAIRS = {
+    'DiscountFactor': "'Economic Analysis'!$F$68",
+    'Escalation': "'Economic Analysis'!$F$66",
+}
+
+# Units accepted by CONVERT: dimension and factor to the base unit of that dimension.
+# Temperatures are converted separately since their scales have offsets.
+CONVERT_UNITS = {
+    'm': ('length', 1.0), 'km': ('length', 1000.0), 'cm': ('length', 0.01), 'mm': ('length', 0.001),
+    'mi': ('length', 1609.344), 'Nmi': ('length', 1852.0), 'yd': ('length', 0.9144), 'ft': ('length', 0.3048),
+    'in': ('length', 0.0254),
+    'm2': ('area', 1.0), 'km2': ('area', 1e6), 'ft2': ('area', 0.09290304), 'mi2': ('area', 2589988.110336),
+    'ha': ('area', 1e4), 'us_acre': ('area', 4046.872609874252),
+    'm3': ('volume', 1.0), 'l': ('volume', 0.001), 'L': ('volume', 0.001), 'ft3': ('volume', 0.028316846592),
+    'barrel': ('volume', 0.158987294928),
+    'g': ('mass', 0.001), 'kg': ('mass', 1.0), 'lbm': ('mass', 0.45359237), 'ton': ('mass', 907.18474),
+    'Pa': ('pressure', 1.0), 'kPa': ('pressure', 1000.0), 'MPa': ('pressure', 1e6), 'bar': ('pressure', 1e5),
+    'atm': ('pressure', 101325.0), 'psi': ('pressure', 6894.757293168361), 'mmHg': ('pressure', 133.322387415),
+    'sec': ('time', 1.0), 's': ('time', 1.0), 'min': ('time', 60.0), 'hr': ('time', 3600.0),
+    'day': ('time', 86400.0), 'd': ('time', 86400.0), 'yr': ('time', 31557600.0),
+}
+TEMPERATURE_UNITS = ('C', 'F', 'K')
+
+# A formula cell: its key ("Sheet!A1"), the Excel formula, the NumPy expression it
+# compiles to and the keys of the cells it reads.
+CompiledCell = namedtuple('CompiledCell', ['key', 'formula', 'expression', 'references'])
+
+# Hand-written outputs and the workbook cells computing the same quantity.
+HAND_PORT_CELLS = (
+    ('saline', 'reservoir_pressure', "Saline Storage!F24"),
+    ('saline', 'delta_density', "Saline Storage!F30"),
+    ('saline', 'radius_dong', "Saline Storage!K12"),
+    ('saline', 'area_dong', "Saline Storage!K13"),
+    ('saline', 'radius_nordbotten', "Saline Storage!K16"),
+    ('saline', 'area_nordbotten', "Saline Storage!K17"),
+    ('plume', 'radius_dong_duan', "Saline Storage!K12"),
+    ('plume', 'area_dong_duan', "Saline Storage!K13"),
+    ('plume', 'radius_nordbotten', "Saline Storage!K16"),
+    ('plume', 'area_nordbotten', "Saline Storage!K17"),
+    ('depleted', 'gas_produced_rb', "Depleted Field Storage!E28"),
+    ('depleted', 'solution_gas_produced_rb', "Depleted Field Storage!E29"),
+    ('depleted', 'reservoir_bbl_produced_rb', "Depleted Field Storage!E30"),
+    ('depleted', 'total_fluid_rb', "Depleted Field Storage!E31"),
+    ('depleted', 'total_fluid_kg', "Depleted Field Storage!E32"),
+    ('depleted', 'storage_capacity', "Depleted Field Storage!K9"),
+)
+
+_REFERENCE = re.compile(r"^(?:(?:'(?P<quoted>(?:[^']|'')+)'|(?P<sheet>[^'!:]+))!)?"
+                        r"\$?(?P<column>[A-Z]{1,3})\$?(?P<row>\d+)"
+                        r"(?::\$?(?P<end_column>[A-Z]{1,3})\$?(?P<end_row>\d+))?$", re.IGNORECASE)
+
+def _column_number(letters):
+    number = 0
+    for letter in letters.upper():
+        number = number * 26 + ord(letter) - 64
+    return number
+
+def _column_letters(number):
+    letters = ''
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+def parse_reference(reference, sheet=None):
+    """
+    Split a cell or range reference into the keys of its cells.
+
+    :param reference: Reference such as "F9", "$F$9", "'Saline Storage'!$F$9" or "I64:DE64".
+    :param sheet: Sheet of the formula, used when the reference names none.
+    :return: List of rows, each a list of cell keys ("Sheet!A1"), or None if the text is
+             not a reference.
+    """
+    match = _REFERENCE.match(reference.strip())
+    if not match:
+        return None
+    sheet = match['quoted'].replace("''", "'") if match['quoted'] else (match['sheet'] or sheet)
+    if sheet is None:
+        raise ValueError(f"Reference '{reference}' does not name a sheet.")
+    first_column, first_row = _column_number(match['column']), int(match['row'])
+    last_column = _column_number(match['end_column']) if match['end_column'] else first_column
+    last_row = int(match['end_row']) if match['end_row'] else first_row
+    first_column, last_column = sorted((first_column, last_column))
+    first_row, last_row = sorted((first_row, last_row))
+    return [[f"{sheet}!{_column_letters(column)}{row}" for column in range(first_column, last_column + 1)]
+            for row in range(first_row, last_row + 1)]
+
+def to_excel_serial(value):
+    """
+    Convert a date or datetime to an Excel serial number; other values pass through.
+    """
+    if isinstance(value, datetime.datetime):
+        return (value - EXCEL_EPOCH).total_seconds() / 86400
+    if isinstance(value, datetime.date):
+        return float((value - EXCEL_EPOCH.date()).days)
+    return value
+
+def read_workbook_cells(file_path=WORKBOOK_PATH):
+    """
+    Read every cell of a workbook as written, with formulas as text, and its defined names.
+
+    :param file_path: Path to the Excel file.
+    :return: Tuple of a dict of cell key ("Sheet!A1") to value or formula, and a dict of
+             defined name to the reference it points at.
+    """
+    import openpyxl
+
+    book = openpyxl.load_workbook(file_path, read_only=True)
+    try:
+        cells = {}
+        for sheet in book.worksheets:
+            for row in sheet.iter_rows():
+                for cell in row:
+                    value = getattr(cell, 'value', None)
+                    if value is None:
+                        continue
+                    # Array and data-table formulas keep their formula in .text.
+                    value = getattr(value, 'text', value)
+                    cells[f"{sheet.title}!{cell.coordinate}"] = to_excel_serial(value)
+        names = {name: defined.attr_text for name, defined in book.defined_names.items()}
+    finally:
+        book.close()
+    return cells, names
+
+def _is_formula(value):
+    return isinstance(value, str) and value.startswith('=') and len(value) > 1
+
+# Helpers available to the generated code. Excel's IF evaluates only the branch taken while
+# np.where evaluates both, so invalid operations in the other branch are silenced by the
+# evaluator and then discarded.
+
+def _if(condition, when_true, when_false=False):
+    if isinstance(when_true, str) or isinstance(when_false, str):
+        return np.where(condition, np.asarray(when_true, dtype=object), np.asarray(when_false, dtype=object))
+    return np.where(condition, when_true, when_false)
+
+def _sum(*values):
+    return reduce(np.add, values, 0.0)
+
+def _min(*values):
+    return reduce(np.minimum, values) if values else 0.0
+
+def _max(*values):
+    return reduce(np.maximum, values) if values else 0.0
+
+def _sumproduct(*ranges):
+    return _sum(*(reduce(np.multiply, terms) for terms in zip(*ranges)))
+
+def _round(value, digits=0):
+    # Excel rounds halves away from zero.
+    scale = 10.0 ** np.asarray(digits, dtype=float)
+    value = np.asarray(value, dtype=float)
+    return np.sign(value) * np.floor(np.abs(value) * scale + 0.5) / scale
+
+def _text(value):
+    value = np.asarray(value)
+    if value.dtype.kind in 'fiub':
+        return np.vectorize('{:.15g}'.format, otypes=[str])(value)
+    return value.astype(str)
+
+def _concat(*values):
+    return reduce(np.char.add, (_text(value) for value in values))
+
+def _days(serial):
+    """
+    Return Excel serial numbers as datetime64 days, and which of them are valid.
+    """
+    serial = np.asarray(serial, dtype=float)
+    valid = np.isfinite(serial)
+    days = np.where(valid, np.floor(serial), 0).astype('int64')
+    return _EPOCH_DAY + days.astype('timedelta64[D]'), valid
+
+def _eomonth(start, months):
+    days, valid = _days(start)
+    months = np.asarray(months, dtype=float)
+    valid = valid & np.isfinite(months)
+    month = days.astype('datetime64[M]') + np.where(valid, np.trunc(months), 0).astype('int64') + 1
+    end = month.astype('datetime64[D]') - np.timedelta64(1, 'D')
+    return np.where(valid, (end - _EPOCH_DAY).astype(float), np.nan)
+
+def _year(serial):
+    days, valid = _days(serial)
+    return np.where(valid, days.astype('datetime64[Y]').astype(float) + 1970, np.nan)
+
+def _month(serial):
+    days, valid = _days(serial)
+    return np.where(valid, days.astype('datetime64[M]').astype('int64') % 12 + 1.0, np.nan)
+
+def _day(serial):
+    days, valid = _days(serial)
+    return np.where(valid, (days - days.astype('datetime64[M]')).astype(float) + 1, np.nan)
+
+def _convert(value, from_unit, to_unit):
+    if from_unit in TEMPERATURE_UNITS and to_unit in TEMPERATURE_UNITS:
+        kelvin = {'C': lambda t: t + 273.15, 'F': lambda t: (t - 32) * 5 / 9 + 273.15, 'K': lambda t: t}[from_unit](value)
+        return {'C': lambda k: k - 273.15, 'F': lambda k: (k - 273.15) * 9 / 5 + 32, 'K': lambda k: k}[to_unit](kelvin)
+    return value * (CONVERT_UNITS[from_unit][1] / CONVERT_UNITS[to_unit][1])
+
+def _xirr(values, dates, guess=0.1, tol=1e-10, max_iter=100):
+    # Newton's method from the same guess as Excel, one rate per scenario.
+    arrays = np.broadcast_arrays(*(np.asarray(v, dtype=float) for v in values + dates))
+    values, dates = np.stack(arrays[:len(values)]), np.stack(arrays[len(values):])
+    years = (dates - dates[0]) / 365
+    rate = np.full(values.shape[1:], guess)
+    converged = np.zeros(rate.shape, dtype=bool)
+    for _ in range(max_iter):
+        factor = (1 + rate) ** -years
+        npv = (values * factor).sum(axis=0)
+        slope = (-years * values * factor).sum(axis=0) / (1 + rate)
+        step = npv / slope
+        rate = np.where(converged, rate, rate - step)
+        converged |= np.abs(step) < tol
+        if converged.all():
+            break
+    return np.where(converged & np.isfinite(rate), rate, np.nan)
+
+_HELPERS = {
+    'np': np, '_if': _if, '_sum': _sum, '_min': _min, '_max': _max, '_sumproduct': _sumproduct,
+    '_round': _round, '_concat': _concat, '_eomonth': _eomonth, '_year': _year, '_month': _month,
+    '_day': _day, '_convert': _convert, '_xirr': _xirr,
+}
+
+def _unary(function):
+    return lambda args: f"{function}({args[0]})"
+
+# Excel functions the compiler supports, by name: argument count range and a function
+# emitting the NumPy expression from the argument expressions. Range arguments arrive as
+# tuples of cell expressions.
+EXCEL_FUNCTIONS = {
+    'PI': ((0, 0), lambda args: "np.pi"),
+    'SQRT': ((1, 1), _unary('np.sqrt')),
+    'EXP': ((1, 1), _unary('np.exp')),
+    'LN': ((1, 1), _unary('np.log')),
+    'LOG10': ((1, 1), _unary('np.log10')),
+    'LOG': ((1, 2), lambda args: f"(np.log({args[0]}) / np.log({args[1] if len(args) > 1 else '10.0'}))"),
+    'ABS': ((1, 1), _unary('np.abs')),
+    'SIN': ((1, 1), _unary('np.sin')),
+    'COS': ((1, 1), _unary('np.cos')),
+    'TAN': ((1, 1), _unary('np.tan')),
+    'ASIN': ((1, 1), _unary('np.arcsin')),
+    'ACOS': ((1, 1), _unary('np.arccos')),
+    'ATAN': ((1, 1), _unary('np.arctan')),
+    'RADIANS': ((1, 1), _unary('np.radians')),
+    'DEGREES': ((1, 1), _unary('np.degrees')),
+    'POWER': ((2, 2), lambda args: f"np.power({args[0]}, {args[1]})"),
+    'ROUND': ((1, 2), lambda args: f"_round({', '.join(args)})"),
+    'IF': ((2, 3), lambda args: f"_if({', '.join(args)})"),
+    'IFERROR': ((2, 2), lambda args: f"np.where(np.isfinite({args[0]}), {args[0]}, {args[1]})"),
+    'AND': ((1, None), lambda args: f"np.logical_and.reduce([{', '.join(args)}])"),
+    'OR': ((1, None), lambda args: f"np.logical_or.reduce([{', '.join(args)}])"),
+    'NOT': ((1, 1), _unary('np.logical_not')),
+    'SUM': ((1, None), lambda args: f"_sum({', '.join(args)})"),
+    'MIN': ((1, None), lambda args: f"_min({', '.join(args)})"),
+    'MAX': ((1, None), lambda args: f"_max({', '.join(args)})"),
+    'SUMPRODUCT': ((1, None), lambda args: f"_sumproduct({', '.join(args)})"),
+    'CONVERT': ((3, 3), lambda args: f"_convert({', '.join(args)})"),
+    'EOMONTH': ((2, 2), lambda args: f"_eomonth({', '.join(args)})"),
+    'YEAR': ((1, 1), _unary('_year')),
+    'MONTH': ((1, 1), _unary('_month')),
+    'DAY': ((1, 1), _unary('_day')),
+    'XIRR': ((2, 3), lambda args: f"_xirr({', '.join(args)})"),
+}
+
+# Functions whose range arguments skip blank and text cells, as Excel's aggregates do;
+# every other function reads blank cells in a range as 0.
+_AGGREGATES = ('SUM', 'MIN', 'MAX')
+# Functions taking whole ranges as one argument rather than each cell as an argument.
+_RANGE_FUNCTIONS = ('SUMPRODUCT', 'XIRR')
+
+_COMPARISONS = {'=': '==', '<>': '!=', '<': '<', '>': '>', '<=': '<=', '>=': '>='}
+
+class _Range:
+    """
+    A multi-cell range inside a formula: the keys of its cells, row by row.
+    """
+
+    def __init__(self, keys):
+        self.keys = [key for row in keys for key in row]
+
+class _FormulaParser:
+    """
+    Recursive-descent parser turning one formula into a NumPy expression.
+
+    Operator precedence follows Excel, from loosest to tightest: comparisons, &, + and -,
+    * and /, ^ (left-associative), % and unary minus.
+    """
+
+    def __init__(self, key, formula, compiler):
+        from openpyxl.formula import Tokenizer
+
+        self.key = key
+        self.sheet = key.rsplit('!', 1)[0]
+        self.compiler = compiler
+        self.references = set()
+        try:
+            tokens = Tokenizer(formula).items
+        except Exception as error:  # the tokenizer raises bare Exceptions on malformed input
+            raise ValueError(f"Cannot parse the formula of {key}: {error}") from error
+        self.tokens = [token for token in tokens if token.type != 'WHITE-SPACE']
+        self.position = 0
+
+    def parse(self):
+        expression = self._value(self._comparison())
+        if self.position != len(self.tokens):
+            raise ValueError(f"Unexpected '{self.tokens[self.position].value}' in the formula of {self.key}.")
+        return expression
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _next(self):
+        token = self._peek()
+        if token is None:
+            raise ValueError(f"Formula of {self.key} ends unexpectedly.")
+        self.position += 1
+        return token
+
+    def _infix(self, operators):
+        token = self._peek()
+        if token is not None and token.type == 'OPERATOR-INFIX' and token.value in operators:
+            self.position += 1
+            return token.value
+        return None
+
+    def _value(self, operand):
+        if isinstance(operand, _Range):
+            raise ValueError(f"A range is used as a single value in the formula of {self.key}.")
+        return operand
+
+    def _comparison(self):
+        left = self._concatenation()
+        while (operator := self._infix(_COMPARISONS)) is not None:
+            right = self._concatenation()
+            left = f"({self._value(left)} {_COMPARISONS[operator]} {self._value(right)})"
+        return left
+
+    def _concatenation(self):
+        left = self._additive()
+        while self._infix(('&',)) is not None:
+            left = f"_concat({self._value(left)}, {self._value(self._additive())})"
+        return left
+
+    def _additive(self):
+        left = self._multiplicative()
+        while (operator := self._infix(('+', '-'))) is not None:
+            left = f"({self._value(left)} {operator} {self._value(self._multiplicative())})"
+        return left
+
+    def _multiplicative(self):
+        left = self._power()
+        while (operator := self._infix(('*', '/'))) is not None:
+            left = f"({self._value(left)} {operator} {self._value(self._power())})"
+        return left
+
+    def _power(self):
+        left = self._postfix()
+        while self._infix(('^',)) is not None:
+            # np.power returns NaN (Excel's #NUM!) for negative bases with fractional exponents.
+            left = f"np.power({self._value(left)}, {self._value(self._postfix())})"
+        return left
+
+    def _postfix(self):
+        operand = self._prefix()
+        while (token := self._peek()) is not None and token.type == 'OPERATOR-POSTFIX':
+            self.position += 1
+            operand = f"({self._value(operand)} / 100)"
+        return operand
+
+    def _prefix(self):
+        token = self._peek()
+        if token is not None and token.type == 'OPERATOR-PREFIX':
+            self.position += 1
+            operand = self._value(self._prefix())
+            return f"(-{operand})" if token.value == '-' else operand
+        return self._primary()
+
+    def _primary(self):
+        token = self._next()
+        if token.type == 'PAREN' and token.subtype == 'OPEN':
+            expression = self._value(self._comparison())
+            if self._next().type != 'PAREN':
+                raise ValueError(f"Unbalanced parentheses in the formula of {self.key}.")
+            return f"({expression})"
+        if token.type == 'FUNC' and token.subtype == 'OPEN':
+            return self._function(token.value[:-1].upper())
+        if token.type == 'OPERAND':
+            return self._operand(token)
+        raise ValueError(f"Unexpected '{token.value}' in the formula of {self.key}.")
+
+    def _operand(self, token):
+        if token.subtype == 'NUMBER':
+            return repr(float(token.value))
+        if token.subtype == 'TEXT':
+            return repr(token.value[1:-1].replace('""', '"'))
+        if token.subtype == 'LOGICAL':
+            return 'True' if token.value.upper() == 'TRUE' else 'False'
+        if token.subtype == 'ERROR':
+            self.compiler.broken.append((self.key, f"error literal {token.value}"))
+            return 'np.nan'
+        return self._reference(token.value)
+
+    def _reference(self, text):
+        target = self.compiler.resolve(text, self.sheet)
+        if target is None:
+            self.compiler.broken.append((self.key, f"broken reference {text}"))
+            return 'np.nan'
+        if isinstance(target, str):
+            return target  # a name holding a constant
+        if len(target) == 1 and len(target[0]) == 1:
+            self.references.add(target[0][0])
+            return self.compiler.variable(target[0][0])
+        return _Range(target)
+
+    def _function(self, name):
+        if name.startswith('_XLFN.'):
+            name = name[len('_xlfn.'):]
+        if name not in EXCEL_FUNCTIONS:
+            raise ValueError(f"Unsupported Excel function '{name}' in the formula of {self.key}.")
+        args = []
+        token = self._peek()
+        if token is not None and token.type == 'FUNC' and token.subtype == 'CLOSE':
+            self.position += 1
+        else:
+            while True:
+                args.append(self._comparison())
+                token = self._next()
+                if token.type == 'FUNC' and token.subtype == 'CLOSE':
+                    break
+                if token.type != 'SEP':
+                    raise ValueError(f"Unexpected '{token.value}' in the formula of {self.key}.")
+
+        (least, most), emit = EXCEL_FUNCTIONS[name]
+        if len(args) < least or (most is not None and len(args) > most):
+            raise ValueError(f"{name} takes {least} to {most or 'any number of'} arguments "
+                             f"in the formula of {self.key}.")
+        if name == 'CONVERT':
+            units = [arg[1:-1] if arg[:1] in "'\"" else None for arg in args[1:]]
+            if None in units or not all(unit in CONVERT_UNITS or unit in TEMPERATURE_UNITS for unit in units):
+                raise ValueError(f"CONVERT needs literal units from CONVERT_UNITS in the formula of {self.key}.")
+            if (units[0] in TEMPERATURE_UNITS) != (units[1] in TEMPERATURE_UNITS) or (
+                    units[0] in CONVERT_UNITS and CONVERT_UNITS[units[0]][0] != CONVERT_UNITS[units[1]][0]):
+                raise ValueError(f"CONVERT from '{units[0]}' to '{units[1]}' mixes dimensions in the formula of {self.key}.")
+        expanded = []
+        for arg in args:
+            if not isinstance(arg, _Range):
+                expanded.append(arg)
+            elif name in _AGGREGATES:
+                expanded.extend(self._range_cells(arg, skip_blank=True))
+            elif name in _RANGE_FUNCTIONS:
+                expanded.append(f"({', '.join(self._range_cells(arg, skip_blank=False))},)")
+            else:
+                raise ValueError(f"{name} does not take a range in the formula of {self.key}.")
+        return emit(expanded)
+
+    def _range_cells(self, block, skip_blank):
+        expressions = []
+        for key in block.keys:
+            value = self.compiler.cells.get(key)
+            if skip_blank and (value is None or (isinstance(value, str) and not _is_formula(value))):
+                continue
+            self.references.add(key)
+            expressions.append(self.compiler.variable(key))
+        return expressions
+
+class _Compiler:
+    """
+    Collects the cells a set of targets depends on and generates their evaluator.
+    """
+
+    def __init__(self, cells, names):
+        self.cells = cells
+        # Excel matches defined names without regard to case.
+        self.names = {name.upper(): text for name, text in names.items()}
+        self.variables = {}
+        self._taken = set()
+        self.broken = []
+
+    def resolve(self, text, sheet):
+        """
+        Resolve a reference or defined name to rows of cell keys, a constant expression,
+        or None when it is broken.
+        """
+        if '#REF!' in text.upper():
+            return None
+        keys = parse_reference(text, sheet)
+        if keys is not None:
+            return keys
+        target = self.names.get(text.upper())
+        if target is None:
+            raise ValueError(f"Unknown name '{text}' on sheet '{sheet}'.")
+        if '#REF!' in target.upper():
+            return None
+        try:
+            return repr(float(target.lstrip('=')))
+        except ValueError:
+            return self.resolve(target.lstrip('='), sheet)
+
+    def variable(self, key):
+        """
+        Return the Python variable holding a cell.
+        """
+        if key not in self.variables:
+            name = re.sub(r'\W', '_', key)
+            if not name[0].isalpha():
+                name = '_' + name
+            base, suffix = name, 1
+            while name in self._taken:
+                suffix += 1
+                name = f"{base}_{suffix}"
+            self.variables[key] = name
+            self._taken.add(name)
+        return self.variables[key]
+
+    def compile_cell(self, key):
+        parser = _FormulaParser(key, self.cells[key], self)
+        expression = parser.parse()
+        return CompiledCell(key, self.cells[key], expression, tuple(sorted(parser.references)))
+
+    def order(self, targets):
+        """
+        Compile the formulas the targets depend on, in an order where each cell comes
+        after the cells it reads.
+
+        :return: Tuple of the compiled cells in evaluation order and the input keys.
+        """
+        compiled, ordered, inputs = {}, [], []
+        state = {}  # key -> 'visiting' or 'done'
+        for target in targets:
+            stack = [(target, False)]
+            while stack:
+                key, expanded = stack.pop()
+                if expanded:
+                    state[key] = 'done'
+                    ordered.append(compiled[key])
+                    continue
+                if state.get(key) == 'done':
+                    continue
+                if state.get(key) == 'visiting':
+                    raise ValueError(f"Circular reference through {key}.")
+                if not _is_formula(self.cells.get(key)):
+                    state[key] = 'done'
+                    inputs.append(key)
+                    continue
+                state[key] = 'visiting'
+                compiled[key] = self.compile_cell(key)
+                stack.append((key, True))
+                for reference in compiled[key].references:
+                    if state.get(reference) == 'visiting':
+                        raise ValueError(f"Circular reference between {key} and {reference}.")
+                    if state.get(reference) != 'done':
+                        stack.append((reference, False))
+        return ordered, inputs
+
+def _generate_source(ordered, inputs, compiler):
+    lines = ["def evaluate(_inputs):"]
+    for key in inputs:
+        lines.append(f"    {compiler.variable(key)} = _inputs[{key!r}]")
+    for cell in ordered:
+        lines.append(f"    # {cell.key} {cell.formula.splitlines()[0] if cell.formula else ''}"[:120])
+        lines.append(f"    {compiler.variable(cell.key)} = {cell.expression}")
+    lines.append("    return {")
+    for cell in ordered:
+        lines.append(f"        {cell.key!r}: {compiler.variable(cell.key)},")
+    lines.append("    }")
+    return '\n'.join(lines) + '\n'
+
+class CompiledWorkbook:
+    """
+    Formulas of a workbook compiled into one NumPy function.
+
+    Every input cell (a cell without a formula that a compiled formula reads) can be
+    overridden with an array; all formulas are then evaluated for the whole batch at once,
+    in dependency order.
+    """
+
+    def __init__(self, cells, inputs, targets, names, source, broken=()):
+        """
+        :param cells: CompiledCell per formula cell, in evaluation order.
+        :param inputs: Dict of input cell key to its value in the workbook.
+        :param targets: Keys of the cells returned by default.
+        :param names: Dict of defined name to the cell key it points at.
+        :param source: Generated Python source defining evaluate(inputs).
+        :param broken: (cell key, reason) pairs for formulas reading errors or broken names.
+        """
+        self.cells = tuple(cells)
+        self.inputs = inputs
+        self.targets = tuple(targets)
+        self.names = names
+        self.source = source
+        self.broken = tuple(broken)
+        self._formula_keys = {cell.key for cell in self.cells}
+        self._names_upper = {name.upper(): key for name, key in names.items()}
+        namespace = dict(_HELPERS)
+        exec(compile(source, '<compiled workbook>', 'exec'), namespace)
+        self._evaluate = namespace['evaluate']
+
+    def key(self, name):
+        """
+        Return the cell key of a defined name or a cell reference.
+
+        :param name: Defined name ('RadiusMeters') or reference ("Saline Storage!K16",
+                     "'Saline Storage'!$K$16").
+        :return: Cell key ("Saline Storage!K16").
+        """
+        if name.upper() in self._names_upper:
+            return self._names_upper[name.upper()]
+        keys = parse_reference(name)
+        if keys is None or len(keys) != 1 or len(keys[0]) != 1:
+            raise ValueError(f"'{name}' is neither a defined name nor a single cell.")
+        return keys[0][0]
+
+    def evaluate(self, inputs=None, targets=None):
+        """
+        Evaluate the compiled formulas.
+
+        :param inputs: Mapping (or DataFrame) of input cell or defined name to a scalar or an
+                       array; inputs left out keep their workbook value. Dates are accepted
+                       and converted to Excel serial numbers.
+        :param targets: Cells or defined names to return; defaults to the compiled targets.
+        :return: Dict of target (as given) to array, broadcast to the shape of the inputs.
+        """
+        values = dict(self.inputs)
+        shape = ()
+        for name in (inputs if inputs is not None else {}):
+            key = self.key(name)
+            if key not in self.inputs:
+                reason = "holds a formula" if key in self._formula_keys else "is not read by the compiled formulas"
+                raise ValueError(f"Input '{name}' ({key}) {reason}.")
+            value = inputs[name]
+            if isinstance(value, (datetime.date, datetime.datetime)):
+                value = to_excel_serial(value)
+            value = np.asarray(value)
+            if value.dtype.kind == 'M':
+                value = (value.astype('datetime64[D]') - _EPOCH_DAY).astype(float)
+            elif value.dtype.kind in 'iub':
+                value = value.astype(float)
+            values[key] = value
+            shape = np.broadcast_shapes(shape, value.shape)
+
+        with np.errstate(all='ignore'):
+            results = self._evaluate(values)
+        names = targets if targets is not None else self.targets
+        output = {}
+        for name in names:
+            key = self.key(name)
+            value = results[key] if key in results else values.get(key)
+            if value is None:
+                raise ValueError(f"'{name}' ({key}) is not among the compiled cells.")
+            output[name] = np.broadcast_to(np.asarray(value), shape)
+        return output
+
+def compile_workbook(file_path=WORKBOOK_PATH, targets=None, sheets=None, names=NAME_REPAIRS):
+    """
+    Compile the formulas of a workbook into a CompiledWorkbook.
+
+    Only the targets and the cells they depend on are compiled.
+
+    :param file_path: Path to the Excel file.
+    :param targets: Cells or defined names to compute; defaults to every formula cell of sheets.
+    :param sheets: Sheets whose formula cells are the default targets; defaults to all sheets.
+    :param names: Defined names to add or replace (name to reference), e.g. NAME_REPAIRS.
+    :return: CompiledWorkbook.
+    """
+    cells, defined_names = read_workbook_cells(file_path)
+    defined_names.update(names or {})
+    compiler = _Compiler(cells, defined_names)
+
+    name_keys = {}
+    for name, text in defined_names.items():
+        if '#REF!' in text.upper():
+            continue
+        keys = parse_reference(text.lstrip('='))
+        if keys is not None and len(keys) == 1 and len(keys[0]) == 1:
+            name_keys[name] = keys[0][0]
+
+    if targets is None:
+        targets = [key for key, value in cells.items()
+                   if _is_formula(value) and (sheets is None or key.rsplit('!', 1)[0] in sheets)]
+    else:
+        lookup = {name.upper(): key for name, key in name_keys.items()}
+        resolved = []
+        for target in targets:
+            if target.upper() in lookup:
+                resolved.append(lookup[target.upper()])
+            else:
+                keys = parse_reference(target)
+                if keys is None:
+                    raise ValueError(f"Unknown target '{target}'.")
+                resolved.extend(key for row in keys for key in row)
+        targets = resolved
+
+    ordered, inputs = compiler.order(targets)
+    defaults = {}
+    for key in inputs:
+        value = cells.get(key, 0.0)  # blank cells read as 0
+        defaults[key] = np.float64(value) if isinstance(value, (bool, int, float)) else value
+    source = _generate_source(ordered, inputs, compiler)
+    return CompiledWorkbook(ordered, defaults, targets, name_keys, source, compiler.broken)
+
+def read_cached_values(file_path, keys):
+    """
+    Read the values Excel cached for cells when the workbook was last calculated.
+
+    :param file_path: Path to the Excel file.
+    :param keys: Cell keys.
+    :return: Dict of cell key to cached value (dates as serial numbers, errors as NaN).
+    """
+    import openpyxl
+
+    book = openpyxl.load_workbook(file_path, data_only=True)
+    try:
+        cached = {}
+        for key in keys:
+            sheet, coordinate = key.rsplit('!', 1)
+            value = to_excel_serial(book[sheet][coordinate].value)
+            if isinstance(value, str) and value.startswith('#'):
+                value = np.nan
+            cached[key] = value
+    finally:
+        book.close()
+    return cached
+
+def _matches(value, cached, rtol):
+    value = value.item() if isinstance(value, np.ndarray) and value.ndim == 0 else value
+    if isinstance(value, str) or isinstance(cached, str):
+        return str(value) == str(cached)
+    if cached is None:
+        return False
+    value, cached = float(value), float(cached)
+    if np.isnan(value) or np.isnan(cached):
+        return bool(np.isnan(value) and np.isnan(cached))
+    return bool(np.isclose(value, cached, rtol=rtol, atol=1e-12))
+
+def compare_with_cached(compiled, file_path=WORKBOOK_PATH, rtol=1e-7):
+    """
+    Compare every compiled formula, evaluated at the workbook inputs, with Excel's cached value.
+
+    :param compiled: CompiledWorkbook.
+    :param file_path: Path to the Excel file holding the cached values.
+    :param rtol: Relative tolerance; Excel's XIRR stops iterating within about 1e-8.
+    :return: DataFrame with one row per formula cell: cell, compiled, cached and match.
+    """
+    keys = [cell.key for cell in compiled.cells]
+    values = compiled.evaluate(targets=keys)
+    cached = read_cached_values(file_path, keys)
+    rows = [{'cell': key, 'compiled': values[key].item() if values[key].ndim == 0 else values[key],
+             'cached': cached[key], 'match': _matches(values[key], cached[key], rtol)} for key in keys]
+    return pd.DataFrame(rows, columns=['cell', 'compiled', 'cached', 'match'])
+
+def compare_with_hand_port(compiled=None, file_path=WORKBOOK_PATH):
+    """
+    Compare the hand-written functions with the workbook formulas computing the same
+    quantities (HAND_PORT_CELLS), both evaluated at the workbook inputs.
+
+    :param compiled: CompiledWorkbook holding the cells of HAND_PORT_CELLS; compiled from
+                     file_path if None.
+    :param file_path: Path to the Excel file.
+    :return: DataFrame with model, output, cell, hand_port, workbook and relative_difference.
+    """
+    from depleted_batch import calculate_depleted_batch
+    from input_schema import DEPLETED_SCHEMA, SALINE_SCHEMA, extract_inputs
+    from plume_series import calculate_plume_series
+    from saline_batch import calculate_saline_batch
+    from workbook import open_workbook
+
+    if compiled is None:
+        compiled = compile_workbook(file_path, targets=sorted({cell for _, _, cell in HAND_PORT_CELLS}))
+    session = open_workbook(file_path)
+    saline_inputs = extract_inputs(session.sheet("Saline Storage"), SALINE_SCHEMA)._asdict()
+    depleted_inputs = extract_inputs(session.sheet("Depleted Field Storage"), DEPLETED_SCHEMA)._asdict()
+    series = calculate_plume_series(saline_inputs, horizon_years=saline_inputs['injection_time'])
+    hand_port = {
+        'saline': calculate_saline_batch(saline_inputs).iloc[0],
+        'plume': {name: getattr(series, name)[0, -1] for name in series._fields if name.startswith(('radius', 'area'))},
+        'depleted': calculate_depleted_batch(depleted_inputs).iloc[0],
+    }
+
+    workbook = compiled.evaluate(targets=[cell for _, _, cell in HAND_PORT_CELLS])
+    rows = []
+    for model, output, cell in HAND_PORT_CELLS:
+        value, expected = float(hand_port[model][output]), float(workbook[cell])
+        rows.append({'model': model, 'output': output, 'cell': cell, 'hand_port': value, 'workbook': expected,
+                     'relative_difference': (value - expected) / expected if expected else value - expected})
+    return pd.DataFrame(rows)
+
+def main():
+    compiled = compile_workbook()
+    comparison = compare_with_cached(compiled)
+    print(f"Compiled {len(compiled.cells)} formulas reading {len(compiled.inputs)} input cells.")
+    print(f"{int(comparison['match'].sum())} of {len(comparison)} formulas match the values cached in the workbook.")
+    for cell, reason in compiled.broken:
+        print(f"  {cell}: {reason}")
+    mismatches = comparison[~comparison['match']]
+    if len(mismatches):
+        print("Formulas differing from the cached values:")
+        print(mismatches.head(20).to_string(index=False))
+
+    print("\nHand-written functions against the workbook formulas:")
+    print(compare_with_hand_port(compiled).to_string(index=False))
+
+if __name__ == "__main__":
+    main()
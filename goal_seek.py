@@ -0,0 +1,271 @@
+import numpy as np
+import pandas as pd
+
+from cashflow_model import ECONOMIC_OUTPUTS, MODEL_START, MODEL_YEARS, build_cash_flows, evaluate_economics, summarize_cash_flows
+from plume_series import CO2_VISCOSITY, METERS_PER_MILE, SECONDS_PER_YEAR, plume_coefficients
+
+SEEK_TOLERANCE = 1e-10
+SEEK_MAX_ITER = 100
+
+# Assumptions entering the NPV linearly: revenue is injected volume times (fee + credits),
+# not escalated, so dNPV/d(value) is the after-tax discounted volume.
+LINEAR_NPV_FIELDS = ('transport_storage_fee', 'carbon_credits')
+
+# Plume area grows as injection_rate ** exponent at a fixed time, and linearly with time.
+PLUME_RATE_EXPONENTS = {
+    'nordbotten': 0.5,
+    'dong_duan': 1.0,
+}
+
+def _defined_end(function, target, undefined, defined, f_defined, rows, tol, max_iter):
+    """
+    Move bracket ends where the output is undefined (NaN) toward the defined end.
+
+    Bisects between the two ends, keeping the defined point nearest the undefined end,
+    until that point brackets the target with the defined end or the gap closes.
+
+    :return: Tuple of the new ends and their outputs minus the target.
+    """
+    point, f_point = defined.copy(), f_defined.copy()
+    active = np.ones(len(rows), dtype=bool)
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        middle = (undefined[active] + point[active]) / 2
+        value = np.asarray(function(middle, rows[active]), dtype=float) - target[active]
+        finite = np.isfinite(value)
+        positions = np.flatnonzero(active)
+        point[positions[finite]] = middle[finite]
+        f_point[positions[finite]] = value[finite]
+        undefined[positions[~finite]] = middle[~finite]
+        bracketed = np.signbit(f_point) != np.signbit(f_defined)
+        active &= ~bracketed & (np.abs(point - undefined) > tol * (1 + np.abs(point)))
+    return point, f_point
+
+def goal_seek(function, target, low, high, tol=SEEK_TOLERANCE, max_iter=SEEK_MAX_ITER):
+    """
+    Solve function(x) = target for many problems at once, each within its own bracket.
+
+    Every iteration evaluates the problems still active in one call. Steps are Illinois
+    (modified regula falsi) steps; a step that would leave its bracket falls back to
+    bisection, so each problem either converges inside its bracket or is reported as not
+    converged. Where the output is undefined (NaN) at one end of a bracket, as the IRR is
+    for a fee too low to ever pay back, that end is first moved toward the other end until
+    the output is defined.
+
+    :param function: Function of (x, rows) returning the output for each x, where rows are
+                     the indices of the problems x belongs to.
+    :param target: Target output, scalar or one per problem.
+    :param low: Lower end of the bracket, scalar or one per problem.
+    :param high: Upper end of the bracket, scalar or one per problem.
+    :param tol: Convergence tolerance on x, relative to 1 + |x|.
+    :param max_iter: Maximum number of iterations.
+    :return: Tuple of solution array (NaN where the bracket holds no solution) and boolean
+             converged array.
+    """
+    target, a, b = (np.array(value, dtype=float) for value in np.broadcast_arrays(
+        np.atleast_1d(target), np.atleast_1d(low), np.atleast_1d(high)))
+    target, a, b = target.ravel(), a.ravel(), b.ravel()
+    rows = np.arange(len(a))
+    f_a = np.asarray(function(a, rows), dtype=float) - target
+    f_b = np.asarray(function(b, rows), dtype=float) - target
+    for ends, f_ends, others, f_others in ((a, f_a, b, f_b), (b, f_b, a, f_a)):
+        undefined = np.flatnonzero(np.isnan(f_ends) & np.isfinite(f_others))
+        if undefined.size:
+            ends[undefined], f_ends[undefined] = _defined_end(
+                function, target[undefined], ends[undefined], others[undefined], f_others[undefined],
+                undefined, tol, max_iter)
+
+    found = np.isfinite(f_a) & np.isfinite(f_b) & ((np.signbit(f_a) != np.signbit(f_b)) | (f_a == 0) | (f_b == 0))
+    x = np.full(len(a), np.nan)
+    converged = found & ((f_a == 0) | (f_b == 0))
+    x[converged] = np.where(f_a[converged] == 0, a[converged], b[converged])
+    active = found & ~converged
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x[active] = a[active] - f_a[active] * (b[active] - a[active]) / (f_b[active] - f_a[active])
+    kept = np.zeros(len(a), dtype=int)  # end kept by the last step: -1 for a, 1 for b
+
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        rows = np.flatnonzero(active)
+        r = x[rows]
+        value = np.asarray(function(r, rows), dtype=float) - target[rows]
+
+        # Replace the end of the bracket on the same side of the root.
+        replace_a = np.signbit(value) == np.signbit(f_a[rows])
+        a[rows] = np.where(replace_a, r, a[rows])
+        f_a[rows] = np.where(replace_a, value, f_a[rows])
+        b[rows] = np.where(replace_a, b[rows], r)
+        f_b[rows] = np.where(replace_a, f_b[rows], value)
+
+        # Illinois: halve the value at an end kept twice in a row, so that end moves too.
+        side = np.where(replace_a, 1, -1)
+        halve_b = (side == 1) & (kept[rows] == 1)
+        halve_a = (side == -1) & (kept[rows] == -1)
+        f_b[rows] = np.where(halve_b, f_b[rows] / 2, f_b[rows])
+        f_a[rows] = np.where(halve_a, f_a[rows] / 2, f_a[rows])
+        kept[rows] = side
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = a[rows] - f_a[rows] * (b[rows] - a[rows]) / (f_b[rows] - f_a[rows])
+        lower, upper = np.minimum(a[rows], b[rows]), np.maximum(a[rows], b[rows])
+        outside = ~np.isfinite(step) | (step < lower) | (step > upper)
+        new_x = np.where(outside, (a[rows] + b[rows]) / 2, step)
+
+        done = (value == 0) | (np.abs(new_x - r) <= tol * (1 + np.abs(r))) | (upper - lower <= tol * (1 + np.abs(r)))
+        x[rows] = np.where(value == 0, r, new_x)
+        converged[rows[done]] = True
+        active[rows[done]] = False
+    return x, converged
+
+def _scenario_frame(assumptions):
+    """
+    Return assumptions as a DataFrame with one row per scenario.
+    """
+    if isinstance(assumptions, pd.DataFrame):
+        return assumptions.reset_index(drop=True)
+    sizes = [np.size(value) for value in assumptions.values() if np.ndim(value) > 0]
+    size = max(sizes) if sizes else 1
+    return pd.DataFrame({field: np.broadcast_to(np.asarray(value), (size,)) if np.ndim(value) > 0 else [value] * size
+                         for field, value in assumptions.items()})
+
+def _npv_slope(schedule, tax_rate):
+    """
+    dNPV / d(value) of a LINEAR_NPV_FIELDS assumption: the after-tax discounted volume.
+    """
+    return (1 - tax_rate) * (schedule['co2_injected'] * schedule['discount_factor']).sum(axis=1)
+
+def solve_economics(assumptions, field, target=0.0, output='npv', low=None, high=None,
+                    model_start=MODEL_START, model_years=MODEL_YEARS, tol=SEEK_TOLERANCE, max_iter=SEEK_MAX_ITER):
+    """
+    Find, per scenario, the value of an assumption that brings an economic output to a target.
+
+    For NPV targets on a field of LINEAR_NPV_FIELDS the answer follows from one model run
+    and the analytic slope, and no bracket is needed. Any other pair is solved with
+    goal_seek over [low, high]; an end where the output is undefined, such as the IRR at a
+    fee that never pays back, is moved inward until it is defined.
+
+    :param assumptions: DataFrame or mapping of assumption field to a scalar or an array.
+    :param field: Assumption to solve for (see ECONOMIC_INPUT_LABELS).
+    :param target: Target value of the output, scalar or one per scenario.
+    :param output: Output to match, one of ECONOMIC_OUTPUTS.
+    :param low: Lower end of the bracket for field, scalar or one per scenario.
+    :param high: Upper end of the bracket for field, scalar or one per scenario.
+    :param model_start: Date of the first model year.
+    :param model_years: Number of model years.
+    :param tol: Convergence tolerance on the field value.
+    :param max_iter: Maximum number of iterations.
+    :return: DataFrame with one row per scenario: the solved field value and 'converged'.
+    """
+    if output not in ECONOMIC_OUTPUTS:
+        raise ValueError(f"Unknown economic output '{output}'; use one of {', '.join(ECONOMIC_OUTPUTS)}")
+    frame = _scenario_frame(assumptions)
+    if field not in frame:
+        raise ValueError(f"Missing economic assumptions: {field}")
+    index = assumptions.index if isinstance(assumptions, pd.DataFrame) else None
+
+    if output == 'npv' and field in LINEAR_NPV_FIELDS:
+        schedule = build_cash_flows(frame, model_start, model_years)
+        npv = summarize_cash_flows(schedule)['npv'].to_numpy()
+        slope = _npv_slope(schedule, frame['tax_rate'].to_numpy(dtype=float))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value = frame[field].to_numpy(dtype=float) + (np.asarray(target, dtype=float) - npv) / slope
+        converged = np.isfinite(value)
+        return pd.DataFrame({field: np.where(converged, value, np.nan), 'converged': converged}, index=index)
+
+    if low is None or high is None:
+        raise ValueError(f"Give low and high to bracket '{field}'.")
+
+    def evaluate(x, rows):
+        scenarios = frame.iloc[rows].copy()
+        scenarios[field] = x
+        return evaluate_economics(scenarios, model_start, model_years)[output].to_numpy()
+
+    value, converged = goal_seek(evaluate, np.broadcast_to(target, len(frame)), np.broadcast_to(low, len(frame)),
+                                 np.broadcast_to(high, len(frame)), tol=tol, max_iter=max_iter)
+    return pd.DataFrame({field: value, 'converged': converged}, index=index)
+
+def breakeven_fee(assumptions, target_npv=0.0, model_start=MODEL_START, model_years=MODEL_YEARS):
+    """
+    Calculate the Transport and Storage Fee that brings the NPV to a target.
+
+    :param assumptions: DataFrame or mapping of assumption field to a scalar or an array.
+    :param target_npv: NPV to reach in $ million, scalar or one per scenario.
+    :param model_start: Date of the first model year.
+    :param model_years: Number of model years.
+    :return: Array of fees in $/t, one per scenario (NaN where the fee has no effect).
+    """
+    return solve_economics(assumptions, 'transport_storage_fee', target_npv, 'npv',
+                           model_start=model_start, model_years=model_years)['transport_storage_fee'].to_numpy()
+
+def _plume_area_per_year(sites, method, CO2_viscosity):
+    """
+    Plume area in square miles after one year of injection, per site.
+    """
+    if method not in PLUME_RATE_EXPONENTS:
+        raise ValueError(f"Unknown plume method '{method}'; use one of {', '.join(PLUME_RATE_EXPONENTS)}")
+    nordbotten, dong_duan = plume_coefficients(sites, CO2_viscosity)
+    # Radius ** 2 is coefficient ** 2 * seconds (Nordbotten) or * years (Dong-Duan).
+    radius_squared = nordbotten ** 2 * SECONDS_PER_YEAR if method == 'nordbotten' else dong_duan ** 2
+    return np.pi * radius_squared / METERS_PER_MILE ** 2
+
+def max_injection_time(sites, max_area, method='nordbotten', CO2_viscosity=CO2_VISCOSITY):
+    """
+    Calculate how long each site can inject before its plume reaches a lease area.
+
+    The plume area grows linearly with time, so the answer is exact.
+
+    :param sites: DataFrame or mapping of input name (see PLUME_INPUTS) to a scalar or an array.
+    :param max_area: Lease area in square miles, scalar or one per site.
+    :param method: 'nordbotten' (Table 1) or 'dong_duan' (Table 2).
+    :param CO2_viscosity: CO2 viscosity in Pa*s, scalar or one value per site.
+    :return: Array of injection times in years, one per site.
+    """
+    return np.asarray(max_area, dtype=float) / _plume_area_per_year(sites, method, CO2_viscosity)
+
+def max_injection_rate(sites, max_area, years, method='nordbotten', CO2_viscosity=CO2_VISCOSITY):
+    """
+    Calculate the highest injection rate that keeps each site's plume within a lease area.
+
+    At a fixed time the area is a power of the injection rate (PLUME_RATE_EXPONENTS), so
+    the rate is scaled from the site's current rate in closed form.
+
+    :param sites: DataFrame or mapping of input name (see PLUME_INPUTS) to a scalar or an array.
+    :param max_area: Lease area in square miles, scalar or one per site.
+    :param years: Injection time in years, scalar or one per site.
+    :param method: 'nordbotten' (Table 1) or 'dong_duan' (Table 2).
+    :param CO2_viscosity: CO2 viscosity in Pa*s, scalar or one value per site.
+    :return: Array of injection rates in million tons per annum, one per site.
+    """
+    area = _plume_area_per_year(sites, method, CO2_viscosity) * np.asarray(years, dtype=float)
+    rate = np.asarray(sites['injection_rate'], dtype=float)
+    return rate * (np.asarray(max_area, dtype=float) / area) ** (1 / PLUME_RATE_EXPONENTS[method])
+
+def solve_workbook(compiled, input_name, output_name, target, low, high, inputs=None,
+                   tol=SEEK_TOLERANCE, max_iter=SEEK_MAX_ITER):
+    """
+    Goal-seek on the compiled workbook: find the input value that brings a cell to a target.
+
+    :param compiled: CompiledWorkbook (see formula_compiler).
+    :param input_name: Input cell or defined name to solve for.
+    :param output_name: Formula cell or defined name to match.
+    :param target: Target value, scalar or one per problem.
+    :param low: Lower end of the bracket, scalar or one per problem.
+    :param high: Upper end of the bracket, scalar or one per problem.
+    :param inputs: Other inputs to override, scalars or arrays with one value per problem.
+    :param tol: Convergence tolerance on the input.
+    :param max_iter: Maximum number of iterations.
+    :return: Tuple of solution array and boolean converged array.
+    """
+    inputs = {name: np.asarray(value) for name, value in (inputs or {}).items()}
+    size = np.broadcast_shapes(np.shape(target), np.shape(low), np.shape(high), *(value.shape for value in inputs.values()))
+    size = int(np.prod(size)) if size else 1
+    inputs = {name: np.broadcast_to(value, (size,)) if value.ndim else value for name, value in inputs.items()}
+
+    def evaluate(x, rows):
+        values = {name: value[rows] if value.ndim else value for name, value in inputs.items()}
+        values[input_name] = x
+        return compiled.evaluate(values, [output_name])[output_name]
+
+    return goal_seek(evaluate, np.broadcast_to(target, (size,)), np.broadcast_to(low, (size,)),
+                     np.broadcast_to(high, (size,)), tol=tol, max_iter=max_iter)
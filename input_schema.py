@@ -0,0 +1,103 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from economic_analysis import parse_sheet_value
+
+# A schema maps each input field to the label written next to it on a sheet. Labels are
+# looked up in label_column and their value read from value_column (zero-based positions,
+# so the same schema works for the xlsx sheet and for its CSV export).
+InputSchema = namedtuple('InputSchema', ['name', 'label_column', 'value_column', 'fields'])
+
+SALINE_SCHEMA = InputSchema('SalineInputs', 2, 5, {
+    'injection_rate': 'Injection Rate',
+    'reservoir_thickness': 'Reservoir Thickness',
+    'injection_time': 'Injection Time',
+    'porosity': 'Porosity',
+    'reservoir_depth': 'Reservoir Depth',
+    'pressure_gradient': 'Pressure Gradient',
+    'reservoir_angle': 'Reservoir Angle',
+    'permeability': 'Permeability',
+    'water_salinity': 'Water Salinity',
+    'CO2_relative_permeability': 'CO2 Relative Permeability',
+    'water_relative_permeability': 'Water Relative Permeability',
+    'temperature': 'Temperature',
+    'CO2_density': 'CO2 Density',
+    'water_density': 'Water Density',
+})
+
+DEPLETED_SCHEMA = InputSchema('DepletedInputs', 2, 4, {
+    'original_oil_in_place': 'Original Oil in Place',
+    'original_gas_in_place': 'Original Gas in Place',
+    'gas_produced': 'Gas Produced',
+    'oil_produced': 'Oil produced',
+    'water_produced': 'Water Produced',
+    'Bg': 'Bg',
+    'formation_oil_factor': 'Formation Oil Factor',
+    'CO2_density': 'CO2 Density',
+})
+
+_RECORD_TYPES = {}
+
+def record_type(schema):
+    """
+    Return the namedtuple type holding the inputs of a schema.
+
+    :param schema: InputSchema.
+    :return: namedtuple class with one float field per schema field.
+    """
+    if schema.name not in _RECORD_TYPES:
+        _RECORD_TYPES[schema.name] = namedtuple(schema.name, list(schema.fields))
+    return _RECORD_TYPES[schema.name]
+
+def parse_sheet_numbers(values):
+    """
+    Parse a column of sheet cells into floats.
+
+    Each cell goes through economic_analysis.parse_sheet_value, so both read a cell the
+    same way: thousands separators ("  50,000,000 "), currency signs, percentages ("25%"),
+    accounting negatives ("($1.8)") and dashes for zero ("  -   ", "--").
+
+    :param values: Sequence or Series of raw cells (numbers or formatted text).
+    :return: float Series aligned with values; cells that are not numeric become NaN.
+    """
+    values = pd.Series(values, dtype=object)
+    parsed = [None if pd.isna(value) else parse_sheet_value(value) for value in values]
+    return pd.Series([value if isinstance(value, float) else np.nan for value in parsed], index=values.index, dtype=float)
+
+def build_label_index(frame, schema):
+    """
+    Index a sheet by label in a single pass.
+
+    Labels are stripped and the first occurrence wins, matching the order in which the
+    sheet lists user inputs before backend calculations.
+
+    :param frame: DataFrame holding the sheet.
+    :param schema: InputSchema giving the label and value columns.
+    :return: Series of raw values indexed by label.
+    """
+    labels = frame.iloc[:, schema.label_column].astype('string').str.strip()
+    keep = labels.notna() & ~labels.duplicated()
+    return pd.Series(frame.iloc[:, schema.value_column][keep].to_numpy(), index=labels[keep].to_numpy())
+
+def extract_inputs(frame, schema):
+    """
+    Extract the inputs described by a schema from a sheet.
+
+    :param frame: DataFrame holding the sheet (xlsx sheet or CSV export).
+    :param schema: InputSchema describing the fields to extract.
+    :return: Record of floats (see record_type) with one field per schema field.
+    """
+    index = build_label_index(frame, schema)
+    labels = list(schema.fields.values())
+    missing = [label for label in labels if label not in index.index]
+    if missing:
+        raise ValueError(f"Required field '{missing[0]}' not found in the data.")
+
+    raw = index.loc[labels]
+    values = parse_sheet_numbers(raw.to_numpy())
+    invalid = np.flatnonzero(values.isna().to_numpy())
+    if invalid.size:
+        raise ValueError(f"Value for '{labels[invalid[0]]}' is not numeric: {raw.iloc[invalid[0]]}")
+    return record_type(schema)(*values.tolist())
@@ -0,0 +1,121 @@
+import numpy as np
+
+# Default rate bracket searched for an IRR. The lower end stays above -100% so the
+# discount factors (1 + r) ** -i remain finite for long project lives.
+IRR_LOW = -0.95
+IRR_HIGH = 10.0
+IRR_GRID_POINTS = 200
+
+def _as_cash_flow_matrix(cash_flows):
+    """
+    Return cash flows as a 2-D float array with one row per scenario.
+    """
+    cash_flows = np.asarray(cash_flows, dtype=float)
+    return cash_flows[np.newaxis, :] if cash_flows.ndim == 1 else cash_flows
+
+def npv_and_derivative(cash_flows, rates):
+    """
+    Evaluate NPV and its derivative with respect to the rate for many scenarios at once.
+
+    NPV is the polynomial sum(cf_i * x ** i) in x = 1 / (1 + r), evaluated together with
+    its derivative by Horner's scheme, one vectorized step per period.
+
+    :param cash_flows: 2-D array of cash flows, one row per scenario (period 0 first).
+    :param rates: Discount rate per scenario, or a single rate for all of them.
+    :return: Tuple of NPV and dNPV/dr arrays, one value per scenario.
+    """
+    cash_flows = _as_cash_flow_matrix(cash_flows)
+    x = 1.0 / (1.0 + np.broadcast_to(np.asarray(rates, dtype=float), cash_flows.shape[:1]))
+    value = cash_flows[:, -1].copy()
+    derivative = np.zeros_like(value)
+    for i in range(cash_flows.shape[1] - 2, -1, -1):
+        derivative = derivative * x + value
+        value = value * x + cash_flows[:, i]
+    # Chain rule: dx/dr = -x ** 2.
+    return value, -derivative * x * x
+
+def npv_batch(cash_flows, rates):
+    """
+    Calculate the net present value (NPV) of many scenarios at once.
+
+    :param cash_flows: 2-D array of cash flows, one row per scenario (period 0 first).
+    :param rates: Discount rate per scenario, or a single rate for all of them.
+    :return: Array of NPVs, one per scenario.
+    """
+    return npv_and_derivative(cash_flows, rates)[0]
+
+def _bracket_roots(cash_flows, guess, low, high, points):
+    """
+    Find, for every scenario, the sign-change bracket of NPV nearest to the guess.
+
+    NPV is evaluated on a common rate grid with a single matrix product.
+    """
+    grid = np.linspace(low, high, points)
+    if not np.any(np.isclose(grid, guess)) and low < guess < high:
+        grid = np.sort(np.append(grid, guess))
+    periods = np.arange(cash_flows.shape[1])
+    values = cash_flows @ (1.0 + grid)[np.newaxis, :] ** -periods[:, np.newaxis]
+
+    sign_change = np.signbit(values[:, :-1]) != np.signbit(values[:, 1:])
+    exact = values == 0
+    midpoints = (grid[:-1] + grid[1:]) / 2
+    distance = np.where(sign_change, np.abs(midpoints - guess), np.inf)
+    nearest = np.argmin(distance, axis=1)
+    found = np.isfinite(distance[np.arange(len(nearest)), nearest])
+    a = np.where(found, grid[nearest], np.nan)
+    b = np.where(found, grid[nearest + 1], np.nan)
+    # A grid point that is already a root collapses the bracket onto it.
+    on_grid = exact[np.arange(len(nearest)), nearest]
+    b = np.where(found & on_grid, a, b)
+    return a, b, found
+
+def irr_batch(cash_flows, guess=0.1, tol=1e-12, max_iter=100, low=IRR_LOW, high=IRR_HIGH,
+              grid_points=IRR_GRID_POINTS):
+    """
+    Calculate the internal rate of return (IRR) of many scenarios at once.
+
+    Every scenario is first bracketed on a shared rate grid, keeping the sign change
+    nearest the guess. All brackets are then refined together with Newton steps that
+    fall back to bisection whenever a step would leave its bracket, so each row either
+    converges inside its bracket or is reported as not converged.
+
+    :param cash_flows: 2-D array of cash flows, one row per scenario (period 0 first).
+    :param guess: Rate used to choose between several roots.
+    :param tol: Convergence tolerance on the rate.
+    :param max_iter: Maximum number of iterations.
+    :param low: Lowest rate searched.
+    :param high: Highest rate searched.
+    :param grid_points: Number of rates in the bracketing grid.
+    :return: Tuple of IRR array (NaN where no root was found) and boolean converged array.
+    """
+    cash_flows = _as_cash_flow_matrix(cash_flows)
+    a, b, found = _bracket_roots(cash_flows, guess, low, high, grid_points)
+    f_a = np.where(found, npv_batch(cash_flows, np.where(found, a, 0.0)), np.nan)
+
+    rate = np.where(found, (a + b) / 2, np.nan)
+    converged = found & ((a == b) | (f_a == 0))
+    rate[converged] = a[converged]
+    active = found & ~converged
+    for _ in range(max_iter):
+        if not active.any():
+            break
+        rows = np.flatnonzero(active)
+        r = rate[rows]
+        value, derivative = npv_and_derivative(cash_flows[rows], r)
+
+        # Shrink the bracket around the root.
+        same_side = np.signbit(value) == np.signbit(f_a[rows])
+        a[rows] = np.where(same_side, r, a[rows])
+        f_a[rows] = np.where(same_side, value, f_a[rows])
+        b[rows] = np.where(same_side, b[rows], r)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            step = r - value / derivative
+        outside = ~np.isfinite(step) | (step <= np.minimum(a[rows], b[rows])) | (step >= np.maximum(a[rows], b[rows]))
+        new_rate = np.where(outside, (a[rows] + b[rows]) / 2, step)
+
+        done = (value == 0) | (np.abs(new_rate - r) <= tol * (1 + np.abs(r)))
+        rate[rows] = np.where(value == 0, r, new_rate)
+        converged[rows[done]] = True
+        active[rows[done]] = False
+    return rate, converged
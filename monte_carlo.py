@@ -0,0 +1,216 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import depleted_calculations as depleted
+from saline_batch import calculate_saline_batch
+
+DEFAULT_PERCENTILES = (10, 50, 90)
+
+def _saline_model(inputs):
+    """
+    Saline outputs for a chunk of realizations.
+    """
+    results = calculate_saline_batch(inputs)
+    return {name: results[name].to_numpy() for name in results.columns}
+
+def _depleted_model(inputs):
+    """
+    Depleted storage capacity for a chunk of realizations.
+    """
+    storage_capacity = depleted.calculate_storage_capacity(
+        inputs['original_oil_in_place'], inputs['original_gas_in_place'], inputs['CO2_density'])
+    return {'storage_capacity': storage_capacity}
+
+MODELS = {
+    'saline': _saline_model,
+    'depleted': _depleted_model,
+}
+
+def draw_samples(rng, spec, size):
+    """
+    Draw samples for one input.
+
+    :param rng: numpy Generator.
+    :param spec: A number (held constant) or a tuple of distribution name and parameters:
+                 ('uniform', low, high), ('normal', mean, std), ('lognormal', mean_log, sigma_log)
+                 or ('triangular', low, mode, high).
+    :param size: Number of samples.
+    :return: Array of samples.
+    """
+    if not isinstance(spec, (tuple, list)):
+        return np.full(size, float(spec))
+    name, params = spec[0], spec[1:]
+    if name == 'uniform':
+        return rng.uniform(params[0], params[1], size)
+    if name == 'normal':
+        return rng.normal(params[0], params[1], size)
+    if name == 'lognormal':
+        return rng.lognormal(params[0], params[1], size)
+    if name == 'triangular':
+        return rng.triangular(params[0], params[1], params[2], size)
+    raise ValueError(f"Unknown distribution: {name}")
+
+def _evaluate_chunk(model, distributions, fixed_inputs, seed, size):
+    """
+    Draw one chunk of realizations and evaluate the model on it.
+    """
+    rng = np.random.default_rng(seed)
+    inputs = dict(fixed_inputs)
+    for name, spec in distributions.items():
+        inputs[name] = draw_samples(rng, spec, size)
+    return MODELS[model](inputs) if isinstance(model, str) else model(inputs)
+
+def _summarize_chunk(model, distributions, fixed_inputs, seed, size, edges):
+    """
+    Evaluate one chunk and reduce it to histogram counts and running moments, so only
+    the reduced statistics travel back to the parent process.
+    """
+    outputs = _evaluate_chunk(model, distributions, fixed_inputs, seed, size)
+    summary = {}
+    for name, values in outputs.items():
+        values = np.asarray(values, dtype=float)
+        finite = values[np.isfinite(values)]
+        # Two extra bins collect values below and above the pilot range.
+        bins = np.concatenate(([-np.inf], edges[name], [np.inf]))
+        counts, _ = np.histogram(finite, bins=bins)
+        summary[name] = {
+            'counts': counts,
+            'count': finite.size,
+            'invalid': values.size - finite.size,
+            'mean': finite.mean() if finite.size else 0.0,
+            'm2': np.square(finite - finite.mean()).sum() if finite.size else 0.0,
+            'min': finite.min() if finite.size else np.inf,
+            'max': finite.max() if finite.size else -np.inf,
+        }
+    return summary
+
+def _histogram_percentile(counts, edges, low, high, q):
+    """
+    Interpolate a percentile from histogram counts that include an underflow and an
+    overflow bin; those outer bins are bounded by the observed minimum and maximum.
+    """
+    bounds = np.concatenate(([low], edges, [high]))
+    cumulative = np.cumsum(counts)
+    target = q / 100 * cumulative[-1]
+    i = min(int(np.searchsorted(cumulative, target)), len(counts) - 1)
+    below = cumulative[i - 1] if i > 0 else 0
+    fraction = (target - below) / counts[i] if counts[i] else 0.0
+    left, right = max(bounds[i], low), min(bounds[i + 1], high)
+    return left + fraction * (right - left)
+
+def _merge_chunks(chunks):
+    """
+    Add up chunk summaries as they arrive.
+    """
+    totals = {}
+    for summary in chunks:
+        for name, chunk in summary.items():
+            total = totals.get(name)
+            if total is None:
+                totals[name] = dict(chunk)
+                continue
+            # Pairwise update of mean and sum of squared deviations (Chan et al.).
+            count = total['count'] + chunk['count']
+            if count:
+                delta = chunk['mean'] - total['mean']
+                total['m2'] += chunk['m2'] + delta ** 2 * total['count'] * chunk['count'] / count
+                total['mean'] += delta * chunk['count'] / count
+            total['count'] = count
+            total['invalid'] += chunk['invalid']
+            total['counts'] = total['counts'] + chunk['counts']
+            total['min'] = min(total['min'], chunk['min'])
+            total['max'] = max(total['max'], chunk['max'])
+    return totals
+
+def run_monte_carlo(model, distributions, fixed_inputs=None, realizations=1_000_000, chunk_size=100_000,
+                    seed=None, max_workers=None, bins=1000, percentiles=DEFAULT_PERCENTILES):
+    """
+    Run a Monte Carlo simulation of the saline or depleted calculations.
+
+    Realizations are drawn in vectorized chunks spread over a process pool. Every chunk
+    gets its own child of one SeedSequence, so a given seed reproduces the same results
+    whatever the number of workers. Chunks are reduced to histograms in the workers and
+    merged in the parent, so the full set of realizations is never held in memory.
+
+    :param model: 'saline', 'depleted', or a picklable module-level function taking a
+                  dict of input arrays and returning a dict of output arrays.
+    :param distributions: Mapping of input name to distribution spec (see draw_samples).
+    :param fixed_inputs: Mapping of input name to a constant value for inputs not sampled.
+    :param realizations: Total number of realizations.
+    :param chunk_size: Realizations per vectorized chunk.
+    :param seed: Seed for the root SeedSequence.
+    :param max_workers: Worker processes; 1 runs every chunk in the calling process.
+    :param bins: Histogram bins per output.
+    :param percentiles: Percentiles to report. P10 is the 10th percentile (low case).
+    :return: Tuple of a summary DataFrame (one row per output) and a dict mapping each
+             output name to its (counts, bin_edges) histogram.
+    """
+    fixed_inputs = dict(fixed_inputs or {})
+    sizes = [chunk_size] * (realizations // chunk_size)
+    if realizations % chunk_size:
+        sizes.append(realizations % chunk_size)
+    pilot_seed, *chunk_seeds = np.random.SeedSequence(seed).spawn(len(sizes) + 1)
+
+    # A pilot chunk fixes the histogram range before the workers start.
+    pilot = _evaluate_chunk(model, distributions, fixed_inputs, pilot_seed, min(chunk_size, 10_000))
+    edges = {}
+    for name, values in pilot.items():
+        finite = np.asarray(values, dtype=float)
+        finite = finite[np.isfinite(finite)]
+        low, high = (finite.min(), finite.max()) if finite.size else (0.0, 1.0)
+        margin = (high - low) * 0.05 or abs(low) * 0.05 or 1.0
+        edges[name] = np.linspace(low - margin, high + margin, bins + 1)
+
+    args = [(model, distributions, fixed_inputs, chunk_seed, size, edges) for chunk_seed, size in zip(chunk_seeds, sizes)]
+    if max_workers == 1:
+        chunks = (_summarize_chunk(*arg) for arg in args)
+        totals = _merge_chunks(chunks)
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            totals = _merge_chunks(executor.map(_summarize_chunk, *zip(*args)))
+
+    rows = {}
+    histograms = {}
+    for name, total in totals.items():
+        count = total['count']
+        mean = total['mean'] if count else np.nan
+        variance = total['m2'] / count if count else np.nan
+        row = {f"P{q:g}": _histogram_percentile(total['counts'], edges[name], total['min'], total['max'], q) if count else np.nan
+               for q in percentiles}
+        row.update({
+            'mean': mean,
+            'std': np.sqrt(variance),
+            'min': total['min'],
+            'max': total['max'],
+            'count': count,
+            'invalid': total['invalid'],
+        })
+        rows[name] = row
+        histograms[name] = (total['counts'][1:-1], edges[name])
+    return pd.DataFrame.from_dict(rows, orient='index'), histograms
+
+def main():
+    distributions = {
+        'porosity': ('triangular', 0.1, 0.2, 0.3),
+        'permeability': ('lognormal', np.log(2000), 0.5),
+        'reservoir_thickness': ('uniform', 150, 250),
+    }
+    fixed_inputs = {
+        'injection_rate': 1, 'injection_time': 20, 'reservoir_depth': 4000, 'pressure_gradient': 0.433,
+        'reservoir_angle': 5, 'CO2_relative_permeability': 0.7, 'CO2_density': 838, 'water_density': 1018.1,
+    }
+    summary, _ = run_monte_carlo('saline', distributions, fixed_inputs, realizations=1_000_000, seed=42)
+    print(summary)
+
+    distributions = {
+        'original_oil_in_place': ('triangular', 30e6, 50e6, 80e6),
+        'original_gas_in_place': ('uniform', 5000, 15000),
+        'CO2_density': ('normal', 740, 30),
+    }
+    summary, _ = run_monte_carlo('depleted', distributions, realizations=1_000_000, seed=42)
+    print(summary)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from saline_calculations import calculate_reservoir_pressure
+
+# CO2 viscosity in Pa*s. The sheet holds this placeholder (Saline Storage F31) until the
+# PVT lookup provides it.
+CO2_VISCOSITY = 0.000080082
+SECONDS_PER_YEAR = 31536000
+METERS_PER_MILE = 1609.344
+# Table 1 / Table 2 on the Saline sheet step through time in half years.
+DEFAULT_STEP_YEARS = 0.5
+
+PLUME_INPUTS = (
+    'injection_rate', 'reservoir_thickness', 'porosity', 'reservoir_depth', 'pressure_gradient',
+    'permeability', 'water_salinity', 'CO2_relative_permeability', 'water_relative_permeability',
+    'temperature', 'CO2_density', 'water_density',
+)
+
+# Radius in meters and area in square miles, one row per site and one column per time step.
+PlumeSeries = namedtuple('PlumeSeries', ['years', 'seconds', 'radius_nordbotten', 'area_nordbotten',
+                                         'radius_dong_duan', 'area_dong_duan'])
+
+def calculate_water_formation_volume_factor(temperature, reservoir_pressure):
+    """
+    Calculate the formation volume factor of the formation water (Saline Storage F34).
+
+    :param temperature: Reservoir temperature in Fahrenheit.
+    :param reservoir_pressure: Reservoir pressure in psi.
+    :return: Water formation volume factor.
+    """
+    T, P = temperature, reservoir_pressure
+    return ((1 - 0.010001 + 0.000133391 * T + 0.000000550654 * T ** 2)
+            * (1 - 0.00000000195301 * P * T - 0.000000000000172834 * P ** 2 * T
+               - 0.000000358922 * P - 0.000000000225341 * P ** 2))
+
+def calculate_brine_viscosity(water_salinity, temperature, reservoir_pressure):
+    """
+    Calculate the viscosity of the formation water (Saline Storage F35 to F37).
+
+    :param water_salinity: Salinity of the water in ppm.
+    :param temperature: Reservoir temperature in Fahrenheit.
+    :param reservoir_pressure: Reservoir pressure in psi.
+    :return: Water viscosity in Pa*s.
+    """
+    S = water_salinity * 0.0000954562810232913  # weight percent
+    viscosity_atmospheric = ((109.574 - 8.40564 * S + 0.313314 * S ** 2 + 0.00872213 * S ** 3)
+                             * temperature ** (-1.12166 + 0.0263951 * S - 0.000679461 * S ** 2
+                                               - 0.0000547119 * S ** 3 + 0.00000155586 * S ** 4))  # cP
+    P = reservoir_pressure
+    return viscosity_atmospheric * (0.9994 + 0.000040295 * P + 0.0000000031062 * P) / 1000
+
+def plume_coefficients(sites, CO2_viscosity=CO2_VISCOSITY):
+    """
+    Calculate, per site, the factors that scale the plume radius with time.
+
+    The Nordbotten radius (Table 1) is coefficient * seconds ** 0.5 and the Dong-Duan
+    radius (Table 2) is coefficient * years ** 0.5, following the Saline sheet.
+
+    :param sites: DataFrame or mapping of input name (see PLUME_INPUTS) to a scalar or an array.
+    :param CO2_viscosity: CO2 viscosity in Pa*s, scalar or one value per site.
+    :return: Tuple of Nordbotten and Dong-Duan coefficient arrays, one value per site.
+    """
+    missing = [name for name in PLUME_INPUTS if name not in sites]
+    if missing:
+        raise ValueError(f"Missing plume inputs: {', '.join(missing)}")
+
+    values = np.broadcast_arrays(*(np.atleast_1d(np.asarray(sites[name], dtype=float)) for name in PLUME_INPUTS),
+                                 np.atleast_1d(np.asarray(CO2_viscosity, dtype=float)))
+    p = dict(zip(PLUME_INPUTS + ('CO2_viscosity',), (value.ravel() for value in values)))
+
+    reservoir_pressure = calculate_reservoir_pressure(p['reservoir_depth'], p['pressure_gradient'])
+    injection_rate_m3 = p['injection_rate'] * 31.709 / p['CO2_density']  # m3/s
+    permeability_m2 = p['permeability'] / 1013256069239440
+    delta_density = p['water_density'] - p['CO2_density']
+    water_viscosity = calculate_brine_viscosity(p['water_salinity'], p['temperature'], reservoir_pressure)
+    water_mobility = p['water_relative_permeability'] / water_viscosity
+    CO2_mobility = p['CO2_relative_permeability'] / p['CO2_viscosity']
+
+    nordbotten = 1.15 * ((injection_rate_m3 * permeability_m2 * 9.81 * delta_density)
+                         / (p['porosity'] ** 2 * p['CO2_viscosity'])) ** 0.25
+    dong_duan = ((p['injection_rate'] / p['CO2_density'] * 1000000 * 1000 * CO2_mobility)
+                 / (p['porosity'] * np.pi * water_mobility * p['reservoir_thickness'])) ** 0.5
+    return nordbotten, dong_duan
+
+def plume_time_steps(horizon_years, step_years=DEFAULT_STEP_YEARS):
+    """
+    Return the time steps from 0 to the horizon (inclusive when it falls on a step).
+
+    :param horizon_years: Last time in years.
+    :param step_years: Step in years.
+    :return: Array of times in years.
+    """
+    steps = int(np.floor(horizon_years / step_years + 1e-9))
+    return np.arange(steps + 1) * step_years
+
+def _series(nordbotten, dong_duan, years):
+    seconds = years * SECONDS_PER_YEAR
+    radius_nordbotten = nordbotten[:, np.newaxis] * np.sqrt(seconds)
+    radius_dong_duan = dong_duan[:, np.newaxis] * np.sqrt(years)
+    return PlumeSeries(years, seconds,
+                       radius_nordbotten, np.pi * (radius_nordbotten / METERS_PER_MILE) ** 2,
+                       radius_dong_duan, np.pi * (radius_dong_duan / METERS_PER_MILE) ** 2)
+
+def calculate_plume_series(sites, horizon_years, step_years=DEFAULT_STEP_YEARS, CO2_viscosity=CO2_VISCOSITY):
+    """
+    Calculate plume radius and area against time for a batch of sites.
+
+    :param sites: DataFrame or mapping of input name (see PLUME_INPUTS) to a scalar or an array.
+    :param horizon_years: Last time in years.
+    :param step_years: Step in years.
+    :param CO2_viscosity: CO2 viscosity in Pa*s, scalar or one value per site.
+    :return: PlumeSeries; radius and area arrays have one row per site and one column per step.
+    """
+    nordbotten, dong_duan = plume_coefficients(sites, CO2_viscosity)
+    return _series(nordbotten, dong_duan, plume_time_steps(horizon_years, step_years))
+
+def iter_plume_series(sites, horizon_years, step_years=DEFAULT_STEP_YEARS, CO2_viscosity=CO2_VISCOSITY,
+                      chunk_steps=1024):
+    """
+    Stream plume radius and area against time in blocks of time steps.
+
+    Only one block is held in memory at a time, so long or fine-grained horizons can be
+    written out or charted for many sites.
+
+    :param sites: DataFrame or mapping of input name (see PLUME_INPUTS) to a scalar or an array.
+    :param horizon_years: Last time in years.
+    :param step_years: Step in years.
+    :param CO2_viscosity: CO2 viscosity in Pa*s, scalar or one value per site.
+    :param chunk_steps: Number of time steps per block.
+    :return: Generator of PlumeSeries, each covering the next chunk_steps time steps.
+    """
+    nordbotten, dong_duan = plume_coefficients(sites, CO2_viscosity)
+    steps = int(np.floor(horizon_years / step_years + 1e-9)) + 1
+    for start in range(0, steps, chunk_steps):
+        years = np.arange(start, min(start + chunk_steps, steps)) * step_years
+        yield _series(nordbotten, dong_duan, years)
+
+def plume_series_frame(series, index=None):
+    """
+    Flatten a PlumeSeries to a long DataFrame with one row per site and time step.
+
+    :param series: PlumeSeries.
+    :param index: Optional site labels; defaults to site positions.
+    :return: DataFrame with site, years, seconds, radius and area columns.
+    """
+    sites, steps = series.radius_nordbotten.shape
+    index = np.arange(sites) if index is None else np.asarray(index)
+    return pd.DataFrame({
+        'site': np.repeat(index, steps),
+        'years': np.tile(series.years, sites),
+        'seconds': np.tile(series.seconds, sites),
+        'radius_nordbotten': series.radius_nordbotten.ravel(),
+        'area_nordbotten': series.area_nordbotten.ravel(),
+        'radius_dong_duan': series.radius_dong_duan.ravel(),
+        'area_dong_duan': series.area_dong_duan.ravel(),
+    })
@@ -0,0 +1,197 @@
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from saline_calculations import calculate_reservoir_pressure
+
+# The "PVT Lookup" sections read CO2 properties from a pvt_data table supplied by a
+# different workstream (see README, Configuration). It is expected next to the workbook.
+PVT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Excel", "pvt_data.csv")
+
+# Column headers of the PVT table, as laid out on the Depleted sheet (NIST webbook style,
+# e.g. "Viscosity (uPa*s)"); the unit in parentheses is ignored when matching.
+PVT_COLUMNS = {
+    'pressure': 'Pressure',
+    'temperature': 'Temperature',
+    'density': 'Density',
+    'viscosity': 'Viscosity',
+    'joule_thomson': 'Joule-Thomson',
+    'thermal_conductivity': 'Therm. Cond.',
+    'phase': 'Phase',
+}
+PVT_PROPERTIES = ('density', 'viscosity', 'joule_thomson', 'thermal_conductivity')
+
+# Properties on a regular grid: pressures (psia) and temperatures (F) ascending, each
+# property a 2-D array indexed [pressure, temperature], and phases as codes into phase_names.
+PVTGrid = namedtuple('PVTGrid', ['pressures', 'temperatures', 'properties', 'phases', 'phase_names'])
+
+# Number of scalar queries memoized per table before the memo is cleared.
+PVT_MEMO_SIZE = 4096
+
+def _normalize_header(header):
+    return re.sub(r'\s*\(.*?\)\s*', '', str(header)).strip().lower()
+
+def build_pvt_grid(table):
+    """
+    Arrange a PVT table on a regular pressure-temperature grid.
+
+    :param table: DataFrame with one row per (pressure, temperature) point and the columns
+                  of PVT_COLUMNS; properties that are missing are left out of the grid.
+    :return: PVTGrid.
+    """
+    headers = {_normalize_header(column): column for column in table.columns}
+    columns = {field: headers[label.lower()] for field, label in PVT_COLUMNS.items() if label.lower() in headers}
+    for field in ('pressure', 'temperature'):
+        if field not in columns:
+            raise ValueError(f"Required field '{PVT_COLUMNS[field]}' not found in the data.")
+
+    pressure = pd.to_numeric(table[columns['pressure']], errors='raise').to_numpy(dtype=float)
+    temperature = pd.to_numeric(table[columns['temperature']], errors='raise').to_numpy(dtype=float)
+    pressures, p_index = np.unique(pressure, return_inverse=True)
+    temperatures, t_index = np.unique(temperature, return_inverse=True)
+    if len(pressures) < 2 or len(temperatures) < 2:
+        raise ValueError("PVT table needs at least two pressures and two temperatures.")
+
+    filled = np.zeros((len(pressures), len(temperatures)), dtype=int)
+    np.add.at(filled, (p_index, t_index), 1)
+    if (filled != 1).any():
+        raise ValueError("PVT table is not a regular grid: every pressure needs one row per temperature.")
+
+    properties = {}
+    for field in PVT_PROPERTIES:
+        if field in columns:
+            values = np.empty(filled.shape)
+            values[p_index, t_index] = pd.to_numeric(table[columns[field]], errors='coerce').to_numpy(dtype=float)
+            properties[field] = values
+
+    phases = np.full(filled.shape, -1)
+    phase_names = ()
+    if 'phase' in columns:
+        phase_names, codes = np.unique(table[columns['phase']].astype(str).str.strip().to_numpy(), return_inverse=True)
+        phases[p_index, t_index] = codes
+        phase_names = tuple(phase_names)
+    return PVTGrid(pressures, temperatures, properties, phases, phase_names)
+
+def _cell(axis, values):
+    """
+    Locate values on an ascending axis.
+
+    :return: Tuple of lower cell index, fractional position within the cell, and a mask
+             of the values inside the axis range.
+    """
+    index = np.clip(np.searchsorted(axis, values, side='right') - 1, 0, len(axis) - 2)
+    fraction = (values - axis[index]) / (axis[index + 1] - axis[index])
+    inside = (values >= axis[0]) & (values <= axis[-1])
+    return index, fraction, inside
+
+def interpolate_property(grid, name, pressure, temperature):
+    """
+    Bilinear interpolation of a PVT property for arrays of pressure and temperature.
+
+    :param grid: PVTGrid.
+    :param name: Property name (see PVT_PROPERTIES).
+    :param pressure: Pressure in psia, scalar or array.
+    :param temperature: Temperature in F, scalar or array (broadcast against pressure).
+    :return: Array of property values; NaN for points outside the grid.
+    """
+    if name not in grid.properties:
+        raise KeyError(f"PVT property '{name}' not in the table")
+    values = grid.properties[name]
+    pressure, temperature = np.broadcast_arrays(np.asarray(pressure, dtype=float), np.asarray(temperature, dtype=float))
+    i, u, p_inside = _cell(grid.pressures, pressure)
+    j, v, t_inside = _cell(grid.temperatures, temperature)
+    result = ((1 - u) * (1 - v) * values[i, j] + u * (1 - v) * values[i + 1, j]
+              + (1 - u) * v * values[i, j + 1] + u * v * values[i + 1, j + 1])
+    return np.where(p_inside & t_inside, result, np.nan)
+
+def lookup_phase(grid, pressure, temperature):
+    """
+    Phase at the grid point nearest to each (pressure, temperature).
+
+    :param grid: PVTGrid.
+    :param pressure: Pressure in psia, scalar or array.
+    :param temperature: Temperature in F, scalar or array.
+    :return: Array of phase names; None for points outside the grid.
+    """
+    pressure, temperature = np.broadcast_arrays(np.asarray(pressure, dtype=float), np.asarray(temperature, dtype=float))
+    i, u, p_inside = _cell(grid.pressures, pressure)
+    j, v, t_inside = _cell(grid.temperatures, temperature)
+    codes = grid.phases[i + (u >= 0.5), j + (v >= 0.5)]
+    names = np.array(grid.phase_names + (None,), dtype=object)
+    return np.where(p_inside & t_inside & (codes >= 0), names[codes], None)
+
+class PVTTable:
+    """
+    A PVT table loaded once into a regular grid, answering vectorized lookups.
+
+    Repeated points are evaluated once: array queries are deduplicated before
+    interpolating, and scalar queries are memoized.
+    """
+
+    def __init__(self, grid):
+        """
+        :param grid: PVTGrid.
+        """
+        self.grid = grid
+        self._memo = {}
+
+    @classmethod
+    def from_csv(cls, file_path=PVT_TABLE_PATH):
+        """
+        Load a PVT table from a CSV file.
+
+        :param file_path: Path to the CSV file.
+        :return: PVTTable.
+        """
+        return cls(build_pvt_grid(pd.read_csv(file_path)))
+
+    def lookup(self, name, pressure, temperature):
+        """
+        Look up a property (see PVT_PROPERTIES) or 'phase' at pressures and temperatures.
+
+        :param name: Property name, or 'phase'.
+        :param pressure: Pressure in psia, scalar or array.
+        :param temperature: Temperature in F, scalar or array.
+        :return: Float (or phase name) for scalar queries, array otherwise.
+        """
+        if np.ndim(pressure) == 0 and np.ndim(temperature) == 0:
+            key = (name, float(pressure), float(temperature))
+            if key not in self._memo:
+                if len(self._memo) >= PVT_MEMO_SIZE:
+                    self._memo.clear()
+                self._memo[key] = self._evaluate(name, np.array([key[1]]), np.array([key[2]]))[0]
+            return self._memo[key]
+
+        pressure, temperature = np.broadcast_arrays(np.asarray(pressure, dtype=float), np.asarray(temperature, dtype=float))
+        # Hash each (pressure, temperature) pair as one complex number to find repeats.
+        codes, points = pd.factorize(pressure.ravel() + 1j * temperature.ravel())
+        values = self._evaluate(name, points.real, points.imag)
+        return values[codes].reshape(pressure.shape)
+
+    def _evaluate(self, name, pressure, temperature):
+        if name == 'phase':
+            return lookup_phase(self.grid, pressure, temperature)
+        return interpolate_property(self.grid, name, pressure, temperature)
+
+    def reservoir_properties(self, reservoir_depth, pressure_gradient, temperature, names=PVT_PROPERTIES):
+        """
+        CO2 properties at reservoir conditions, for sweeps over depth and temperature.
+
+        :param reservoir_depth: Depth of the reservoir in meters, scalar or array.
+        :param pressure_gradient: Pressure gradient in psi/ft, scalar or array.
+        :param temperature: Reservoir temperature in F, scalar or array.
+        :param names: Properties to look up; those missing from the table are skipped.
+        :return: DataFrame with reservoir_pressure and one column per property.
+        """
+        depth, gradient, temperature = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(value, dtype=float)) for value in (reservoir_depth, pressure_gradient, temperature)))
+        pressure = calculate_reservoir_pressure(depth.ravel(), gradient.ravel())
+        temperature = temperature.ravel()
+        result = {'reservoir_pressure': pressure, 'temperature': temperature}
+        for name in names:
+            if name == 'phase' or name in self.grid.properties:
+                result[name] = self.lookup(name, pressure, temperature)
+        return pd.DataFrame(result)
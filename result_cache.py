@@ -0,0 +1,214 @@
+import datetime
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+
+# Modules whose source defines the numbers a cached result holds: the formulas, and the
+# parsing, default filling and PVT lookups that complete a scenario before it is
+# evaluated. Editing any of them changes MODEL_VERSION, so results computed by older code
+# are never served.
+MODEL_MODULES = (
+    'saline_calculations', 'saline_batch', 'depleted_calculations', 'depleted_batch',
+    'cashflow_model', 'irr_solver', 'plume_series', 'input_schema', 'economic_analysis', 'pvt', 'service',
+)
+DEFAULT_MAX_ENTRIES = 4096
+# Results kept in the SQLite store; the oldest are evicted beyond this.
+DEFAULT_MAX_DISK_ENTRIES = 1_000_000
+
+def _model_version():
+    root = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for module in MODEL_MODULES:
+        with open(os.path.join(root, f"{module}.py"), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+MODEL_VERSION = _model_version()
+
+def _normalize(value):
+    """
+    Map a value onto the canonical form used for hashing.
+    """
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if hasattr(value, 'item') and not isinstance(value, (str, bytes)):
+        value = value.item()  # NumPy and pandas scalars
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        value = float(value)
+        if math.isnan(value):
+            return None
+        # 1, 1.0 and -0.0/0.0 hash alike; repr keeps every bit of the float.
+        return repr(value + 0.0)
+    return str(value)
+
+def canonical_key(kind, record, model_version=MODEL_VERSION):
+    """
+    Hash an input record into a cache key.
+
+    Field order, int/float spelling and NumPy scalar types do not change the key; the
+    model kind and model version do.
+
+    :param kind: Model name, e.g. 'saline', 'depleted' or 'economic'.
+    :param record: Mapping of input name to value.
+    :param model_version: Version of the model code.
+    :return: Hex digest.
+    """
+    payload = json.dumps([kind, model_version, _normalize(record)], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+class ResultCache:
+    """
+    Results of full evaluations keyed by canonical_key.
+
+    An in-process LRU layer holds the most recent max_entries results. When a path is
+    given, results are also kept in a SQLite database (WAL mode) that several worker
+    processes can read and write at the same time, holding the most recently written
+    max_disk_entries results.
+    """
+
+    def __init__(self, path=None, max_entries=DEFAULT_MAX_ENTRIES, model_version=MODEL_VERSION,
+                 max_disk_entries=DEFAULT_MAX_DISK_ENTRIES):
+        """
+        :param path: SQLite file shared between processes; None keeps results in memory only.
+        :param max_entries: Results held by the in-process LRU layer.
+        :param model_version: Version of the model code stored with every result.
+        :param max_disk_entries: Results held by the SQLite store.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.model_version = model_version
+        self._memory = OrderedDict()
+        self._connection = None
+        self._pid = None
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _db(self):
+        # Connections must not cross a fork, so every process opens its own.
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results "
+                "(key TEXT PRIMARY KEY, kind TEXT, model_version TEXT, value TEXT, created REAL)")
+            self._pid = os.getpid()
+        return self._connection
+
+    def key(self, kind, record):
+        """
+        :return: Cache key of an input record under this cache's model version.
+        """
+        return canonical_key(kind, record, self.model_version)
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def get_many(self, keys):
+        """
+        Look up several keys, from memory first and then from the SQLite store.
+
+        :param keys: Cache keys.
+        :return: Dict of key to cached result, for the keys found.
+        """
+        found = {}
+        for key in keys:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                found[key] = self._memory[key]
+        self.stats['memory_hits'] += len(found)
+
+        remaining = [key for key in dict.fromkeys(keys) if key not in found]
+        if remaining and self.path:
+            db = self._db()
+            for start in range(0, len(remaining), 500):
+                block = remaining[start:start + 500]
+                rows = db.execute(f"SELECT key, value FROM results WHERE key IN ({','.join('?' * len(block))})", block)
+                for key, value in rows:
+                    found[key] = json.loads(value)
+                    self._remember(key, found[key])
+                    self.stats['disk_hits'] += 1
+        self.stats['misses'] += sum(key not in found for key in dict.fromkeys(keys))
+        return found
+
+    def put_many(self, items, kind=None):
+        """
+        Store results.
+
+        Writes to the SQLite store are one transaction, rolled back on error. Rows are
+        numbered in write order (a replaced row gets a new number), so the oldest rows
+        beyond max_disk_entries are evicted with one range delete.
+
+        :param items: Dict of key to JSON-serializable result.
+        :param kind: Model name stored alongside the results.
+        """
+        for key, value in items.items():
+            self._remember(key, value)
+        if items and self.path:
+            now = time.time()
+            rows = [(key, kind, self.model_version, json.dumps(value), now) for key, value in items.items()]
+            db = self._db()
+            with db:
+                db.execute("BEGIN")
+                db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", rows)
+                db.execute("DELETE FROM results WHERE rowid <= (SELECT MAX(rowid) FROM results) - ?",
+                           (self.max_disk_entries,))
+
+    def get_or_compute(self, kind, records, compute):
+        """
+        Return the results of a batch of records, computing only those not cached.
+
+        :param kind: Model name.
+        :param records: List of input records (mappings).
+        :param compute: Function taking a list of records and returning their results in order.
+        :return: List of results, one per record.
+        """
+        keys = [self.key(kind, record) for record in records]
+        found = self.get_many(keys)
+        missing = {}
+        for key, record in zip(keys, records):
+            if key not in found:
+                missing.setdefault(key, record)
+        if missing:
+            computed = dict(zip(missing, compute(list(missing.values()))))
+            self.put_many(computed, kind)
+            found.update(computed)
+        return [found[key] for key in keys]
+
+    def info(self):
+        """
+        :return: Hit/miss counters, hit rate and number of results held in memory.
+        """
+        lookups = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['misses']
+        hit_rate = (lookups - self.stats['misses']) / lookups if lookups else None
+        return dict(self.stats, lookups=lookups, hit_rate=hit_rate, memory_entries=len(self._memory))
+
+    def clear(self):
+        """
+        Drop every cached result, in memory and on disk.
+        """
+        self._memory.clear()
+        if self.path:
+            self._db().execute("DELETE FROM results")
+
+    def close(self):
+        """
+        Close the SQLite connection.
+        """
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+import saline_calculations as saline
+
+# Inputs read by the saline formulas. The storage-efficiency signatures accept more
+# parameters (salinity, water relative permeability, temperature) but never use them.
+SALINE_BATCH_INPUTS = (
+    'injection_rate', 'reservoir_thickness', 'injection_time', 'porosity', 'reservoir_depth',
+    'pressure_gradient', 'reservoir_angle', 'permeability', 'CO2_relative_permeability',
+    'CO2_density', 'water_density',
+)
+
+SALINE_BATCH_OUTPUTS = (
+    'storage_efficiency_no_dip', 'storage_efficiency_dip', 'radius', 'area', 'reservoir_pressure',
+    'delta_density', 'radius_dong', 'area_dong', 'radius_nordbotten', 'area_nordbotten',
+)
+
+def calculate_saline_batch(sites):
+    """
+    Calculate every saline output for a batch of sites in one vectorized pass.
+
+    Each output column matches the scalar function of the same name in
+    saline_calculations, site by site.
+
+    :param sites: DataFrame or mapping of input name (see SALINE_BATCH_INPUTS) to a scalar
+                  or an array. Scalars and arrays are broadcast against each other.
+    :return: DataFrame with one row per site and one column per output in SALINE_BATCH_OUTPUTS.
+    """
+    missing = [name for name in SALINE_BATCH_INPUTS if name not in sites]
+    if missing:
+        raise ValueError(f"Missing saline inputs: {', '.join(missing)}")
+
+    values = np.broadcast_arrays(*(np.atleast_1d(np.asarray(sites[name], dtype=float)) for name in SALINE_BATCH_INPUTS))
+    p = dict(zip(SALINE_BATCH_INPUTS, (value.ravel() for value in values)))
+
+    # The scalar functions also accept arrays, so every output comes from the same formula
+    # as in saline_calculations. Inputs they take but never read are passed as None.
+    storage_efficiency_no_dip = saline.calculate_storage_efficiency_no_dip(
+        p['injection_rate'], p['reservoir_thickness'], p['injection_time'], p['reservoir_depth'], p['pressure_gradient'],
+        p['reservoir_angle'], p['permeability'], None, p['CO2_relative_permeability'], None, None, p['porosity'])
+    storage_efficiency_dip = saline.calculate_storage_efficiency_with_dip(
+        p['injection_rate'], p['reservoir_thickness'], p['injection_time'], p['reservoir_depth'], p['pressure_gradient'],
+        p['reservoir_angle'], p['permeability'], None, p['CO2_relative_permeability'], None, None, p['porosity'])
+    radius = saline.calculate_radius_dong_duan(p['injection_rate'], p['permeability'], p['porosity'])
+    area = saline.calculate_area(radius)
+    reservoir_pressure = saline.calculate_reservoir_pressure(p['reservoir_depth'], p['pressure_gradient'])
+    delta_density = saline.calculate_density(p['CO2_density'], p['water_density'])
+    radius_dong = saline.calculate_radius_dong(p['injection_rate'], p['reservoir_thickness'], p['injection_time'], p['porosity'], p['permeability'])
+    area_dong = saline.calculate_area_dong(radius_dong)
+    radius_nordbotten = saline.calculate_radius_nordbotten(p['injection_rate'], p['permeability'], p['porosity'])
+    area_nordbotten = saline.calculate_area_nordbotten(radius_nordbotten)
+
+    index = sites.index if isinstance(sites, pd.DataFrame) else None
+    return pd.DataFrame({
+        'storage_efficiency_no_dip': storage_efficiency_no_dip,
+        'storage_efficiency_dip': storage_efficiency_dip,
+        'radius': radius,
+        'area': area,
+        'reservoir_pressure': reservoir_pressure,
+        'delta_density': delta_density,
+        'radius_dong': radius_dong,
+        'area_dong': area_dong,
+        'radius_nordbotten': radius_nordbotten,
+        'area_nordbotten': area_nordbotten,
+    }, index=index)
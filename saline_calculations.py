@@ -1,10 +1,25 @@
-import pandas as pd
 import math
 
 # global variable
 ETA = 1.0 # Replace this with the actual value
 GAMMA = 1.0 # Replace this with the actual value
 
+def _elementwise(name, value):
+    """
+    Apply a math function to a number, or its NumPy counterpart to an array, so the
+    formulas below also evaluate whole batches of sites (see saline_batch). NumPy is only
+    imported when an array is passed.
+
+    :param name: Name of the function in both math and numpy, e.g. 'sqrt'.
+    :param value: Number or array.
+    :return: Result of the function.
+    """
+    if isinstance(value, (int, float)):
+        return getattr(math, name)(value)
+    import numpy as np
+
+    return getattr(np, name)(value)
+
 def extract_saline_data(file_path):
     """
     Extract saline data from a CSV file.
@@ -12,6 +27,8 @@ def extract_saline_data(file_path):
     :param file_path: Path to the CSV file.
     :return: DataFrame containing the saline data.
     """
+    import pandas as pd
+
     saline_data = pd.read_csv(file_path, skiprows=1)
     return saline_data
 
@@ -64,10 +81,10 @@ def calculate_storage_efficiency_with_dip(injection_rate, reservoir_thickness, i
 
     # Define constants
     area = 1  # area can be calculate or assumed as 1 for efficiency purposes
-    dip_angle_radians = math.radians(reservoir_angle) # Convert angle to radians
+    dip_angle_radians = _elementwise('radians', reservoir_angle) # Convert angle to radians
 
     # Storage efficiency with dip
-    storage_efficiency = (permeability * injection_time * reservoir_thickness * porosity * CO2_relative_permeability * math.sin(dip_angle_radians)) / area
+    storage_efficiency = (permeability * injection_time * reservoir_thickness * porosity * CO2_relative_permeability * _elementwise('sin', dip_angle_radians)) / area
     return storage_efficiency * 100  # Convert to percent
 
 def calculate_radius_dong_duan(injection_rate, permeability, porosity):
@@ -81,7 +98,7 @@ def calculate_radius_dong_duan(injection_rate, permeability, porosity):
     """
     # Convert injection rate to cubic meters per second
     Q = injection_rate * 1e6 / (365.25 * 24 * 3600)
-    radius_dong_duan = ETA * (GAMMA * permeability / porosity) ** 0.25 * math.sqrt(Q)
+    radius_dong_duan = ETA * (GAMMA * permeability / porosity) ** 0.25 * _elementwise('sqrt', Q)
     return radius_dong_duan
 
 
@@ -103,7 +120,7 @@ def calculate_reservoir_pressure(reservoir_depth, pressure_gradient):
     :param pressure_gradient: Pressure gradient in psi/ft.
     :return: Reservoir pressure in psi.
     """
-    reservoir_depth_ft = reservoir_depth * 2.28084
+    reservoir_depth_ft = reservoir_depth * 3.28  # ft per m, as on the Saline sheet (F24)
     reservoir_pressure = pressure_gradient * reservoir_depth_ft
     return reservoir_pressure
 
@@ -131,7 +148,7 @@ def calculate_radius_dong(injection_rate, reservoir_thickness, injection_time, p
     :return: Radius of the aquifer in meters.
     """
     C = 1.0 # Empirical constantfor unit adjustments
-    radius_dong = C * math.sqrt(injection_rate * injection_time / (porosity * reservoir_thickness * permeability))
+    radius_dong = C * _elementwise('sqrt', injection_rate * injection_time / (porosity * reservoir_thickness * permeability))
     return radius_dong
 
 def calculate_area_dong(radius):
@@ -155,7 +172,7 @@ def calculate_radius_nordbotten(injection_rate, permeability, porosity):
     """
     # Convert injection rate to cubic meters per second
     Q = injection_rate * 1e6 / (365.25 * 24 * 3600)
-    radius_nordbotten = ETA * (GAMMA * permeability / porosity) ** 0.25 * math.sqrt(Q)
+    radius_nordbotten = ETA * (GAMMA * permeability / porosity) ** 0.25 * _elementwise('sqrt', Q)
     return radius_nordbotten
 
 def calculate_area_nordbotten(radius):
@@ -169,35 +186,29 @@ def calculate_area_nordbotten(radius):
     return area_nordbotten
 
 def main():
+    from input_schema import SALINE_SCHEMA, extract_inputs
+
     file_path = "Calculations for python - Saline Storage.csv"
     saline_data =  extract_saline_data(file_path)
 
-    injection_rate = float(saline_data.loc[saline_data['Unnamed: 2'] == 'Injection Rate', 'Unnamed: 5'].values[0])
-    reservoir_thickness = float(saline_data.loc[saline_data['Unnamed: 2'] == 'Reservoir Thickness', 'Unnamed: 5'].values[0])
-    injection_time = float(saline_data.loc[saline_data['Unnamed: 2'] == 'Injection Time', 'Unnamed: 5'].values[0])
-    porosity = float(saline_data.loc[saline_data['Unnamed: 2'] == 'Porosity', 'Unnamed: 5'].values[0])
-    reservoir_depth = float(saline_data.loc[saline_data['Unnamed: 2'] == 'Reservoir Depth', 'Unnamed: 5'].values[0])
-    pressure_gradient = float(saline_data.loc[saline_data['Unnamed: 2'] == 'Pressure Gradient', 'Unnamed: 5'].values[0])
-    reservoir_angle = float(saline_data.loc[saline_data['Unnamed: 2'] == 'Reservoir Angle', 'Unnamed: 5'].values[0])
-    permeability = float(saline_data.loc[saline_data['Unnamed: 2'] == 'Permeability', 'Unnamed: 5'].values[0])
-    water_salinity = float(saline_data.loc[saline_data['Unnamed: 2'] == 'Water Salinity', 'Unnamed: 5'].values[0])
-    CO2_relative_permeability = float(saline_data.loc[saline_data['Unnamed: 2'] == 'CO2 Relative Permeability', 'Unnamed: 5'].values[0])
-    water_relative_permeability = float(saline_data.loc[saline_data['Unnamed: 2'] == 'Water Relative Permeability', 'Unnamed: 5'].values[0])
-    temperature = float(saline_data.loc[saline_data['Unnamed: 2'] == 'Temperature', 'Unnamed: 5'].values[0])
-    CO2_density = float(saline_data.loc[saline_data['Unnamed: 2'] == 'CO2 Density', 'Unnamed: 5'].values[0])
-    water_density = float(saline_data.loc[saline_data['Unnamed: 2'] == 'Water Density', 'Unnamed: 5'].values[0])
-
+    inputs = extract_inputs(saline_data, SALINE_SCHEMA)
 
     # Perfom calculations
-    storage_efficiency_no_dip = calculate_storage_efficiency_no_dip(injection_rate, reservoir_thickness, injection_time, porosity, reservoir_depth, pressure_gradient, reservoir_angle, permeability, water_salinity, CO2_relative_permeability, water_relative_permeability, temperature)
-    storage_efficiency_dip = calculate_storage_efficiency_with_dip(injection_rate, reservoir_thickness, injection_time, porosity, reservoir_depth, pressure_gradient, reservoir_angle, permeability, water_salinity, CO2_relative_permeability, water_relative_permeability, temperature)
-    radius = calculate_radius_dong_duan(injection_rate, permeability, porosity)
+    storage_efficiency_no_dip = calculate_storage_efficiency_no_dip(
+        inputs.injection_rate, inputs.reservoir_thickness, inputs.injection_time, inputs.reservoir_depth, inputs.pressure_gradient,
+        inputs.reservoir_angle, inputs.permeability, inputs.water_salinity, inputs.CO2_relative_permeability,
+        inputs.water_relative_permeability, inputs.temperature, inputs.porosity)
+    storage_efficiency_dip = calculate_storage_efficiency_with_dip(
+        inputs.injection_rate, inputs.reservoir_thickness, inputs.injection_time, inputs.reservoir_depth, inputs.pressure_gradient,
+        inputs.reservoir_angle, inputs.permeability, inputs.water_salinity, inputs.CO2_relative_permeability,
+        inputs.water_relative_permeability, inputs.temperature, inputs.porosity)
+    radius = calculate_radius_dong_duan(inputs.injection_rate, inputs.permeability, inputs.porosity)
     area = calculate_area(radius)
-    reservoir_pressure = calculate_reservoir_pressure(reservoir_depth, pressure_gradient)
-    delta_density = calculate_density(CO2_density, water_density)
-    radius_dong = calculate_radius_dong(injection_rate, reservoir_thickness, injection_time, porosity, permeability)
+    reservoir_pressure = calculate_reservoir_pressure(inputs.reservoir_depth, inputs.pressure_gradient)
+    delta_density = calculate_density(inputs.CO2_density, inputs.water_density)
+    radius_dong = calculate_radius_dong(inputs.injection_rate, inputs.reservoir_thickness, inputs.injection_time, inputs.porosity, inputs.permeability)
     area_dong = calculate_area_dong(radius_dong)
-    radius_nordbotten = calculate_radius_nordbotten(injection_rate, reservoir_thickness, injection_time, porosity, permeability, reservoir_depth)
+    radius_nordbotten = calculate_radius_nordbotten(inputs.injection_rate, inputs.permeability, inputs.porosity)
     area_nordbotten = calculate_area_nordbotten(radius_nordbotten)
 
     # return storage_efficiency_no_dip, storage_efficiency_dip, radius, area, reservoir_pressure, delta_density
@@ -0,0 +1,205 @@
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from cashflow_model import (CAPEX_SCHEDULE_YEARS, ECONOMIC_INPUT_LABELS, MODEL_START, MODEL_YEARS, build_cash_flows,
+                            evaluate_economics)
+from depleted_batch import DEPLETED_BATCH_INPUTS, calculate_depleted_batch
+from saline_batch import SALINE_BATCH_INPUTS, calculate_saline_batch
+
+# Per model: the inputs that can be perturbed and the batch evaluator.
+SENSITIVITY_MODELS = {
+    'saline': (SALINE_BATCH_INPUTS, calculate_saline_batch),
+    'depleted': (DEPLETED_BATCH_INPUTS, calculate_depleted_batch),
+    'economic': (tuple(field for field in ECONOMIC_INPUT_LABELS if field != 'injection_start'), evaluate_economics),
+}
+TORNADO_DELTA = 0.1
+# Relative changes plotted on a spider chart.
+SPIDER_CHANGES = (-0.3, -0.2, -0.1, 0.0, 0.1, 0.2, 0.3)
+# Outputs that only need the discount factors, so rate sweeps use the matrix product.
+RATE_CURVE_OUTPUTS = ('npv', 'profitability_index')
+# Shares of the capex spent in each of the first years; they sum to one, so moving one
+# alone is not a meaningful scenario.
+CAPEX_PHASING_FIELDS = tuple(f'capex_year_{year}' for year in range(CAPEX_SCHEDULE_YEARS))
+# Counts and whole years. Perturbed values are rounded, and they are left out of the
+# default fields because a relative change of a small count is mostly rounding.
+INTEGER_FIELDS = ('project_life', 'legacy_wells', 'injection_wells', 'monitor_wells')
+
+@lru_cache(maxsize=32)
+def _discount_factor_matrix(rates, periods):
+    matrix = (1.0 + np.asarray(rates))[np.newaxis, :] ** -np.arange(periods, dtype=float)[:, np.newaxis]
+    matrix.flags.writeable = False
+    return matrix
+
+def discount_factor_matrix(rates, periods):
+    """
+    Return the discount factors (1 + r) ** -i for a grid of rates.
+
+    Matrices are cached per rate grid, so repeated curves over the same grid reuse them.
+
+    :param rates: Discount rates.
+    :param periods: Number of periods (period 0 first).
+    :return: Read-only array with one row per period and one column per rate.
+    """
+    return _discount_factor_matrix(tuple(float(rate) for rate in np.atleast_1d(rates)), int(periods))
+
+def npv_curves(cash_flows, rates):
+    """
+    Calculate the NPV of many cash-flow series over a grid of discount rates.
+
+    :param cash_flows: 2-D array of cash flows, one row per scenario (period 0 first).
+    :param rates: Discount rates.
+    :return: 2-D array with one row per scenario and one column per rate.
+    """
+    cash_flows = np.atleast_2d(np.asarray(cash_flows, dtype=float))
+    return cash_flows @ discount_factor_matrix(rates, cash_flows.shape[1])
+
+def rate_curves(assumptions, rates, model_start=MODEL_START, model_years=MODEL_YEARS):
+    """
+    Calculate NPV and profitability index against the discount rate for a batch of projects.
+
+    The cash flows do not depend on the discount rate, so they are built once and every
+    rate is applied with one matrix product.
+
+    :param assumptions: DataFrame or mapping of assumption field to a scalar or an array.
+    :param rates: Discount rates.
+    :param model_start: Date of the first model year.
+    :param model_years: Number of model years.
+    :return: Dict with 'npv' and 'profitability_index' DataFrames, one row per project and
+             one column per rate.
+    """
+    schedule = build_cash_flows(assumptions, model_start, model_years)
+    rates = np.atleast_1d(np.asarray(rates, dtype=float))
+    factors = discount_factor_matrix(rates, model_years)
+    index = assumptions.index if isinstance(assumptions, pd.DataFrame) else None
+    columns = pd.Index(rates, name='discount_rate')
+    npv = schedule['after_tax_cash_flow'] @ factors
+    profitability_index = -(schedule['net_cash_flow_escalated'] @ factors) / schedule['total_capex'].sum(axis=1)[:, np.newaxis]
+    return {
+        'npv': pd.DataFrame(npv, index=index, columns=columns),
+        'profitability_index': pd.DataFrame(profitability_index, index=index, columns=columns),
+    }
+
+def _model(model):
+    if model not in SENSITIVITY_MODELS:
+        raise ValueError(f"Unknown model '{model}'; use one of {', '.join(SENSITIVITY_MODELS)}")
+    return SENSITIVITY_MODELS[model]
+
+def _default_fields(model, base):
+    inputs, _ = _model(model)
+    return [field for field in inputs if field in base and float(base[field]) != 0
+            and field not in CAPEX_PHASING_FIELDS and field not in INTEGER_FIELDS]
+
+def _perturbed(field, value, change):
+    value = float(value) * (1 + change)
+    return float(round(value)) if field in INTEGER_FIELDS else value
+
+def evaluate_variations(model, base, variations, outputs=None):
+    """
+    Evaluate a model for many single-input variations of a base case in one batched pass.
+
+    :param model: 'saline', 'depleted' or 'economic'.
+    :param base: Mapping of input name to its base value.
+    :param variations: List of (field, value) pairs; each becomes one scenario that differs
+                       from the base in that field only. A field of None keeps the base case.
+    :param outputs: Outputs to return; all if None.
+    :return: DataFrame with one row per variation: field, value and the outputs.
+    """
+    inputs, evaluate = _model(model)
+    unknown = sorted({field for field, _ in variations if field is not None and field not in inputs})
+    if unknown:
+        raise ValueError(f"Unknown {model} inputs: {', '.join(unknown)}")
+    frame = pd.DataFrame({name: [value] * len(variations) for name, value in base.items()})
+    fields = [field for field, _ in variations]
+    values = np.array([value for _, value in variations], dtype=float)
+    for field in dict.fromkeys(field for field in fields if field is not None):
+        rows = np.array([name == field for name in fields])
+        frame[field] = frame[field].astype(float)
+        frame.loc[rows, field] = values[rows]
+    results = evaluate(frame)
+    results = results[list(outputs)] if outputs is not None else results
+    results.insert(0, 'value', values)
+    results.insert(0, 'field', fields)
+    return results.reset_index(drop=True)
+
+def tornado(model, base, fields=None, delta=TORNADO_DELTA, outputs=None):
+    """
+    Build tornado-chart tables: each input moved down and up by a relative delta.
+
+    :param model: 'saline', 'depleted' or 'economic'.
+    :param base: Mapping of input name to its base value.
+    :param fields: Inputs to perturb; defaults to every model input with a non-zero base value
+                   except CAPEX_PHASING_FIELDS and INTEGER_FIELDS. Values of INTEGER_FIELDS
+                   are rounded.
+    :param delta: Relative change, e.g. 0.1 for +/-10%.
+    :param outputs: Outputs to report; all if None.
+    :return: DataFrame with one row per (output, field): low/high input values, low/base/high
+             output values and the swing |high - low|, sorted by swing within each output.
+    """
+    fields = list(fields) if fields is not None else _default_fields(model, base)
+    variations = [(None, np.nan)]
+    for field in fields:
+        variations += [(field, _perturbed(field, base[field], -delta)), (field, _perturbed(field, base[field], delta))]
+    results = evaluate_variations(model, base, variations, outputs)
+    names = [column for column in results.columns if column not in ('field', 'value')]
+
+    rows = []
+    for output in names:
+        base_output = results[output].iloc[0]
+        for i, field in enumerate(fields):
+            low, high = results.iloc[1 + 2 * i], results.iloc[2 + 2 * i]
+            rows.append({'output': output, 'field': field, 'low_value': low['value'], 'high_value': high['value'],
+                         'low_output': low[output], 'base_output': base_output, 'high_output': high[output],
+                         'swing': abs(high[output] - low[output])})
+    table = pd.DataFrame(rows, columns=['output', 'field', 'low_value', 'high_value', 'low_output',
+                                        'base_output', 'high_output', 'swing'])
+    order = {output: position for position, output in enumerate(names)}
+    table['order'] = table['output'].map(order)
+    table = table.sort_values(['order', 'swing'], ascending=[True, False], na_position='last', kind='stable')
+    return table.drop(columns='order').reset_index(drop=True)
+
+def spider(model, base, fields=None, changes=SPIDER_CHANGES, outputs=None):
+    """
+    Build spider-plot tables: each input varied over relative changes from its base value.
+
+    :param model: 'saline', 'depleted' or 'economic'.
+    :param base: Mapping of input name to its base value.
+    :param fields: Inputs to vary; defaults as in tornado. Values of INTEGER_FIELDS are rounded.
+    :param changes: Relative changes, e.g. (-0.2, -0.1, 0, 0.1, 0.2).
+    :param outputs: Outputs to report; all if None.
+    :return: DataFrame indexed by change, with (output, field) columns.
+    """
+    fields = list(fields) if fields is not None else _default_fields(model, base)
+    changes = [float(change) for change in changes]
+    variations = [(field, _perturbed(field, base[field], change)) for field in fields for change in changes]
+    results = evaluate_variations(model, base, variations, outputs)
+    results['change'] = np.tile(changes, len(fields))
+    names = [column for column in results.columns if column not in ('field', 'value', 'change')]
+    table = results.pivot(index='change', columns='field', values=names)
+    table.columns.names = ['output', 'field']
+    return table.reindex(columns=pd.MultiIndex.from_product([names, fields], names=['output', 'field']))
+
+def sweep(model, base, field, values, outputs=None):
+    """
+    Evaluate a model over a grid of values of one input.
+
+    Sweeps of the economic discount rate that only ask for RATE_CURVE_OUTPUTS reuse one
+    set of cash flows and a single discount-factor matrix product.
+
+    :param model: 'saline', 'depleted' or 'economic'.
+    :param base: Mapping of input name to its base value.
+    :param field: Input to sweep.
+    :param values: Input values.
+    :param outputs: Outputs to report; all if None.
+    :return: DataFrame indexed by the input value, one column per output.
+    """
+    values = np.atleast_1d(np.asarray(values, dtype=float))
+    if model == 'economic' and field == 'discount_rate' and outputs is not None and set(outputs) <= set(RATE_CURVE_OUTPUTS):
+        curves = rate_curves(base, values)
+        table = pd.DataFrame({output: curves[output].iloc[0].to_numpy() for output in outputs}, index=values)
+    else:
+        results = evaluate_variations(model, base, [(field, value) for value in values], outputs)
+        table = results.drop(columns=['field', 'value']).set_index(pd.Index(values))
+    table.index.name = field
+    return table
@@ -0,0 +1,303 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cashflow_model import assumptions_from_inputs, evaluate_economics
+from depleted_batch import calculate_depleted_batch
+from economic_analysis import load_economic_sheet
+from input_schema import DEPLETED_SCHEMA, SALINE_SCHEMA, extract_inputs
+from pvt import PVT_TABLE_PATH, PVTTable
+from result_cache import DEFAULT_MAX_ENTRIES, ResultCache
+from saline_batch import calculate_saline_batch
+from workbook import WORKBOOK_PATH, open_workbook
+
+# Largest batch accepted in one request, and request latencies kept per endpoint for the
+# metrics endpoint.
+MAX_BATCH_SIZE = 100_000
+LATENCY_WINDOW = 1000
+
+# Inputs read from the workbook once per worker; scenarios only send what they change.
+_DEFAULTS = {}
+_PVT_TABLE = None
+_CACHE = ResultCache()
+
+def warm_worker(workbook_path=WORKBOOK_PATH, pvt_path=PVT_TABLE_PATH, cache_path=None,
+                cache_entries=DEFAULT_MAX_ENTRIES):
+    """
+    Load the workbook defaults and the PVT table into this process and open the result cache.
+
+    Runs as the initializer of every pool worker, so requests never pay for imports or
+    workbook parsing.
+
+    :param workbook_path: Path to the Excel file holding the default inputs.
+    :param pvt_path: Path to the PVT table; skipped if the file does not exist.
+    :param cache_path: SQLite file of the result cache shared by the workers; None keeps
+                       each worker's cache in memory.
+    :param cache_entries: Results held in each worker's in-memory cache.
+    """
+    global _PVT_TABLE, _CACHE
+    session = open_workbook(workbook_path)
+    _DEFAULTS['saline'] = extract_inputs(session.sheet("Saline Storage"), SALINE_SCHEMA)._asdict()
+    _DEFAULTS['depleted'] = extract_inputs(session.sheet("Depleted Field Storage"), DEPLETED_SCHEMA)._asdict()
+    _DEFAULTS['economic'] = assumptions_from_inputs(load_economic_sheet(workbook_path).inputs)
+    if pvt_path and os.path.exists(pvt_path):
+        _PVT_TABLE = PVTTable.from_csv(pvt_path)
+    _CACHE = ResultCache(cache_path, cache_entries)
+
+def _scenario_frame(kind, scenarios):
+    """
+    Build a DataFrame of scenarios, filling inputs they leave out from the workbook.
+
+    Raises ValueError listing any field that is not an input of the model, so a misspelled
+    input is rejected instead of silently taking the workbook value.
+    """
+    unknown = sorted({field for scenario in scenarios for field in scenario} - set(_DEFAULTS[kind]))
+    if unknown:
+        raise ValueError(f"Unknown {kind} inputs: {', '.join(unknown)}")
+    frame = pd.DataFrame(scenarios)
+    for field, value in _DEFAULTS[kind].items():
+        if field not in frame:
+            frame[field] = value
+        else:
+            frame[field] = frame[field].where(frame[field].notna(), value)
+    return frame[list(_DEFAULTS[kind])]
+
+def _saline_inputs(scenarios):
+    given_density = [scenario.get('CO2_density') is not None for scenario in scenarios]
+    frame = _scenario_frame('saline', scenarios)
+    if _PVT_TABLE is not None and not all(given_density):
+        # Scenarios without a CO2 density take it from the PVT table at reservoir conditions.
+        lookup = _PVT_TABLE.reservoir_properties(frame['reservoir_depth'], frame['pressure_gradient'],
+                                                 frame['temperature'], names=('density',))
+        frame['CO2_density'] = frame['CO2_density'].where(given_density, lookup['density'].to_numpy())
+    return frame
+
+def _depleted_inputs(scenarios):
+    return _scenario_frame('depleted', scenarios)
+
+def _economic_inputs(scenarios):
+    frame = _scenario_frame('economic', scenarios)
+    frame['injection_start'] = pd.to_datetime(frame['injection_start']).dt.date
+    return frame
+
+# Per model: build the full input records of a batch, and evaluate full input records.
+BATCH_HANDLERS = {
+    'saline': (_saline_inputs, calculate_saline_batch),
+    'depleted': (_depleted_inputs, calculate_depleted_batch),
+    'economic': (_economic_inputs, evaluate_economics),
+}
+
+def run_batch(kind, scenarios):
+    """
+    Evaluate a batch of scenarios in a worker.
+
+    Scenarios are completed with the workbook defaults and looked up in the result cache;
+    only the ones not cached are evaluated.
+
+    :param kind: 'saline', 'depleted' or 'economic'.
+    :param scenarios: List of dicts of input name to value.
+    :return: Tuple of a list of dicts of output name to value (None where a result is not a
+             finite number) and the number of scenarios served from the cache.
+    """
+    if not _DEFAULTS:
+        warm_worker()
+    prepare, evaluate = BATCH_HANDLERS[kind]
+    records = prepare(scenarios).to_dict('records')
+
+    def compute(missing):
+        results = evaluate(pd.DataFrame(missing))
+        # JSON has no NaN or infinity, so both are sent as null.
+        valid = results.notna()
+        numeric = results.select_dtypes('number').columns
+        valid[numeric] = np.isfinite(results[numeric])
+        return results.astype(object).where(valid, None).to_dict('records')
+
+    misses = _CACHE.stats['misses']
+    results = _CACHE.get_or_compute(kind, records, compute)
+    computed = _CACHE.stats['misses'] - misses
+    return results, len(records) - computed
+
+class CalculationService:
+    """
+    ASGI application serving the calculations as JSON endpoints.
+
+    POST /saline, /depleted and /economic take {"scenarios": [{...}, ...]} and return
+    {"results": [{...}, ...]} in the same order. Batches run on a process pool whose workers
+    are started and warmed when the application starts, and repeated scenarios are served
+    from a result cache. GET /metrics reports request
+    counts, latency and throughput per endpoint, and GET /health reports readiness.
+    """
+
+    def __init__(self, max_workers=None, workbook_path=WORKBOOK_PATH, pvt_path=PVT_TABLE_PATH,
+                 cache_path=None, cache_entries=DEFAULT_MAX_ENTRIES):
+        """
+        :param max_workers: Worker processes; defaults to the number of CPUs.
+        :param workbook_path: Path to the Excel file holding the default inputs.
+        :param pvt_path: Path to the PVT table, loaded if present.
+        :param cache_path: SQLite file of the result cache shared by the workers.
+        :param cache_entries: Results held in each worker's in-memory cache.
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.workbook_path = workbook_path
+        self.pvt_path = pvt_path
+        self.cache_path = cache_path
+        self.cache_entries = cache_entries
+        self.executor = None
+        self.started = None
+        self.startup_lock = asyncio.Lock()
+        self.metrics = {kind: {'requests': 0, 'errors': 0, 'scenarios': 0, 'cache_hits': 0, 'busy_seconds': 0.0,
+                               'latencies': deque(maxlen=LATENCY_WINDOW)} for kind in BATCH_HANDLERS}
+
+    async def startup(self):
+        """
+        Start the worker pool and wait until every worker has loaded its data.
+
+        Does nothing if the pool is already running; concurrent calls start a single pool.
+        """
+        async with self.startup_lock:
+            if self.executor is not None:
+                return
+            executor = ProcessPoolExecutor(self.max_workers, initializer=warm_worker,
+                                           initargs=(self.workbook_path, self.pvt_path, self.cache_path, self.cache_entries))
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*(loop.run_in_executor(executor, os.getpid) for _ in range(self.max_workers)))
+            self.executor = executor
+            self.started = time.monotonic()
+
+    async def shutdown(self):
+        """
+        Stop the worker pool.
+        """
+        async with self.startup_lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+                self.executor = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        method, path = scope['method'], scope['path'].rstrip('/')
+        if method == 'GET' and path == '/health':
+            await _send_json(send, 200 if self.executor else 503, {'ready': self.executor is not None,
+                                                                  'workers': self.max_workers})
+        elif method == 'GET' and path == '/metrics':
+            await _send_json(send, 200, self.metrics_report())
+        elif path.lstrip('/') in BATCH_HANDLERS:
+            if method != 'POST':
+                await _send_json(send, 405, {'error': 'Use POST'})
+                return
+            await self._handle_batch(path.lstrip('/'), await _read_body(receive), send)
+        else:
+            await _send_json(send, 404, {'error': f"Unknown endpoint '{path}'"})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await self.startup()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _handle_batch(self, kind, body, send):
+        metrics = self.metrics[kind]
+        start = time.perf_counter()
+        try:
+            scenarios = json.loads(body or b'{}').get('scenarios')
+        except (ValueError, AttributeError):
+            scenarios = None
+        if not isinstance(scenarios, list) or not all(isinstance(s, dict) for s in scenarios):
+            metrics['errors'] += 1
+            await _send_json(send, 400, {'error': 'Body must be {"scenarios": [{...}, ...]}'})
+            return
+        if len(scenarios) > MAX_BATCH_SIZE:
+            metrics['errors'] += 1
+            await _send_json(send, 413, {'error': f"At most {MAX_BATCH_SIZE} scenarios per request"})
+            return
+
+        await self.startup()
+        try:
+            loop = asyncio.get_running_loop()
+            results, cache_hits = await loop.run_in_executor(self.executor, run_batch, kind, scenarios) if scenarios else ([], 0)
+        except (ValueError, KeyError, TypeError) as error:
+            metrics['errors'] += 1
+            await _send_json(send, 422, {'error': str(error)})
+            return
+
+        elapsed = time.perf_counter() - start
+        metrics['requests'] += 1
+        metrics['scenarios'] += len(scenarios)
+        metrics['cache_hits'] += cache_hits
+        metrics['busy_seconds'] += elapsed
+        metrics['latencies'].append(elapsed)
+        await _send_json(send, 200, {'results': results})
+
+    def metrics_report(self):
+        """
+        Summarize requests, latency and throughput per endpoint.
+
+        :return: Dict with uptime and, per endpoint, request, scenario and cache hit counts, latency
+                 percentiles in milliseconds (over the last LATENCY_WINDOW requests) and
+                 scenarios per second of request time.
+        """
+        report = {'uptime_seconds': time.monotonic() - self.started if self.started else 0.0,
+                  'workers': self.max_workers, 'endpoints': {}}
+        for kind, metrics in self.metrics.items():
+            latencies = np.array(metrics['latencies']) * 1000
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies.size else (None, None, None)
+            report['endpoints'][kind] = {
+                'requests': metrics['requests'],
+                'errors': metrics['errors'],
+                'scenarios': metrics['scenarios'],
+                'cache_hits': metrics['cache_hits'],
+                'cache_hit_rate': metrics['cache_hits'] / metrics['scenarios'] if metrics['scenarios'] else None,
+                'latency_ms_p50': p50,
+                'latency_ms_p95': p95,
+                'latency_ms_p99': p99,
+                'scenarios_per_second': metrics['scenarios'] / metrics['busy_seconds'] if metrics['busy_seconds'] else None,
+            }
+        return report
+
+async def _read_body(receive):
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            return body
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return str(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+async def _send_json(send, status, payload):
+    body = json.dumps(payload, default=_json_default).encode()
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+    await send({'type': 'http.response.body', 'body': body})
+
+app = CalculationService()
+
+def main():
+    # uvicorn is only needed to serve over HTTP; any ASGI server can run `service:app`.
+    import uvicorn
+
+    uvicorn.run(app, host="127.0.0.1", port=8000)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import io
+import os
+
+import pandas as pd
+
+WORKBOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Excel", "Calculations_for_python.xlsx")
+
+# Open sessions keyed by (absolute path, modification time).
+_SESSIONS = {}
+
+class WorkbookSession:
+    """
+    A workbook opened once, whose sheets are parsed on first access and then reused.
+
+    The Saline, Depleted and Economic modules all read from the same session, so a full
+    evaluation unzips and opens the xlsx a single time.
+    """
+
+    def __init__(self, file_path):
+        """
+        :param file_path: Path to the Excel file.
+        """
+        self.file_path = file_path
+        # Read the file into memory once; openpyxl then works from the buffer instead of
+        # reopening the path for every sheet.
+        with open(file_path, 'rb') as f:
+            self._excel_file = pd.ExcelFile(io.BytesIO(f.read()), engine='openpyxl')
+        self.sheet_names = self._excel_file.sheet_names
+        self._cache = {}
+
+    @property
+    def book(self):
+        """
+        The underlying openpyxl workbook, for readers that stream rows themselves.
+        """
+        return self._excel_file.book
+
+    def sheet(self, sheet_name):
+        """
+        Return a sheet as a DataFrame, parsing it on first access.
+
+        :param sheet_name: Name of the sheet.
+        :return: DataFrame containing the sheet.
+        """
+        return self.load(('sheet', sheet_name), lambda: self._excel_file.parse(sheet_name))
+
+    def load(self, key, loader):
+        """
+        Return a value derived from the workbook, computing it with loader on first access.
+
+        :param key: Hashable key identifying the derived value.
+        :param loader: Function of no arguments that builds the value.
+        :return: The cached value.
+        """
+        if key not in self._cache:
+            self._cache[key] = loader()
+        return self._cache[key]
+
+    def close(self):
+        """
+        Close the underlying file and drop the parsed sheets.
+        """
+        self._cache.clear()
+        self._excel_file.close()
+
+def open_workbook(file_path=WORKBOOK_PATH):
+    """
+    Return the shared session for a workbook, opening it if needed.
+
+    A session is reused for as long as the file keeps the same modification time; when the
+    file changes on disk a new session replaces the old one.
+
+    :param file_path: Path to the Excel file.
+    :return: WorkbookSession for the file.
+    """
+    path = os.path.abspath(file_path)
+    key = (path, os.stat(path).st_mtime_ns)
+    session = _SESSIONS.get(key)
+    if session is None:
+        for stale in [k for k in _SESSIONS if k[0] == path]:
+            _SESSIONS.pop(stale).close()
+        session = _SESSIONS[key] = WorkbookSession(path)
+    return session
+
+def close_workbooks():
+    """
+    Close every open workbook session.
+    """
+    while _SESSIONS:
+        _SESSIONS.popitem()[1].close()